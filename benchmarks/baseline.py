@@ -0,0 +1,325 @@
+"""
+The original implementations that the benchmarks compare with.
+
+Each of them is the code that an optimization replaced, reduced to what the
+benchmarks call (the interfaces are the ones of the current code, so that
+both can be run on the same data). They are not used by the application.
+
+The Qt modules are only imported by the functions that need them, so that
+the benchmarks of the core do not depend on Qt.
+"""
+
+
+import os
+import re
+import threading
+from collections import OrderedDict, defaultdict
+from types import SimpleNamespace
+
+from xdgprefs.core import desktop_entry, desktop_entry_parser as parser
+from xdgprefs.core.icon_theme import EXTENSIONS
+
+
+# Desktop Entry parser: a tokenizer made of one big regular expression.
+
+def split(text):
+    escape = '\\'
+    ret = []
+    current = []
+    itr = iter(text)
+    for ch in itr:
+        if ch == escape:
+            try:
+                current.append(next(itr))
+            except StopIteration:
+                current.append(escape)
+        elif ch == ';' or ch == ',':
+            ret.append(''.join(current))
+            current = []
+        else:
+            current.append(ch)
+    if len(current) > 0:
+        ret.append(''.join(current))
+    return ret
+
+
+def tok_gen(text):
+    reg = r"""(?P<ENTRY>^(.+?)(\[.+?\])?=(.*)$\n?)|"""\
+          r"""(?P<COMMENT_LINE>^#(.*)\n)|"""\
+          r"""(?P<EMPTY_LINE>^[ \t\r\f\v]*\n)|"""\
+          r"""(?P<GROUP_HEADER>^\[(.+?)\]\s*$\n?)"""
+    r = re.compile(reg, re.MULTILINE)
+    groups = OrderedDict(sorted(r.groupindex.items(), key=lambda t: t[1]))
+    last_i = None
+    for i in groups.items():
+        if last_i is None:
+            last_i = i
+            continue
+        groups[last_i[0]] = (last_i[1], i[1]-1)
+        last_i = i
+    groups[last_i[0]] = (last_i[1], r.groups)
+    pos = 0
+    while True:
+        m = r.match(text, pos)
+        if not m:
+            if pos != len(text):
+                raise SyntaxError("Tokenization failed!")
+            break
+        pos = m.end()
+        start, end = groups[m.lastgroup]
+        yield m.lastgroup, m.groups()[start:end]
+
+
+def parse_text(text):
+    """
+    Parse a Desktop Entry file with the tokenizer, into the groups of the
+    current data model (as `desktop_entry_parser.parse_text` does).
+    """
+    entry_groups = {}
+    current_group = None
+    for tok_name, subvalues in tok_gen(text):
+        if tok_name == "GROUP_HEADER":
+            current_group = subvalues[0]
+            entry_groups[current_group] = \
+                desktop_entry.EntryGroup(current_group)
+        elif tok_name == "ENTRY":
+            locale = subvalues[1].strip("[]") if subvalues[1] else None
+            entry = desktop_entry.Entry(subvalues[0], subvalues[2], locale)
+            if entry.key in ["NoDisplay", "Hidden", "Terminal",
+                             "StartupNotify", "X-MultipleArgs"]:
+                entry.value = parser.convert_bool(entry)
+            elif entry.key in ["OnlyShowIn", "NotShowIn", "Actions",
+                               "MimeType", "Categories", "Keywords"]:
+                entry.value = split(entry.value)
+            entry_groups[current_group].add_entry(entry)
+    return entry_groups
+
+
+# Data model: plain objects, with the entries in nested defaultdicts.
+
+class Entry(object):
+
+    def __init__(self, key, value, locale):
+        self.key = key
+        self.value = value
+        self.locale = locale
+
+
+class EntryGroup(object):
+
+    def __init__(self, name):
+        self.name = name
+        self.entries = defaultdict(lambda: defaultdict(lambda: None))
+
+    def add_entry(self, entry):
+        self.entries[entry.key][entry.locale] = entry
+
+
+class DesktopEntry(object):
+
+    def __init__(self, groups, appid):
+        self.groups = groups
+        self.appid = appid
+
+
+class MimeType(object):
+
+    def __init__(self, _type, subtype, comment, extensions, icon,
+                 aliases=None, parents=None):
+        self.type = _type
+        self.subtype = subtype
+        self.comment = comment
+        self.extensions = extensions
+        self.icon = icon
+        self.aliases = aliases or []
+        self.parents = parents or []
+        self.identifier = '{}/{}'.format(self.type, self.subtype)
+
+
+def parse_desktop_entry(text, appid):
+    """
+    Parse a Desktop Entry file with the tokenizer, into a DesktopEntry of the
+    original data model.
+    """
+    groups = {}
+    current_group = None
+    for tok_name, subvalues in tok_gen(text):
+        if tok_name == "GROUP_HEADER":
+            current_group = subvalues[0]
+            groups[current_group] = EntryGroup(current_group)
+        elif tok_name == "ENTRY":
+            locale = subvalues[1].strip("[]") if subvalues[1] else None
+            entry = Entry(subvalues[0], subvalues[2], locale)
+            if entry.key in parser.BOOLEAN_KEYS:
+                entry.value = parser.convert_bool(entry)
+            elif entry.key in parser.LIST_KEYS:
+                entry.value = split(entry.value)
+            groups[current_group].add_entry(entry)
+    return DesktopEntry(groups, appid)
+
+
+# Associations of a MIME type: lists, searched for each application added.
+
+class Associations(object):
+
+    def __init__(self):
+        self.added = []
+        self.removed = []
+        self.default = []
+
+    def extend_added(self, apps):
+        for app in apps:
+            if app not in self.added and app not in self.removed:
+                self.added.append(app)
+
+    def extend_removed(self, apps):
+        for app in apps:
+            if app not in self.removed:
+                self.removed.append(app)
+
+    def extend_default(self, apps):
+        for app in apps:
+            if app not in self.default:
+                self.default.append(app)
+
+
+# Saving the associations chosen in the GUI: a thread per change, each
+# writing `mimeapps.list`.
+
+def set_all(assocdb, changes):
+    """Make each change from its own thread, and return the errors."""
+    errors = []
+
+    def run(mimetype, app):
+        try:
+            if not assocdb.set_app_for_mimetype(mimetype, app):
+                errors.append(mimetype)
+        except Exception as e:
+            errors.append(e)
+
+    threads = []
+    for mimetype, app in changes:
+        thread = threading.Thread(target=run, args=(mimetype, app))
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+    return errors
+
+
+# Icon themes: the lookup algorithm of the specification, which checks each
+# candidate file with a `stat` call.
+
+def lookup_icon(names, size, themes, base_dirs, directories):
+    """
+    Return the path to the first of `names` found in `themes` (for which
+    `directories` gives the parsed IconDirs), or None.
+    """
+    for theme in themes:
+        for name in names:
+            closest = None
+            closest_distance = None
+            for icon_dir in directories[theme]:
+                for base_dir in base_dirs:
+                    for extension in EXTENSIONS:
+                        path = os.path.join(base_dir, theme, icon_dir.name,
+                                            name + extension)
+                        if not os.path.isfile(path):
+                            continue
+                        if icon_dir.matches(size, 1):
+                            return path
+                        distance = icon_dir.distance(size, 1)
+                        if closest_distance is None \
+                                or distance < closest_distance:
+                            closest = path
+                            closest_distance = distance
+            if closest is not None:
+                return closest
+    return None
+
+
+# Icons of the lists: decoded and scaled for each row, on the GUI thread.
+
+def load_icons(paths, size):
+    """Return the icon at each path, scaled to `size` (a QSize)."""
+    from PySide6.QtGui import QPixmap
+    return [QPixmap(path).scaled(size) for path in paths]
+
+
+# List panels: a QListWidget with a widget of 3 QLabels per row, filtered by
+# a QSortFilterProxyModel calling a predicate for each row.
+
+def mime_panel(types):
+    """Return the list of the MIME types of a dict {identifier: type}."""
+    from PySide6.QtGui import QPixmap
+    from PySide6.QtWidgets import QListWidget, QListWidgetItem, QWidget, \
+        QVBoxLayout, QHBoxLayout, QLabel
+
+    list_widget = QListWidget()
+    for mime_type in types.values():
+        item = QListWidgetItem(list_widget, type=QListWidgetItem.UserType)
+        widget = QWidget()
+        vbox = QVBoxLayout()
+        for text in (mime_type.identifier, mime_type.comment,
+                     ', '.join(mime_type.extensions)):
+            label = QLabel(text)
+            label.setWordWrap(True)
+            vbox.addWidget(label)
+        hbox = QHBoxLayout()
+        icon = QLabel()
+        icon.setPixmap(QPixmap(f'/usr/share/icons/Adwaita/256x256/mimetypes/'
+                               f'{mime_type.icon}.png'))
+        hbox.addWidget(icon, 0)
+        hbox.addLayout(vbox, 1)
+        widget.setLayout(hbox)
+        item.setSizeHint(widget.sizeHint())
+        list_widget.setItemWidget(item, widget)
+        list_widget.addItem(item)
+    return list_widget
+
+
+def filter_model(source):
+    """Return a filter of the ListModel `source`, with `set_filter`."""
+    from PySide6.QtCore import QSortFilterProxyModel
+
+    class FilterModel(QSortFilterProxyModel):
+
+        def __init__(self, source):
+            QSortFilterProxyModel.__init__(self)
+            self.predicate = None
+            self.setSourceModel(source)
+
+        def set_filter(self, query, predicate=None):
+            self.predicate = lambda item: item.identifier.find(query) != -1 \
+                and (predicate is None or predicate(item))
+            self.invalidateFilter()
+
+        def filterAcceptsRow(self, row, parent):
+            if self.predicate is None:
+                return True
+            return self.predicate(self.sourceModel().items[row])
+
+    return FilterModel(source)
+
+
+# Startup: the databases, then the panels, built on the GUI thread before
+# the window is shown.
+
+def main_window():
+    """Build and show the window, once everything is loaded."""
+    from PySide6.QtWidgets import QTabWidget
+    from xdgprefs.core import MimeDatabase, AppDatabase, \
+        AssociationsDatabase
+    from xdgprefs.core.desktop_entry_parser import SUMMARY_KEYS
+    from xdgprefs.gui import MimeTypePanel, AppsPanel, AssociationsPanel
+
+    mimedb = MimeDatabase()
+    appdb = AppDatabase(keys=SUMMARY_KEYS, locales=frozenset())
+    assocdb = AssociationsDatabase(appdb=appdb)
+    window = QTabWidget()
+    window.addTab(AssociationsPanel(SimpleNamespace(
+        mimedb=mimedb, appdb=appdb, assocdb=assocdb)), 'Associations')
+    window.addTab(MimeTypePanel(mimedb), 'List MIME Types')
+    window.addTab(AppsPanel(appdb), 'List Applications')
+    window.show()
+    return window
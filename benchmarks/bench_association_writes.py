@@ -0,0 +1,101 @@
+"""
+Benchmark of the saving of the associations chosen in the GUI.
+
+Makes a burst of changes of default applications (several per MIME type,
+as when scrolling through a combo box), in a temporary configuration
+directory, and counts the writes of `mimeapps.list`. With a thread per
+change (`baseline.set_all`), each thread writes the file and the last one
+to finish wins; the AssociationWriter coalesces the burst. Also reports the
+elapsed time, and whether the file ends up with the last application chosen
+for each type.
+
+Usage: python benchmarks/bench_association_writes.py [--changes N]
+    [--types K]
+"""
+
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import baseline  # noqa: E402
+from xdgprefs.core import associations_database  # noqa: E402
+from xdgprefs.core.associations_database import AssociationsDatabase, \
+    DEFAULT, parse_mimeapps  # noqa: E402
+
+
+def writer_set_all(assocdb, changes):
+    from PySide6.QtCore import QCoreApplication
+    from xdgprefs.gui.association_writer import AssociationWriter
+
+    errors = []
+    writer = AssociationWriter(assocdb)
+    writer.saved.connect(lambda mimetype, _, success:
+                         success or errors.append(mimetype))
+    for mimetype, app in changes:
+        writer.set_app_for_mimetype(mimetype, app)
+        QCoreApplication.processEvents()
+    writer.close()
+    QCoreApplication.processEvents()
+    return errors
+
+
+def main():
+    args = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    args.add_argument('--changes', type=int, default=200)
+    args.add_argument('--types', type=int, default=20)
+    args = args.parse_args()
+
+    # Imported (and started) before the measures
+    from PySide6.QtCore import QCoreApplication
+    import xdgprefs.gui.association_writer  # noqa: F401
+    qt_app = QCoreApplication([])  # noqa: F841
+
+    random.seed(0)
+    mimetypes = [f'application/x-type{i}' for i in range(args.types)]
+    changes = [(random.choice(mimetypes), f'app{random.randrange(10)}'
+                                          f'.desktop')
+               for _ in range(args.changes)]
+    expected = {}
+    for mimetype, app in changes:
+        expected[mimetype] = app
+
+    writes = []
+    write_atomic = associations_database.write_atomic
+
+    def counting_write(path, config):
+        writes.append(path)
+        write_atomic(path, config)
+
+    associations_database.write_atomic = counting_write
+
+    print(f'{args.changes} changes of {args.types} MIME types')
+    for label, set_all in (('Thread per change', baseline.set_all),
+                           ('AssociationWriter', writer_set_all)):
+        root = tempfile.mkdtemp(prefix='bench-writes-')
+        os.environ['XDG_CONFIG_HOME'] = root
+        os.environ['XDG_DATA_HOME'] = os.path.join(root, 'data')
+        try:
+            assocdb = AssociationsDatabase(use_snapshot=False)
+            writes.clear()
+            start = time.perf_counter()
+            errors = set_all(assocdb, changes)
+            elapsed = time.perf_counter() - start
+            config = parse_mimeapps(assocdb.config_path)
+            wrong = sum(config.get(DEFAULT, mimetype, fallback=[None])[0]
+                        != app for mimetype, app in expected.items())
+        finally:
+            shutil.rmtree(root)
+        print(f'{label + ":":<19} {len(writes):4} writes, '
+              f'{elapsed * 1000:7.1f} ms, {len(errors)} errors, '
+              f'{wrong} wrong default(s) in the file')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark of the merge of the MIME type associations.
+
+Writes a synthetic XDG tree (see `xdg_tree.py`) with many data directories,
+and so many `mimeapps.list` and `mimeinfo.cache` files, where a few popular
+MIME types are associated with many applications, and builds the
+AssociationsDatabase on it. The merge of these files is timed with the
+Associations (ordered sets) and with `baseline.Associations` (lists, whose
+membership tests make it quadratic in the number of applications of a
+type). The memory held by the parsed files is reported with and without
+interning the strings.
+
+Usage: python benchmarks/bench_associations.py [--dirs N] [--apps A]
+"""
+
+
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import baseline  # noqa: E402
+from xdg_tree import temporary_tree  # noqa: E402
+from xdgprefs.core import associations_database as assoc  # noqa: E402
+
+
+def timed_merge(db, factory, repeat=3):
+    best = None
+    for _ in range(repeat):
+        db.associations = defaultdict(factory)
+        start = time.perf_counter()
+        db._merge()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def held_memory(build):
+    """Return the memory (in bytes) held by the result of `build()`."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    held = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del result
+    return held
+
+
+def main():
+    args = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    args.add_argument('--dirs', type=int, default=40)
+    args.add_argument('--apps', type=int, default=10000)
+    args = args.parse_args()
+
+    # The Desktop Entry files are not read: they are not translated, to
+    # write them faster.
+    with temporary_tree(apps=args.apps, mimetypes=500, data_dirs=args.dirs,
+                        translated=0) as tree:
+        os.environ.update(tree.env)
+        db = assoc.AssociationsDatabase(use_snapshot=False)
+        current = timed_merge(db, assoc.Associations)
+        legacy = timed_merge(db, baseline.Associations)
+
+        files = [path for path in db.files if os.path.isfile(path)]
+        interned = held_memory(lambda: [
+            db._read_sections(path, assoc.MIMEAPPS_SECTIONS + [assoc.CACHE])
+            for path in files])
+        plain = held_memory(lambda: [
+            {name: dict(config[name].items())
+             for name in assoc.MIMEAPPS_SECTIONS + [assoc.CACHE]
+             if config.has_section(name)}
+            for config in map(assoc.parse_mimeapps, files)])
+
+    print(f'Tree: {len(files)} files, {len(db.associations)} MIME types, '
+          f'{len(db.associations["text/plain"].default)} apps for text/plain')
+    print(f'Merge (lists):        {legacy * 1000:8.1f} ms')
+    print(f'Merge (ordered sets): {current * 1000:8.1f} ms '
+          f'(x{legacy / current:.0f} faster)')
+    print(f'Parsed files: {plain / 1e6:.2f} MB, '
+          f'{interned / 1e6:.2f} MB with interned strings')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""
+Benchmark of the cold start of the command-line interface.
+
+Runs `xdg-prefs-cli query` (as `python -m xdgprefs.cli`) in fresh
+interpreters, and reports the best wall time. Exits with an error if it
+exceeds the budget, or if Qt was imported.
+
+Usage: python benchmarks/bench_cli.py [--budget MS] [--repeat R]
+"""
+
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+
+
+def run(arguments, importtime=False):
+    """Run the CLI, and return its wall time (in seconds) and stderr."""
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else []) \
+        + ['-m', 'xdgprefs.cli'] + arguments
+    start = time.perf_counter()
+    res = subprocess.run(command, cwd=ROOT, capture_output=True, text=True)
+    return time.perf_counter() - start, res.stderr
+
+
+def main():
+    args = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    args.add_argument('--budget', type=float, default=150.0,
+                      help='maximum wall time of a query, in milliseconds')
+    args.add_argument('--repeat', type=int, default=5)
+    args.add_argument('mimetypes', nargs='*', default=['text/plain'])
+    args = args.parse_args()
+
+    # The first run fills the snapshots, as after any change on the system
+    first, _ = run(['query'] + args.mimetypes)
+    best = min(run(['query'] + args.mimetypes)[0]
+               for _ in range(args.repeat))
+    _, stderr = run(['query'] + args.mimetypes, importtime=True)
+    print(f'xdg-prefs-cli query: {best * 1000:.0f} ms '
+          f'(first run: {first * 1000:.0f} ms, budget: {args.budget} ms)')
+
+    errors = []
+    if best * 1000 > args.budget:
+        errors.append('the query exceeds the budget')
+    if 'PySide6' in stderr:
+        errors.append('PySide6 was imported')
+    for error in errors:
+        print(f'Error: {error}')
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+Benchmark of the default application lookup.
+
+Builds the databases of this computer, and times
+`AssociationsDatabase.get_default_app` on all the MIME types that have
+associations. If `xdg-mime` is available, it is timed on a sample of these
+types as well (with the asynchronous API, running `--concurrency` processes
+at once), and both answers are compared.
+
+Usage: python benchmarks/bench_default_app.py [--sample N] [--concurrency C]
+"""
+
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from xdgprefs.core import xdg_mime_wrapper  # noqa: E402
+from xdgprefs.core.app_database import AppDatabase  # noqa: E402
+from xdgprefs.core.associations_database import \
+    AssociationsDatabase  # noqa: E402
+
+
+def main():
+    args = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    args.add_argument('--sample', type=int, default=20)
+    args.add_argument('--concurrency', type=int, default=8)
+    args = args.parse_args()
+
+    appdb = AppDatabase()
+    assocdb = AssociationsDatabase(appdb=appdb)
+    mimetypes = sorted(assocdb.get_mimetypes())
+
+    start = time.perf_counter()
+    native = {mimetype: assocdb.get_default_app(mimetype)
+              for mimetype in mimetypes}
+    elapsed = time.perf_counter() - start
+    print(f'{len(mimetypes)} MIME types')
+    print(f'get_default_app: {elapsed / max(len(mimetypes), 1) * 1e6:.1f} '
+          f'us/lookup')
+
+    if xdg_mime_wrapper.get_bin_path() is None:
+        print('xdg-mime is not available, no comparison')
+        return
+    sample = mimetypes[::max(len(mimetypes) // args.sample, 1)][:args.sample]
+    start = time.perf_counter()
+    expected = asyncio.run(xdg_mime_wrapper.get_default_apps(
+        sample, args.concurrency))
+    elapsed = time.perf_counter() - start
+    print(f'xdg-mime:        {elapsed / max(len(sample), 1) * 1e6:.1f} '
+          f'us/lookup')
+    different = [mimetype for mimetype in sample
+                 if native[mimetype] != expected[mimetype]]
+    print(f'Different answers: {len(different)} / {len(sample)}')
+    for mimetype in different:
+        print(f'  {mimetype}: {native[mimetype]} vs {expected[mimetype]}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark of the Desktop Entry parser.
+
+Generates a corpus of localized Desktop Entry files (see `xdg_tree.py`),
+and reports the files parsed per second by `desktop_entry_parser.parse_text`
+and by the regex tokenizer it replaced (`baseline.parse_text`), after
+checking that both give the same groups. The projection mode
+(`SUMMARY_KEYS`, without translations) and `parse` (with the reading of the
+files) are timed as well.
+
+Usage: python benchmarks/bench_desktop_parser.py [--files N] [--repeat R]
+"""
+
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import baseline  # noqa: E402
+from xdg_tree import desktop_file  # noqa: E402
+from xdgprefs.core import desktop_entry_parser as parser  # noqa: E402
+
+
+def flatten(groups):
+    """Return a comparable representation of parsed groups."""
+    result = {}
+    for name, group in groups.items():
+        for (key, locale), value in group.entries.items():
+            result[name, key, locale] = value
+    return result
+
+
+def timed(function, texts, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            function(text)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    args = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    args.add_argument('--files', type=int, default=2000)
+    args.add_argument('--repeat', type=int, default=3)
+    args = args.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i in range(args.files):
+            path = os.path.join(tmp, f'app{i}.desktop')
+            with open(path, 'w') as f:
+                f.write(desktop_file(i))
+            paths.append(path)
+        texts = []
+        for path in paths:
+            with open(path) as f:
+                texts.append(f.read())
+        size = sum(len(text) for text in texts)
+
+        for text in texts[:50]:
+            assert flatten(parser.parse_text(text)) == \
+                flatten(baseline.parse_text(text)), 'Different results!'
+
+        legacy = timed(baseline.parse_text, texts, args.repeat)
+        current = timed(parser.parse_text, texts, args.repeat)
+        projected = timed(lambda text: parser.parse_text(
+            text, parser.SUMMARY_KEYS, frozenset()), texts, args.repeat)
+        start = time.perf_counter()
+        for path in paths:
+            parser.parse(path, os.path.basename(path))
+        with_io = time.perf_counter() - start
+
+    print(f'Corpus: {args.files} files, {size / 1e6:.1f} MB')
+    print(f'Regex tokenizer: {legacy:.3f} s '
+          f'({args.files / legacy:.0f} files/s)')
+    print(f'Line parser:     {current:.3f} s '
+          f'({args.files / current:.0f} files/s)')
+    print(f'Speedup:         x{legacy / current:.1f}')
+    print(f'Projection:      {projected:.3f} s '
+          f'(x{legacy / projected:.1f} vs regex, '
+          f'x{current / projected:.1f} vs full parse)')
+    print(f'parse() including I/O: {with_io:.3f} s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Benchmark of the filtering of the list panels of the GUI.
+
+Types queries one character at a time in front of a list of synthetic MIME
+types (see `xdg_tree.py`), and reports the time per keystroke (filtering,
+and updating the view) of FilterModel, and of `baseline.filter_model`, where
+Qt calls back a Python predicate for each row. This is the worst case: the
+panels wait for the user to stop typing (see FILTER_DELAY), so that a whole
+query is usually filtered once.
+
+Usage: python benchmarks/bench_filter.py [--rows N]
+"""
+
+
+import argparse
+import os
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import baseline  # noqa: E402
+from xdg_tree import mime_types  # noqa: E402
+
+
+QUERIES = ['synthetic-12', 'application/x-synthetic-3', 'image/png', 'zzz']
+
+
+def type_queries(app, filter_model):
+    """Type each query, and return the time per keystroke, in seconds."""
+    keystrokes = 0
+    start = time.perf_counter()
+    for query in QUERIES:
+        for length in range(len(query) + 1):
+            filter_model.set_filter(query[:length],
+                                    lambda mime_type: True)
+            app.processEvents()
+            keystrokes += 1
+    return (time.perf_counter() - start) / keystrokes
+
+
+def main():
+    args = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    args.add_argument('--rows', type=int, default=5000)
+    args = args.parse_args()
+
+    os.environ['QT_QPA_PLATFORM'] = 'offscreen'
+    from PySide6.QtWidgets import QApplication, QListView
+    from xdgprefs.gui.item_delegate import ItemDelegate
+    from xdgprefs.gui.icon_loader import IconLoader
+    from xdgprefs.gui.list_model import FilterModel
+    from xdgprefs.gui.mime_model import MimeTypeModel
+
+    warnings.simplefilter('ignore', DeprecationWarning)
+    app = QApplication([])
+    model = MimeTypeModel(list(mime_types(args.rows).values()),
+                          icons=IconLoader(lambda name, size: None))
+    print(f'{args.rows} rows, {sum(len(q) + 1 for q in QUERIES)} keystrokes')
+    for label, filter_model in (('QSortFilterProxyModel',
+                                 baseline.filter_model(model)),
+                                ('FilterModel', FilterModel(model))):
+        view = QListView()
+        view.setUniformItemSizes(True)
+        view.setItemDelegate(ItemDelegate(view))
+        view.setModel(filter_model)
+        view.resize(600, 800)
+        view.show()
+        app.processEvents()
+        elapsed = type_queries(app, filter_model)
+        print(f'{label + ":":<23}{elapsed * 1000:7.2f} ms per keystroke')
+        view.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark of the construction of the list panels of the GUI.
+
+Builds a MimeTypePanel over synthetic databases of increasing sizes (see
+`xdg_tree.py`), and reports the time until it is shown and the resident
+memory it adds to the process, next to those of `baseline.mime_panel` (a
+QListWidget with a widget of 3 QLabels per row). Each measure runs in a new
+process, with the `offscreen` Qt platform.
+
+Usage: python benchmarks/bench_gui_panels.py [--sizes N [N ...]]
+"""
+
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import baseline  # noqa: E402
+from xdg_tree import mime_types  # noqa: E402
+
+
+def rss():
+    """Return the resident memory of this process, in bytes."""
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+def measure(implementation, count):
+    """Build a panel, show it, and print the elapsed time and memory."""
+    os.environ['QT_QPA_PLATFORM'] = 'offscreen'
+    from PySide6.QtWidgets import QApplication
+    from xdgprefs.gui.mime_type_panel import MimeTypePanel
+
+    app = QApplication([])
+    types = mime_types(count)
+    before = rss()
+    start = time.perf_counter()
+    if implementation == 'legacy':
+        panel = baseline.mime_panel(types)
+    else:
+        panel = MimeTypePanel(SimpleNamespace(types=types))
+    panel.resize(600, 800)
+    panel.show()
+    app.processEvents()
+    elapsed = time.perf_counter() - start
+    print(elapsed, rss() - before)
+
+
+def main():
+    args = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    args.add_argument('--sizes', type=int, nargs='+',
+                      default=[500, 2000, 8000])
+    args.add_argument('--child', nargs=2, help=argparse.SUPPRESS)
+    args = args.parse_args()
+
+    if args.child:
+        measure(args.child[0], int(args.child[1]))
+        return
+
+    print(f'{"rows":>6} {"widgets":>18} {"model/view":>18}')
+    for count in args.sizes:
+        results = []
+        for implementation in ('legacy', 'model'):
+            res = subprocess.run([sys.executable, __file__, '--child',
+                                  implementation, str(count)],
+                                 capture_output=True, text=True, check=True)
+            elapsed, memory = res.stdout.split()
+            results.append(f'{float(elapsed):6.2f} s {int(memory) / 1e6:6.1f} '
+                           f'MB')
+        print(f'{count:>6} {results[0]:>18} {results[1]:>18}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark of the icon theme lookup engine.
+
+Writes a synthetic icon theme (several sizes and contexts, inheriting from
+`hicolor`, see `xdg_tree.py`), and looks up icons by name, most of them
+through fallbacks (as MIME type icons are). Reports the time IconDatabase
+takes to build its index (without and with a snapshot), and its time per
+lookup next to that of the algorithm of the specification
+(`baseline.lookup_icon`, a `stat` per candidate file), which must find the
+same files.
+
+Usage: python benchmarks/bench_icon_theme.py [--icons N] [--lookups L]
+"""
+
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import baseline  # noqa: E402
+from xdg_tree import ICON_CONTEXTS, ICON_SIZES, ICON_THEME, \
+    temporary_tree  # noqa: E402
+from xdgprefs.core.icon_theme import FALLBACK_THEME, IconDatabase, \
+    icon_dirs, parse_index_theme  # noqa: E402
+
+
+def main():
+    args = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    args.add_argument('--icons', type=int, default=100,
+                      help='icons per directory')
+    args.add_argument('--lookups', type=int, default=2000)
+    args = args.parse_args()
+
+    with temporary_tree(apps=0, mimetypes=0, icons=args.icons) as tree:
+        os.environ.update(tree.env)
+        # Not to look up the icons in the ~/.icons of the user
+        os.environ['HOME'] = tree.root
+        n_dirs = len(ICON_SIZES) * len(ICON_CONTEXTS)
+        print(f'2 themes of {n_dirs} directories, '
+              f'{2 * n_dirs * args.icons} icon files')
+
+        # Icons as MIME types look them up: a specific icon that is rarely
+        # there, and generic fallbacks.
+        queries = [((f'missing-{i}', f'mimetypes-{i % args.icons}'),
+                    ICON_SIZES[i % len(ICON_SIZES)])
+                   for i in range(args.lookups)]
+
+        base_dirs = icon_dirs()
+        themes = [ICON_THEME, FALLBACK_THEME]
+        directories = {theme: parse_index_theme(os.path.join(
+            tree.icon_dir, theme, 'index.theme'))[1] for theme in themes}
+        start = time.perf_counter()
+        expected = [baseline.lookup_icon(names, size, themes, base_dirs,
+                                  directories) for names, size in queries]
+        legacy = time.perf_counter() - start
+
+        for label in ('without a snapshot', 'from the snapshot'):
+            icondb = IconDatabase(ICON_THEME)
+            start = time.perf_counter()
+            icondb.lookup('warm-up', 48)
+            print(f'Index built {label}: '
+                  f'{(time.perf_counter() - start) * 1000:.1f} ms')
+
+        icondb = IconDatabase(ICON_THEME, cache_size=0)
+        icondb.lookup('warm-up', 48)
+        start = time.perf_counter()
+        result = [icondb.lookup(names, size) for names, size in queries]
+        indexed = time.perf_counter() - start
+        assert result == expected, 'the results differ'
+
+        print(f'Specification (stat): {legacy / args.lookups * 1e6:8.1f} '
+              f'us per lookup')
+        print(f'IconDatabase (index): {indexed / args.lookups * 1e6:8.1f} '
+              f'us per lookup')
+
+
+if __name__ == '__main__':
+    main()
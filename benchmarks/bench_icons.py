@@ -0,0 +1,71 @@
+"""
+Benchmark of the loading of the icons of the lists.
+
+Writes a set of 256x256 icons (in the icon themes of `xdg_tree.py`), and
+requests them for many rows (most rows share a few generic icons, as MIME
+types do). Reports how long the GUI thread is blocked when each row decodes
+and scales its own icon (`baseline.load_icons`), and when the icons are
+requested from the IconLoader, as well as the time until the IconLoader has
+decoded all of them.
+
+Usage: python benchmarks/bench_icons.py [--rows N] [--icons K]
+"""
+
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import baseline  # noqa: E402
+from xdg_tree import FALLBACK_ICON_THEME, temporary_tree  # noqa: E402
+
+
+def main():
+    args = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    args.add_argument('--rows', type=int, default=2000)
+    args.add_argument('--icons', type=int, default=40)
+    args = args.parse_args()
+
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PySide6.QtCore import QSize
+    from PySide6.QtWidgets import QApplication
+    from xdgprefs.gui.icon_loader import IconLoader
+
+    app = QApplication([])
+    size = QSize(64, 64)
+    with temporary_tree(apps=0, mimetypes=0, icons=args.icons,
+                        icon_images=True) as tree:
+        directory = os.path.join(tree.icon_dir, FALLBACK_ICON_THEME,
+                                 '256x256', 'apps')
+        names = [f'apps-{i % args.icons}' for i in range(args.rows)]
+
+        start = time.perf_counter()
+        baseline.load_icons([os.path.join(directory, f'{name}.png')
+                             for name in names], size)
+        legacy = time.perf_counter() - start
+
+        loader = IconLoader(lambda name, _: os.path.join(directory,
+                                                         f'{name}.png'))
+        loaded = []
+        loader.icon_loaded.connect(lambda name, _: loaded.append(name))
+        start = time.perf_counter()
+        for name in names:
+            loader.get(name, size)
+        blocked = time.perf_counter() - start
+        while len(loaded) < args.icons:
+            app.processEvents()
+        total = time.perf_counter() - start
+        missing = sum(loader.get(name, size) is None for name in names)
+
+    print(f'{args.rows} rows, {args.icons} distinct icons')
+    print(f'Synchronous (per row): {legacy * 1000:7.1f} ms on the GUI thread')
+    print(f'IconLoader:            {blocked * 1000:7.1f} ms on the GUI '
+          f'thread, all loaded after {total * 1000:.1f} ms '
+          f'({len(loaded)} decoded, {missing} missing)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark of the import time of `xdgprefs.core`.
+
+Imports the package in fresh interpreters with `python -X importtime`, and
+reports the best cumulative time of `xdgprefs.core`. Exits with an error if
+it exceeds the budget, or if the import loaded the GUI toolkit or the
+`xdg-mime` wrapper (which both should only be loaded when used).
+
+Usage: python benchmarks/bench_import.py [--budget MS] [--repeat R]
+"""
+
+
+import argparse
+import os
+import subprocess
+import sys
+
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+
+# Modules that must not be loaded by `import xdgprefs.core`
+FORBIDDEN = ['PySide6', 'xdgprefs.gui', 'xdgprefs.core.xdg_mime_wrapper',
+             'subprocess']
+
+
+def import_time(module):
+    """
+    Import a module in a new interpreter, and return its cumulative import
+    time (in microseconds) and the names of all the modules that were loaded.
+    """
+    code = f'import sys, {module}; print(" ".join(sys.modules))'
+    res = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                         cwd=ROOT, capture_output=True, text=True, check=True)
+    cumulative = None
+    for line in res.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        fields = line.split('|')
+        if len(fields) == 3 and fields[2].strip() == module:
+            cumulative = int(fields[1])
+    return cumulative, set(res.stdout.split())
+
+
+def main():
+    args = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    args.add_argument('--budget', type=float, default=20.0,
+                      help='maximum import time, in milliseconds')
+    args.add_argument('--repeat', type=int, default=5)
+    args = args.parse_args()
+
+    results = [import_time('xdgprefs.core') for _ in range(args.repeat)]
+    best = min(cumulative for cumulative, _ in results) / 1000
+    modules = results[0][1]
+    print(f'import xdgprefs.core: {best:.1f} ms (budget: {args.budget} ms)')
+
+    errors = []
+    if best > args.budget:
+        errors.append('the import time exceeds the budget')
+    for name in FORBIDDEN:
+        if name in modules:
+            errors.append(f'{name} was imported')
+    for error in errors:
+        print(f'Error: {error}')
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == '__main__':
+    main()
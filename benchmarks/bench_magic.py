@@ -0,0 +1,64 @@
+"""
+Benchmark of the content sniffing engine.
+
+Writes a directory of files starting with the headers of common formats
+(plus files that match nothing, see `xdg_tree.py`), and times
+`MimeDatabase.sniff_files` on them, serially and with threads. If the `file`
+command is available, its `--mime-type` output is timed as well, for
+reference.
+
+Usage: python benchmarks/bench_magic.py [--files N] [--workers W]
+"""
+
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from xdg_tree import HEADERS, temporary_tree  # noqa: E402
+from xdgprefs.core.mime_database import MimeDatabase  # noqa: E402
+
+
+def main():
+    args = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    args.add_argument('--files', type=int, default=5000)
+    args.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    args = args.parse_args()
+
+    mimedb = MimeDatabase()
+    start = time.perf_counter()
+    mimedb.sniff_data(b'')
+    load = time.perf_counter() - start
+    magic = mimedb.magic
+    n_sections = sum(len(sections) for sections in magic.sections.values())
+    print(f'Magic rules loaded in {load:.3f} s ({n_sections} sections, '
+          f'reading up to {magic.extent} bytes per file)')
+
+    # Only the files of the tree are used: the types are the system ones.
+    with temporary_tree(apps=0, mimetypes=0, samples=args.files) as tree:
+        paths = tree.sample_files
+        for workers in sorted({1, args.workers}):
+            start = time.perf_counter()
+            result = mimedb.sniff_files(paths, workers)
+            elapsed = time.perf_counter() - start
+            print(f'sniff_files ({workers} thread(s)): '
+                  f'{len(paths) / elapsed:,.0f} files/s')
+        for path, mimetype in list(zip(paths, result))[:len(HEADERS)]:
+            print(f'  {os.path.basename(path)}: {mimetype}')
+
+        if shutil.which('file'):
+            start = time.perf_counter()
+            subprocess.run(['file', '--mime-type', '-b'] + paths,
+                           stdout=subprocess.DEVNULL, check=False)
+            elapsed = time.perf_counter() - start
+            print(f'file --mime-type:        '
+                  f'{len(paths) / elapsed:,.0f} files/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark of the filename to MIME type resolution.
+
+Builds the MimeDatabase of this computer, and times `match_filename` on a
+list of filenames made from the known glob patterns (plus names that match
+nothing). If a `mime.cache` is available, its own matcher is timed as well,
+and both must find the same best types (the order of types with the same
+weight is not specified, as content sniffing should then be used).
+
+Usage: python benchmarks/bench_match_filename.py [--names N] [--repeat R]
+"""
+
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from xdgprefs.core.mime_database import MimeDatabase  # noqa: E402
+
+
+def filenames(mimedb, count):
+    """Return `count` filenames, most of them matching a known pattern."""
+    rng = random.Random(0)
+    patterns = [pattern for globs in mimedb.globs.globs.values()
+                for pattern in globs]
+    names = []
+    for i in range(count):
+        if i % 10 == 0:
+            names.append(f'unknown-file-{i}.zz{i}')
+            continue
+        pattern = rng.choice(patterns)
+        name = pattern.replace('*', f'file{i}').replace('?', 'x')
+        if '[' in name:
+            name = name.split('[')[0] + '1'
+        if i % 3 == 0:
+            name = name.upper()
+        names.append(name)
+    return names
+
+
+def best(matches):
+    """Return the set of types that have the highest weight."""
+    return {mimetype for mimetype, weight in matches
+            if weight == matches[0][1]}
+
+
+def timed(function, names, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for name in names:
+            function(name)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    args = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    args.add_argument('--names', type=int, default=100000)
+    args.add_argument('--repeat', type=int, default=3)
+    args = args.parse_args()
+
+    start = time.perf_counter()
+    mimedb = MimeDatabase()
+    mimedb.match_filename('')
+    build = time.perf_counter() - start
+    names = filenames(mimedb, args.names)
+
+    elapsed = timed(mimedb.match_filename, names, args.repeat)
+    print(f'Database built (with the glob index) in {build:.3f} s')
+    print(f'match_filename: {args.names / elapsed:,.0f} lookups/s')
+
+    caches = [layer.cache for layer in mimedb.layers
+              if layer.cache is not None]
+    if len(caches) == 1:
+        cache = caches[0]
+        different = [name for name in names
+                     if best(mimedb.match_filename(name))
+                     != best(cache.match_filename(name))]
+        elapsed = timed(cache.match_filename, names, args.repeat)
+        print(f'mime.cache:     {args.names / elapsed:,.0f} lookups/s')
+        print(f'Different best matches: {len(different)} / {len(names)}')
+        for name in different[:10]:
+            print(f'  {name}: {mimedb.match_filename(name)} vs '
+                  f'{cache.match_filename(name)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Memory footprint of the parsed Desktop Entries and MIME types.
+
+Parses a generated corpus of Desktop Entry files (see `xdg_tree.py`) and
+reports, with `tracemalloc`, the bytes per entry held by the DesktopEntries
+(with `__slots__` and flat dicts), by those of the projection mode, and by
+the original model of `baseline.py` (a `__dict__` per object, and nested
+defaultdicts). The bytes per MimeType are compared the same way.
+
+Usage: python benchmarks/bench_memory.py [--files N]
+"""
+
+
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import baseline  # noqa: E402
+from xdg_tree import desktop_file  # noqa: E402
+from xdgprefs.core import desktop_entry_parser as parser  # noqa: E402
+from xdgprefs.core.desktop_entry import DesktopEntry  # noqa: E402
+from xdgprefs.core.mime_type import MimeType  # noqa: E402
+
+
+def measure(build, items):
+    """
+    Return the memory (in bytes) held by the objects returned by `build`
+    for each item. Temporary allocations are not counted.
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = [build(*item) for item in items]
+    gc.collect()
+    held = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del result
+    return held
+
+
+def main():
+    args = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    args.add_argument('--files', type=int, default=1000)
+    args = args.parse_args()
+
+    texts = [(desktop_file(i), f'app{i}.desktop') for i in range(args.files)]
+    n_entries = sum(len(group.entries)
+                    for text, _ in texts
+                    for group in parser.parse_text(text).values())
+
+    legacy = measure(baseline.parse_desktop_entry, texts)
+    current = measure(lambda text, appid: DesktopEntry(
+        parser.parse_text(text), appid), texts)
+    projected = measure(lambda text, appid: DesktopEntry(
+        parser.parse_text(text, parser.SUMMARY_KEYS, frozenset()), appid),
+        texts)
+
+    fields = [('text', f'x-type{i}', f'Type number {i}', [f'*.t{i}'],
+               'text-x-generic', [f'text/x-alias{i}'], ['text/plain'])
+              for i in range(args.files)]
+    legacy_types = measure(baseline.MimeType, fields)
+    current_types = measure(MimeType, fields)
+
+    print(f'Corpus: {args.files} files, {n_entries} entries')
+    print('Desktop Entries:')
+    print(f'  Original model: {legacy / 1e6:6.2f} MB '
+          f'({legacy / n_entries:.0f} B/entry)')
+    print(f'  Slotted model:  {current / 1e6:6.2f} MB '
+          f'({current / n_entries:.0f} B/entry, '
+          f'x{legacy / current:.1f} smaller)')
+    print(f'  Projection:     {projected / 1e6:6.2f} MB '
+          f'({projected / args.files:.0f} B/file, '
+          f'x{legacy / projected:.1f} smaller)')
+    print('MIME types:')
+    print(f'  Original model: {legacy_types / args.files:.0f} B/type')
+    print(f'  Slotted model:  {current_types / args.files:.0f} B/type')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark of the startup of the GUI.
+
+Writes synthetic XDG trees (see `xdg_tree.py`) of increasing sizes, and
+measures the time until the main window is first painted, and until all the
+databases are loaded (with an empty snapshot cache). The original startup
+(`baseline.main_window`, which builds the databases one after the other,
+then the panels, before showing the window) is measured on the same data.
+Each measure runs in a new process, with the `offscreen` Qt platform.
+
+Usage: python benchmarks/bench_startup.py [--sizes N [N ...]]
+"""
+
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import baseline  # noqa: E402
+from xdg_tree import XdgTree  # noqa: E402
+
+
+def measure(implementation):
+    """Start the GUI, and print the times of the first paint and loading."""
+    os.environ['QT_QPA_PLATFORM'] = 'offscreen'
+    from PySide6.QtWidgets import QApplication
+    from xdgprefs.gui.main_window import MainWindow
+
+    app = QApplication([])
+    start = time.perf_counter()
+    if implementation == 'legacy':
+        window = baseline.main_window()
+        app.processEvents()
+        painted = loaded = time.perf_counter() - start
+    else:
+        window = MainWindow()
+        app.processEvents()
+        painted = time.perf_counter() - start
+        while window.progress.isVisible():
+            app.processEvents()
+            time.sleep(0.001)
+        loaded = time.perf_counter() - start
+    print(painted, loaded)
+    window.close()
+
+
+def main():
+    args = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    args.add_argument('--sizes', type=int, nargs='+',
+                      default=[100, 1000, 5000])
+    args.add_argument('--child', help=argparse.SUPPRESS)
+    args = args.parse_args()
+
+    if args.child:
+        measure(args.child)
+        return
+
+    print(f'{"apps":>6} {"before (paint/loaded)":>24} '
+          f'{"after (paint/loaded)":>24}')
+    for count in args.sizes:
+        root = tempfile.mkdtemp(prefix='bench-startup-')
+        try:
+            tree = XdgTree(root, apps=count, mimetypes=500).write()
+            env = dict(os.environ, **tree.env)
+            results = []
+            for implementation in ('legacy', 'background'):
+                # A new cache each time, so that nothing comes from a
+                # snapshot.
+                env['XDG_CACHE_HOME'] = tempfile.mkdtemp(dir=root)
+                res = subprocess.run([sys.executable, __file__, '--child',
+                                      implementation], env=env,
+                                     capture_output=True, text=True,
+                                     check=True)
+                painted, loaded = map(float, res.stdout.split())
+                results.append(f'{painted * 1000:8.0f} ms '
+                               f'{loaded * 1000:8.0f} ms')
+            print(f'{count:>6} {results[0]:>24} {results[1]:>24}')
+        finally:
+            shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
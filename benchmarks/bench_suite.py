@@ -0,0 +1,284 @@
+"""
+Benchmark suite of the core databases and parsers.
+
+Writes synthetic XDG trees (see `xdg_tree.py`) at several scales, and times
+on each of them:
+
+- the building of MimeDatabase, AppDatabase and AssociationsDatabase,
+  without snapshot, with an empty (cold) snapshot, and with an up-to-date
+  (warm) one, as at the first and next starts of the application;
+- `desktop_entry_parser.parse` (whole files, and the projection used by the
+  GUI) on all the Desktop Entry files, and `MimeTypeParser.parse` on all the
+  MIME type XML files.
+
+The best and median times are written as JSON, along with the commit and
+the machine, so that the runs on different commits can be compared:
+`--compare` reports the changes from a previous result file (and, with
+`--tolerance`, exits with an error if anything got slower than that).
+
+Usage: python benchmarks/bench_suite.py [--scales APPS:TYPES [...]]
+    [--repeat R] [--output FILE] [--compare BASELINE] [--tolerance PCT]
+"""
+
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from xdg_tree import temporary_tree  # noqa: E402
+from xdgprefs.core import MimeDatabase, AppDatabase, \
+    AssociationsDatabase  # noqa: E402
+from xdgprefs.core import desktop_entry_parser as parser  # noqa: E402
+from xdgprefs.core.mime_type import MimeTypeParser  # noqa: E402
+
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+
+# Format of the result files (see `--compare`)
+RESULTS_VERSION = 1
+
+# Snapshot modes
+NO_SNAPSHOT = None
+COLD = 'cold'
+WARM = 'warm'
+
+# (benchmark, variant, snapshot mode, function building the database)
+DATABASES = [
+    ('MimeDatabase', 'no snapshot', NO_SNAPSHOT,
+     lambda: MimeDatabase(use_snapshot=False)),
+    ('MimeDatabase', 'cold snapshot', COLD, MimeDatabase),
+    ('MimeDatabase', 'warm snapshot', WARM, MimeDatabase),
+    ('AppDatabase', 'no snapshot', NO_SNAPSHOT,
+     lambda: AppDatabase(use_snapshot=False)),
+    ('AppDatabase', 'cold snapshot', COLD, AppDatabase),
+    ('AppDatabase', 'warm snapshot', WARM, AppDatabase),
+    ('AppDatabase', 'summary', NO_SNAPSHOT,
+     lambda: AppDatabase(use_snapshot=False, keys=parser.SUMMARY_KEYS,
+                         locales=frozenset())),
+    ('AppDatabase', 'lazy', NO_SNAPSHOT, lambda: AppDatabase(lazy=True)),
+    ('AssociationsDatabase', 'no snapshot', NO_SNAPSHOT,
+     lambda: AssociationsDatabase(use_snapshot=False)),
+    ('AssociationsDatabase', 'cold snapshot', COLD, AssociationsDatabase),
+    ('AssociationsDatabase', 'warm snapshot', WARM, AssociationsDatabase),
+]
+
+
+def scale(text):
+    """Parse a scale, given as APPS:TYPES (e.g. 1000:500)."""
+    try:
+        apps, mimetypes = map(int, text.split(':'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'invalid scale: {text!r}')
+    return apps, mimetypes
+
+
+def git(*arguments):
+    """Return the output of a git command in the repository, or None."""
+    try:
+        res = subprocess.run(['git'] + list(arguments), cwd=ROOT,
+                             capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return res.stdout.strip()
+
+
+def machine():
+    """Describe the commit and the machine the benchmark runs on."""
+    status = git('status', '--porcelain', '--untracked-files=no')
+    return {
+        'commit': git('rev-parse', 'HEAD'),
+        'dirty': bool(status) if status is not None else None,
+        'date': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+@contextmanager
+def environment(variables):
+    """Set environment variables, and restore the environment afterwards."""
+    saved = dict(os.environ)
+    os.environ.update(variables)
+    try:
+        yield
+    finally:
+        os.environ.clear()
+        os.environ.update(saved)
+
+
+def time_runs(function, repeat, setup=None):
+    """Call `function` `repeat` times, and return the times (in seconds)."""
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def time_database(tree, build, mode, repeat):
+    """Time the building of a database, with the given snapshot mode."""
+    def new_cache():
+        # Snapshots are stored in XDG_CACHE_HOME (read when they are
+        # created): an empty directory gives an empty snapshot.
+        os.environ['XDG_CACHE_HOME'] = tempfile.mkdtemp(dir=tree.root)
+
+    if mode == COLD:
+        return time_runs(build, repeat, setup=new_cache)
+    new_cache()
+    if mode == WARM:
+        build()
+    return time_runs(build, repeat)
+
+
+def time_parsers(tree, repeat):
+    """Yield (benchmark, variant, files, times) for the parsers."""
+    apps = [(path, os.path.basename(path)) for path in tree.desktop_files]
+
+    def parse_all(keys=None, locales=None):
+        for path, name in apps:
+            parser.parse(path, name, keys, locales)
+
+    yield ('parser.parse', 'full', len(apps),
+           time_runs(parse_all, repeat))
+    yield ('parser.parse', 'summary', len(apps),
+           time_runs(lambda: parse_all(parser.SUMMARY_KEYS, frozenset()),
+                     repeat))
+    yield ('MimeTypeParser.parse', 'full', len(tree.mime_files),
+           time_runs(lambda: [MimeTypeParser.parse(path)
+                              for path in tree.mime_files], repeat))
+
+
+def run_scale(apps, mimetypes, options):
+    """Run all the benchmarks on a tree, and return the results."""
+    results = []
+
+    def add(benchmark, variant, times, files=None):
+        result = {
+            'apps': apps,
+            'mimetypes': mimetypes,
+            'benchmark': benchmark,
+            'variant': variant,
+            'best': min(times),
+            'median': statistics.median(times),
+            'runs': times,
+        }
+        if files is not None:
+            result['files'] = files
+        results.append(result)
+        print(f'{apps:>6} {mimetypes:>6}  {benchmark:<21} {variant:<14}'
+              f'{min(times) * 1000:10.1f} ms', file=sys.stderr)
+
+    with temporary_tree(apps=apps, mimetypes=mimetypes,
+                        data_dirs=options.data_dirs,
+                        translated=options.translated,
+                        seed=options.seed) as tree:
+        with environment(tree.env):
+            for benchmark, variant, mode, build in DATABASES:
+                add(benchmark, variant,
+                    time_database(tree, build, mode, options.repeat))
+            for benchmark, variant, files, times in time_parsers(
+                    tree, options.repeat):
+                add(benchmark, variant, times, files)
+    return results
+
+
+def key(result):
+    return (result['apps'], result['mimetypes'], result['benchmark'],
+            result['variant'])
+
+
+def compare(results, baseline, tolerance):
+    """
+    Print the changes from the baseline results.
+
+    :return: The number of benchmarks slower than the tolerance (in %).
+    """
+    previous = {key(result): result['best'] for result in baseline['results']}
+    print(f'Compared with {baseline["machine"]["commit"]} '
+          f'({baseline["machine"]["date"]}):', file=sys.stderr)
+    regressions = 0
+    for result in results:
+        before = previous.get(key(result))
+        if before is None:
+            continue
+        change = (result['best'] - before) / before * 100
+        slower = tolerance is not None and change > tolerance
+        regressions += slower
+        apps, mimetypes, benchmark, variant = key(result)
+        print(f'{apps:>6} {mimetypes:>6}  {benchmark:<21} {variant:<14}'
+              f'{before * 1000:10.1f} ms -> {result["best"] * 1000:8.1f} ms '
+              f'{change:+7.1f} %{"  SLOWER" if slower else ""}',
+              file=sys.stderr)
+    return regressions
+
+
+def main():
+    args = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    args.add_argument('--scales', type=scale, nargs='+',
+                      default=[(100, 100), (1000, 500), (5000, 1000)],
+                      help='numbers of applications and MIME types, as '
+                           'APPS:TYPES')
+    args.add_argument('--repeat', type=int, default=5)
+    args.add_argument('--data-dirs', type=int, default=3)
+    args.add_argument('--translated', type=float, default=0.6)
+    args.add_argument('--seed', type=int, default=0)
+    args.add_argument('--output', help='file where the results are written '
+                                       '(by default, the standard output)')
+    args.add_argument('--compare', metavar='BASELINE',
+                      help='results of a previous run to compare with')
+    args.add_argument('--tolerance', type=float,
+                      help='with --compare, fail if a benchmark is slower by '
+                           'more than this percentage')
+    args = args.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get('version') != RESULTS_VERSION:
+            sys.exit(f'{args.compare}: unsupported results format')
+
+    print(f'{"apps":>6} {"types":>6}  {"benchmark":<21} {"variant":<14}'
+          f'{"best":>13}', file=sys.stderr)
+    results = []
+    for apps, mimetypes in args.scales:
+        results += run_scale(apps, mimetypes, args)
+
+    output = {
+        'version': RESULTS_VERSION,
+        'machine': machine(),
+        'options': {'repeat': args.repeat, 'data_dirs': args.data_dirs,
+                    'translated': args.translated, 'seed': args.seed},
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(output, f, indent=2)
+            f.write('\n')
+    else:
+        json.dump(output, sys.stdout, indent=2)
+        print()
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            sys.exit(f'Error: {regressions} benchmark(s) slower than '
+                     f'{args.tolerance} %')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,473 @@
+"""
+Generator of synthetic XDG trees, for the benchmarks.
+
+Writes a fake XDG root, laid out as on a desktop:
+
+    root/
+        config/                 XDG_CONFIG_HOME: mimeapps.list (and the ones
+                                of the desktops)
+        etc0/ ...               XDG_CONFIG_DIRS: mimeapps.list
+        home/                   XDG_DATA_HOME: applications/mimeapps.list
+        data0/ ...              XDG_DATA_DIRS:
+            applications/       Desktop Entry files (some in a vendor
+                                subdirectory), mimeinfo.cache, mimeapps.list
+            mime/<MEDIA>/       MIME type XML files
+            icons/              icon themes (only in data0, if `icons`)
+        cache/                  XDG_CACHE_HOME (for the snapshots)
+        files/                  files to sniff (if `samples`)
+
+The applications and the MIME types are spread over the data directories,
+the first one (as /usr/share) getting most of them. As on a real system,
+part of the applications and types are translated in most of the locales,
+and the others in a few, or none; a few MIME types are associated with many
+applications. The content only depends on the options (and `seed`), so
+that two trees written with the same options are the same.
+
+The same MIME types can also be built in memory (see `mime_types`), for the
+benchmarks of the GUI that do not read them.
+
+Used as a module by the other benchmarks, e.g.:
+
+    with temporary_tree(apps=1000, mimetypes=500) as tree:
+        os.environ.update(tree.env)
+        ...
+
+It can also be run to write a tree, and print its variables.
+
+Usage: python benchmarks/xdg_tree.py ROOT [--apps N] [--mimetypes M]
+    [--data-dirs D] [--translated F]
+"""
+
+
+import argparse
+import colorsys
+import os
+import random
+import shlex
+import shutil
+import struct
+import tempfile
+import zlib
+from collections import defaultdict
+from contextlib import contextmanager
+
+
+LOCALES = ['af', 'ar', 'as', 'ast', 'be', 'bg', 'bn', 'br', 'bs', 'ca',
+           'ca@valencia', 'cs', 'cy', 'da', 'de', 'el', 'en_GB', 'eo', 'es',
+           'et', 'eu', 'fa', 'fi', 'fr', 'ga', 'gl', 'gu', 'he', 'hi', 'hr',
+           'hu', 'id', 'is', 'it', 'ja', 'ka', 'kk', 'km', 'kn', 'ko', 'lt',
+           'lv', 'mk', 'ml', 'mr', 'ms', 'nb', 'nl', 'nn', 'oc', 'pa', 'pl',
+           'pt', 'pt_BR', 'ro', 'ru', 'sk', 'sl', 'sr', 'sv', 'ta', 'te',
+           'th', 'tr', 'uk', 'vi', 'zh_CN', 'zh_TW']
+
+# Real types, that come first (and are the most popular ones)
+COMMON_TYPES = ['text/plain', 'text/html', 'image/png', 'image/jpeg',
+                'application/pdf', 'audio/mpeg', 'video/mp4',
+                'application/zip', 'text/x-csrc', 'inode/directory']
+
+MEDIA = ['application', 'text', 'image', 'audio', 'video', 'font', 'model']
+
+XMLNS = 'http://www.freedesktop.org/standards/shared-mime-info'
+
+# MIME types of `desktop_file`, by default
+DESKTOP_MIMETYPES = ('text/plain', 'text/x-csrc', 'image/png',
+                     'application/pdf')
+
+# Share of the applications (and types) in the first data directory
+MAIN_DIR_SHARE = 0.8
+
+# Icon themes: a theme of SVG icons, inheriting from a theme of PNG ones
+ICON_THEME = 'Synthetic'
+FALLBACK_ICON_THEME = 'hicolor'
+ICON_SIZES = [16, 22, 24, 32, 48, 64, 96, 128, 256]
+ICON_CONTEXTS = ['actions', 'apps', 'categories', 'devices', 'emblems',
+                 'mimetypes', 'places', 'status']
+
+# Beginnings of the files to sniff: common formats, and plain text
+HEADERS = [
+    b'\x89PNG\r\n\x1a\n\0\0\0\rIHDR',
+    b'%PDF-1.7\n',
+    b'#!/bin/sh\necho hello\n',
+    b'PK\x03\x04\x14\0\0\0\x08\0',
+    b'\x1f\x8b\x08\0\0\0\0\0',
+    b'\x7fELF\x02\x01\x01\0',
+    b'<?xml version="1.0"?>\n<svg xmlns="http://www.w3.org/2000/svg">',
+    b'GIF89a\x01\0\x01\0',
+    b'\xff\xd8\xff\xe0\0\x10JFIF\0',
+    b'just some text, nothing to see here\n',
+]
+
+
+def desktop_file(index, locales=LOCALES, mimetypes=DESKTOP_MIMETYPES):
+    """
+    Return the content of a Desktop Entry file, translated in `locales`
+    (with a desktop action).
+    """
+    lines = ['# Generated for the benchmark', '[Desktop Entry]',
+             'Type=Application', f'Name=Application {index}']
+    lines += [f'Name[{locale}]=Application {index} ({locale})'
+              for locale in locales]
+    lines.append(f'Comment=Does things number {index}')
+    lines += [f'Comment[{locale}]=Fait des choses {index} ({locale})'
+              for locale in locales]
+    lines += [f'Keywords[{locale}]=k1;k2;k3;' for locale in locales]
+    lines.append('X-Escaped=a\\;b;c;')
+    lines += [f'Exec=app{index} %U', f'Icon=app{index}', 'Terminal=false',
+              'Categories=Utility;Development;',
+              f'MimeType={"".join(m + ";" for m in mimetypes)}',
+              'StartupNotify=true', 'Actions=new-window;', '',
+              '[Desktop Action new-window]', 'Name=New Window']
+    lines += [f'Name[{locale}]=New Window ({locale})' for locale in locales]
+    lines.append(f'Exec=app{index} --new-window')
+    return '\n'.join(lines) + '\n'
+
+
+def mime_identifiers(count):
+    """Return the identifiers of the first `count` MIME types of a tree."""
+    identifiers = COMMON_TYPES[:count]
+    identifiers += [f'{MEDIA[i % len(MEDIA)]}/x-synthetic-{i}'
+                    for i in range(len(identifiers), count)]
+    return identifiers
+
+
+def mime_fields(identifier, index):
+    """
+    Return the fields of a MIME type, as a dict of the arguments of
+    MimeType (its comment is the untranslated one).
+    """
+    media, subtype = identifier.split('/')
+    parent = 'text/plain' if media == 'text' else 'application/octet-stream'
+    return {
+        'comment': f'{subtype} document',
+        'extensions': [f'*.{subtype.split("-")[-1]}', f'*.t{index}'],
+        'icon': f'{media}-x-generic',
+        'aliases': [f'{media}/x-alias{index}'] if index % 10 == 3 else [],
+        'parents': [parent] if identifier != parent else [],
+    }
+
+
+def mime_file(identifier, index, locales=LOCALES):
+    """
+    Return the content of a MIME type XML file (as written by
+    `update-mime-database`), with its comment translated in `locales`.
+    """
+    subtype = identifier.split('/')[1]
+    fields = mime_fields(identifier, index)
+    lines = ['<?xml version="1.0" encoding="utf-8"?>',
+             f'<mime-type xmlns="{XMLNS}" type="{identifier}">',
+             f'  <comment>{fields["comment"]}</comment>']
+    lines += [f'  <comment xml:lang="{locale}">{subtype} ({locale})</comment>'
+              for locale in locales]
+    lines += [f'  <alias type="{alias}"/>' for alias in fields['aliases']]
+    lines += [f'  <sub-class-of type="{parent}"/>'
+              for parent in fields['parents']]
+    lines.append(f'  <generic-icon name="{fields["icon"]}"/>')
+    lines += [f'  <glob pattern="{glob}"/>' for glob in fields['extensions']]
+    lines.append('</mime-type>')
+    return '\n'.join(lines) + '\n'
+
+
+def mime_types(count):
+    """
+    Return the first `count` MIME types of a tree as MimeType objects, by
+    identifier, without writing them.
+    """
+    from xdgprefs.core.mime_type import MimeType
+    types = {}
+    for index, identifier in enumerate(mime_identifiers(count)):
+        media, subtype = identifier.split('/')
+        types[identifier] = MimeType(media, subtype,
+                                     **mime_fields(identifier, index))
+    return types
+
+
+def mimeapps_file(sections):
+    """Return the content of a `mimeapps.list` file, from {section: {...}}."""
+    lines = []
+    for section, associations in sections.items():
+        if associations:
+            lines.append(f'[{section}]')
+            lines += [f'{mimetype}={"".join(app + ";" for app in apps)}'
+                      for mimetype, apps in associations.items()]
+    return '\n'.join(lines) + '\n'
+
+
+def png_image(size, color):
+    """Return a PNG image of `size` x `size` pixels, filled with `color`."""
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data \
+            + struct.pack('>I', zlib.crc32(kind + data))
+
+    rows = (b'\0' + bytes(color) * size) * size
+    return b'\x89PNG\r\n\x1a\n' \
+        + chunk(b'IHDR', struct.pack('>IIBBBBB', size, size, 8, 2, 0, 0, 0)) \
+        + chunk(b'IDAT', zlib.compress(rows)) + chunk(b'IEND', b'')
+
+
+def svg_image(size, color):
+    """Return an SVG image of `size` x `size` pixels, filled with `color`."""
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" width="{size}" '
+            f'height="{size}"><rect width="100%" height="100%" '
+            f'fill="#{bytes(color).hex()}"/></svg>\n').encode()
+
+
+def icon_color(index):
+    """Return the (R, G, B) color of the icons number `index`."""
+    rgb = colorsys.hsv_to_rgb(index * 37 % 360 / 360, 0.8, 0.8)
+    return tuple(round(c * 255) for c in rgb)
+
+
+def write_icon_theme(base_dir, name, inherits, icons, extension,
+                     images=False):
+    """
+    Write an icon theme in `base_dir`, with a Fixed directory for each size
+    and context, each holding `icons` icons (`<context>-<N><extension>`).
+
+    :param images: If True, the icons are images of the size of their
+        directory, of a color depending on N (if False, they are empty).
+    """
+    directories = [(f'{size}x{size}/{context}', size)
+                   for size in ICON_SIZES for context in ICON_CONTEXTS]
+    theme_dir = os.path.join(base_dir, name)
+    os.makedirs(theme_dir)
+    with open(os.path.join(theme_dir, 'index.theme'), 'w') as f:
+        f.write(f'[Icon Theme]\nName={name}\nInherits={inherits}\n'
+                f'Directories={",".join(d for d, _ in directories)}\n\n')
+        for directory, size in directories:
+            f.write(f'[{directory}]\nSize={size}\nType=Fixed\n\n')
+    image = png_image if extension == '.png' else svg_image
+    for directory, size in directories:
+        os.makedirs(os.path.join(theme_dir, directory))
+        context = directory.split('/')[1]
+        for i in range(icons):
+            path = os.path.join(theme_dir, directory,
+                                f'{context}-{i}{extension}')
+            with open(path, 'wb') as f:
+                if images:
+                    f.write(image(size, icon_color(i)))
+
+
+class XdgTree(object):
+    """
+    A synthetic XDG tree, written in `root` (see the module).
+
+    `env` holds the XDG variables pointing to the tree; `desktop_files`,
+    `mime_files` and `sample_files` list the paths of the files that were
+    written.
+    """
+
+    def __init__(self, root, apps=1000, mimetypes=500, data_dirs=3,
+                 config_dirs=1, desktops=('gnome',), translated=0.6,
+                 icons=0, icon_images=False, samples=0, seed=0):
+        """
+        :param root: The directory where the tree is written.
+        :param apps: The number of Desktop Entry files.
+        :param mimetypes: The number of MIME type XML files.
+        :param data_dirs: The number of XDG_DATA_DIRS directories.
+        :param config_dirs: The number of XDG_CONFIG_DIRS directories.
+        :param desktops: The names in XDG_CURRENT_DESKTOP; each has its own
+            `<desktop>-mimeapps.list` files.
+        :param translated: The share of the applications and types that are
+            translated in most of the locales (the others are in a few).
+        :param icons: The number of icons in each directory of the icon
+            themes (ICON_THEME, and FALLBACK_ICON_THEME that it inherits
+            from), written if not 0.
+        :param icon_images: If True, the icons are images (see
+            `write_icon_theme`), instead of empty files.
+        :param samples: The number of files to sniff, starting with one of
+            the HEADERS.
+        :param seed: The seed of the pseudo-random choices.
+        """
+        self.root = root
+        self.apps = apps
+        self.mimetypes = mimetypes
+        self.data_dirs = [os.path.join(root, f'data{i}')
+                          for i in range(data_dirs)]
+        self.config_dirs = [os.path.join(root, f'etc{i}')
+                            for i in range(config_dirs)]
+        self.data_home = os.path.join(root, 'home')
+        self.config_home = os.path.join(root, 'config')
+        self.cache_home = os.path.join(root, 'cache')
+        self.desktops = list(desktops)
+        self.translated = translated
+        self.icons = icons
+        self.icon_images = icon_images
+        self.icon_dir = os.path.join(self.data_dirs[0], 'icons')
+        self.samples = samples
+        self.seed = seed
+        self.desktop_files = []
+        self.mime_files = []
+        self.sample_files = []
+
+    @property
+    def env(self):
+        """The XDG variables pointing to the tree."""
+        return {
+            'XDG_DATA_HOME': self.data_home,
+            'XDG_DATA_DIRS': os.pathsep.join(self.data_dirs),
+            'XDG_CONFIG_HOME': self.config_home,
+            'XDG_CONFIG_DIRS': os.pathsep.join(self.config_dirs),
+            'XDG_CACHE_HOME': self.cache_home,
+            'XDG_CURRENT_DESKTOP': ','.join(self.desktops),
+        }
+
+    def write(self):
+        """Write the whole tree, and return it."""
+        rand = random.Random(self.seed)
+        for path in [self.data_home, self.config_home, self.cache_home] \
+                + self.data_dirs + self.config_dirs:
+            os.makedirs(path, exist_ok=True)
+        identifiers = self._write_mime_types(rand)
+        appids = self._write_apps(rand, identifiers)
+        self._write_mimeapps(rand, identifiers, appids)
+        if self.icons:
+            write_icon_theme(self.icon_dir, ICON_THEME, FALLBACK_ICON_THEME,
+                             self.icons, '.svg', self.icon_images)
+            write_icon_theme(self.icon_dir, FALLBACK_ICON_THEME, '',
+                             self.icons, '.png', self.icon_images)
+        if self.samples:
+            self._write_samples()
+        return self
+
+    def _locales(self, rand):
+        """Pick the locales of a file (most of them, or a few)."""
+        if rand.random() < self.translated:
+            count = rand.randint(len(LOCALES) // 2, len(LOCALES))
+        else:
+            count = rand.choice([0, 0, 1, 2, 3, 5])
+        return rand.sample(LOCALES, count)
+
+    def _data_dir(self, rand):
+        """Pick the data directory of a file."""
+        if len(self.data_dirs) == 1 or rand.random() < MAIN_DIR_SHARE:
+            return self.data_dirs[0]
+        return rand.choice(self.data_dirs[1:])
+
+    def _write_mime_types(self, rand):
+        identifiers = mime_identifiers(self.mimetypes)
+        for index, identifier in enumerate(identifiers):
+            media, subtype = identifier.split('/')
+            media_dir = os.path.join(self._data_dir(rand), 'mime', media)
+            os.makedirs(media_dir, exist_ok=True)
+            path = os.path.join(media_dir, f'{subtype}.xml')
+            with open(path, 'w') as f:
+                f.write(mime_file(identifier, index, self._locales(rand)))
+            self.mime_files.append(path)
+        return identifiers
+
+    def _write_apps(self, rand, identifiers):
+        """
+        Write the Desktop Entry files, and the `mimeinfo.cache` of each
+        data directory (listing the types of its applications).
+        """
+        # The first types are declared by many applications.
+        weights = [1 / (i + 1) for i in range(len(identifiers))]
+        caches = defaultdict(lambda: defaultdict(list))
+        appids = []
+        for index in range(self.apps):
+            data_dir = self._data_dir(rand)
+            app_dir = os.path.join(data_dir, 'applications')
+            # As in `applications/kde4`, giving `vendor-app<N>.desktop`.
+            if index % 20 == 19:
+                app_dir = os.path.join(app_dir, 'vendor')
+                appid = f'vendor-app{index}.desktop'
+            else:
+                appid = f'app{index}.desktop'
+            os.makedirs(app_dir, exist_ok=True)
+            mimetypes = []
+            if identifiers:
+                mimetypes = list(dict.fromkeys(rand.choices(
+                    identifiers, weights, k=rand.randint(1, 8))))
+            path = os.path.join(app_dir, f'app{index}.desktop')
+            with open(path, 'w') as f:
+                f.write(desktop_file(index, self._locales(rand), mimetypes))
+            self.desktop_files.append(path)
+            appids.append(appid)
+            for mimetype in mimetypes:
+                caches[data_dir][mimetype].append(appid)
+        for data_dir, associations in caches.items():
+            path = os.path.join(data_dir, 'applications', 'mimeinfo.cache')
+            with open(path, 'w') as f:
+                f.write(mimeapps_file({'MIME Cache': associations}))
+        return appids
+
+    def _write_mimeapps(self, rand, identifiers, appids):
+        """
+        Write the `mimeapps.list` files: the user's (with many defaults), and
+        fewer ones in the system directories.
+        """
+        if not identifiers or not appids:
+            return
+
+        def sections(count):
+            types = rand.sample(identifiers, min(count, len(identifiers)))
+            third = len(types) // 3
+            return {
+                'Default Applications': {
+                    mimetype: rand.sample(appids, min(2, len(appids)))
+                    for mimetype in types},
+                'Added Associations': {
+                    mimetype: rand.sample(appids, min(3, len(appids)))
+                    for mimetype in types[:third]},
+                'Removed Associations': {
+                    mimetype: [rand.choice(appids)]
+                    for mimetype in types[third:2 * third:4]},
+            }
+
+        prefixes = [desktop.lower() + '-' for desktop in self.desktops]
+        files = [(self.config_home, 60)]
+        files += [(directory, 20) for directory in self.config_dirs]
+        files += [(os.path.join(self.data_home, 'applications'), 10)]
+        files += [(os.path.join(directory, 'applications'), 20)
+                  for directory in self.data_dirs]
+        for directory, count in files:
+            os.makedirs(directory, exist_ok=True)
+            for prefix in prefixes + ['']:
+                path = os.path.join(directory, prefix + 'mimeapps.list')
+                with open(path, 'w') as f:
+                    f.write(mimeapps_file(sections(count)))
+
+    def _write_samples(self):
+        """Write the files to sniff, with some padding after the headers."""
+        directory = os.path.join(self.root, 'files')
+        os.makedirs(directory)
+        padding = bytes(range(256)) * 16
+        for i in range(self.samples):
+            path = os.path.join(directory, f'file{i}')
+            with open(path, 'wb') as f:
+                f.write(HEADERS[i % len(HEADERS)] + padding)
+            self.sample_files.append(path)
+
+
+@contextmanager
+def temporary_tree(**options):
+    """
+    Write an XdgTree (with `options`) in a temporary directory, removed
+    afterwards.
+    """
+    root = tempfile.mkdtemp(prefix='bench-xdg-')
+    try:
+        yield XdgTree(root, **options).write()
+    finally:
+        shutil.rmtree(root)
+
+
+def main():
+    args = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    args.add_argument('root')
+    args.add_argument('--apps', type=int, default=1000)
+    args.add_argument('--mimetypes', type=int, default=500)
+    args.add_argument('--data-dirs', type=int, default=3)
+    args.add_argument('--translated', type=float, default=0.6)
+    args.add_argument('--seed', type=int, default=0)
+    args = args.parse_args()
+
+    tree = XdgTree(os.path.abspath(args.root), apps=args.apps,
+                   mimetypes=args.mimetypes, data_dirs=args.data_dirs,
+                   translated=args.translated, seed=args.seed).write()
+    for name, value in tree.env.items():
+        print(f'export {name}={shlex.quote(value)}')
+
+
+if __name__ == '__main__':
+    main()
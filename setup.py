@@ -16,6 +16,9 @@ setup(
     entry_points={
         'gui_scripts': [
             'xdg-prefs = xdgprefs.__main__:main'
+        ],
+        'console_scripts': [
+            'xdg-prefs-cli = xdgprefs.cli:main'
         ]
     },
 
@@ -1,2 +1,20 @@
-from . import core
-from . import gui
+"""
+The `core` and `gui` subpackages are imported on first access, so that
+importing `xdgprefs.core` does not load the GUI toolkit.
+"""
+
+
+import importlib
+
+
+__all__ = ['core', 'gui']
+
+
+def __getattr__(name):
+    if name in __all__:
+        return importlib.import_module(f'{__name__}.{name}')
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
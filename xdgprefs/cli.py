@@ -0,0 +1,313 @@
+"""
+Command-line interface of the xdg-prefs software, which does not need a
+display (nor Qt).
+
+Each subcommand only builds the databases it needs, and imports them when it
+is run, so that simple queries start quickly.
+
+Usage: xdg-prefs-cli [--json] <command> [arguments]
+"""
+
+
+import argparse
+import fnmatch
+import json
+import logging
+import os
+import sys
+
+
+logger = logging.getLogger('CLI')
+
+
+def _app_database(lazy=False):
+    from xdgprefs.core.app_database import AppDatabase
+    from xdgprefs.core.desktop_entry_parser import SUMMARY_KEYS
+    return AppDatabase(lazy=lazy, keys=SUMMARY_KEYS, locales=frozenset())
+
+
+def _associations_database(appdb=None):
+    from xdgprefs.core.associations_database import AssociationsDatabase
+    return AssociationsDatabase(appdb=appdb)
+
+
+def _mime_database():
+    from xdgprefs.core.mime_database import MimeDatabase
+    return MimeDatabase()
+
+
+def _output(args, data, lines):
+    """Print `data` as JSON, or `lines` as text."""
+    if args.json:
+        json.dump(data, sys.stdout, indent=2)
+        print()
+    else:
+        for line in lines:
+            print(line)
+
+
+def cmd_query(args):
+    """
+    Print the default application of MIME types (or of files). Exits with 1
+    if one of them has no default application.
+    """
+    mimetypes = args.targets
+    if args.file:
+        mimedb = _mime_database()
+        mimetypes = []
+        for path in args.targets:
+            matches = mimedb.match_filename(path)
+            mimetype = matches[0][0] if matches else None
+            if os.path.isfile(path) and (mimetype is None or len(matches) > 1):
+                try:
+                    mimetype = mimedb.sniff(path) or mimetype
+                except OSError as e:
+                    logger.warning(f'Could not read {path}: {e}')
+            mimetypes.append(mimetype)
+    assocdb = _associations_database(_app_database(lazy=True))
+    result = {}
+    found = True
+    for target, mimetype in zip(args.targets, mimetypes):
+        app = assocdb.get_default_app(mimetype) if mimetype else None
+        found = found and app is not None
+        result[target] = {'mimetype': mimetype, 'app': app} if args.file \
+            else app
+    if args.file:
+        lines = [f'{target}\t{value["mimetype"] or "-"}\t'
+                 f'{value["app"] or "-"}' for target, value in result.items()]
+    else:
+        lines = [f'{target}\t{app or "-"}' for target, app in result.items()]
+    _output(args, result, lines)
+    return 0 if found else 1
+
+
+def cmd_set(args):
+    """Set the default application of MIME types."""
+    appdb = _app_database(lazy=True)
+    if not args.force and not appdb.is_installed(args.app):
+        logger.error(f'{args.app} is not installed (use --force to set it '
+                     f'anyway)')
+        return 1
+    assocdb = _associations_database(appdb)
+    with assocdb.batch() as report:
+        for mimetype in args.mimetypes:
+            assocdb.set_app_for_mimetype(mimetype, args.app)
+    return _print_report(args, report)
+
+
+def cmd_list_apps(args):
+    """List the installed applications."""
+    appdb = _app_database()
+    if args.mimetype:
+        appids = sorted(appdb.get_apps_for_mimetype(args.mimetype))
+    else:
+        appids = sorted(appdb.apps)
+    apps = [appdb.get_app(appid) for appid in appids]
+    apps = [app for app in apps
+            if app is not None and (args.all or app.hidden is not True)]
+    data = [{'id': app.appid, 'name': app.name,
+             'mimetypes': list(app.mime_type or [])} for app in apps]
+    lines = [f'{app.appid}\t{app.name}' for app in apps]
+    _output(args, data, lines)
+    return 0
+
+
+def cmd_list_types(args):
+    """List the known MIME types."""
+    mimedb = _mime_database()
+    identifiers = sorted(mimedb.types)
+    if args.pattern:
+        identifiers = fnmatch.filter(identifiers, args.pattern)
+    if args.long:
+        types = [mimedb.types[identifier] for identifier in identifiers]
+        data = [{'id': t.identifier, 'comment': t.comment,
+                 'extensions': list(t.extensions or [])} for t in types]
+        lines = [f'{t.identifier}\t{t.comment}' for t in types]
+    else:
+        data = identifiers
+        lines = identifiers
+    _output(args, data, lines)
+    return 0
+
+
+def cmd_export(args):
+    """Export the associations of the user `mimeapps.list` as JSON."""
+    from xdgprefs.core.associations_database import MIMEAPPS_SECTIONS
+    assocdb = _associations_database()
+    if assocdb.config is None:
+        logger.error(f'{assocdb.config_path} is badly formatted')
+        return 1
+    data = {section: {mimetype: list(apps) for mimetype, apps
+                      in assocdb.config.items(section)}
+            for section in MIMEAPPS_SECTIONS
+            if assocdb.config.has_section(section)}
+    if args.output and args.output != '-':
+        with open(args.output, 'w') as f:
+            json.dump(data, f, indent=2)
+            f.write('\n')
+    else:
+        json.dump(data, sys.stdout, indent=2)
+        print()
+    return 0
+
+
+def cmd_import(args):
+    """
+    Import associations (exported with `export`), in a single write. The
+    whole document is checked first: if it is not valid, nothing is written.
+    """
+    from xdgprefs.core.associations_database import ADDED, REMOVED, DEFAULT
+    if args.input == '-':
+        data = json.load(sys.stdin)
+    else:
+        with open(args.input) as f:
+            data = json.load(f)
+    error = _check_import(data)
+    if error is not None:
+        logger.error(f'Invalid associations: {error}')
+        return 1
+    appdb = _app_database(lazy=True)
+    if not args.force:
+        # Removing the association of an uninstalled app is allowed
+        missing = sorted({app for section in (DEFAULT, ADDED)
+                          for apps in data.get(section, {}).values()
+                          for app in apps if not appdb.is_installed(app)})
+        if missing:
+            logger.error(f'{", ".join(missing)} not installed (use --force '
+                         f'to import anyway)')
+            return 1
+    assocdb = _associations_database(appdb)
+    with assocdb.batch() as report:
+        for mimetype, apps in data.get(DEFAULT, {}).items():
+            # Each app is put first: the first one must be set last
+            for app in reversed(apps):
+                assocdb.set_app_for_mimetype(mimetype, app)
+        for mimetype, apps in data.get(ADDED, {}).items():
+            for app in apps:
+                assocdb.add_app_for_mimetype(mimetype, app)
+        for mimetype, apps in data.get(REMOVED, {}).items():
+            for app in apps:
+                assocdb.remove_app_for_mimetype(mimetype, app)
+    return _print_report(args, report)
+
+
+def _check_import(data):
+    """
+    Check a document to import: an object whose keys are sections of
+    `mimeapps.list`, each mapping MIME types to lists of application IDs.
+
+    :return: The description of the first error, or None if it is valid.
+    """
+    from xdgprefs.core.associations_database import MIMEAPPS_SECTIONS
+    if not isinstance(data, dict):
+        return 'the document must be an object'
+    for section, associations in data.items():
+        if section not in MIMEAPPS_SECTIONS:
+            return f'unknown section "{section}"'
+        if not isinstance(associations, dict):
+            return f'[{section}] must be an object'
+        for mimetype, apps in associations.items():
+            if '/' not in mimetype:
+                return f'[{section}] {mimetype} is not a MIME type'
+            if not isinstance(apps, list) \
+                    or not all(isinstance(app, str) and app for app in apps):
+                return f'[{section}] {mimetype} must be a list of ' \
+                       f'application IDs'
+    return None
+
+
+def _print_report(args, report):
+    """Print the report of a batch, and return the exit code."""
+    data = {'success': report.success,
+            'error': str(report.error) if report.error else None,
+            'failed': len(report.failed),
+            'changes': [{'action': change.action,
+                         'mimetype': change.mimetype,
+                         'app': change.app,
+                         'status': change.status,
+                         'error': str(change.error) if change.error else None}
+                        for change in report]}
+    lines = [f'{change.status}\t{change.action}\t{change.mimetype}\t'
+             f'{change.app}' for change in report]
+    _output(args, data, lines)
+    for change in report.failed:
+        logger.error(f'Could not {change.action} {change.app} for '
+                     f'{change.mimetype}: {change.error}')
+    return 0 if report.success else 1
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='xdg-prefs-cli',
+        description='View and change the default applications, without a '
+                    'graphical interface.')
+    parser.add_argument('--json', action='store_true',
+                        help='print the results as JSON')
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help='print debug logs')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    query = commands.add_parser('query', help='print the default '
+                                'application of MIME types')
+    query.add_argument('targets', nargs='+', metavar='MIMETYPE')
+    query.add_argument('-f', '--file', action='store_true',
+                       help='the targets are files, whose MIME type is '
+                            'detected from their name (and content)')
+    query.set_defaults(function=cmd_query)
+
+    set_ = commands.add_parser('set', help='set the default application '
+                               'of MIME types')
+    set_.add_argument('app', help='the ID of the application, e.g. '
+                                  'gimp.desktop')
+    set_.add_argument('mimetypes', nargs='+', metavar='MIMETYPE')
+    set_.add_argument('--force', action='store_true',
+                      help='set the application even if it is not installed')
+    set_.set_defaults(function=cmd_set)
+
+    list_apps = commands.add_parser('list-apps',
+                                    help='list the installed applications')
+    list_apps.add_argument('-m', '--mimetype',
+                           help='only the applications that can open it')
+    list_apps.add_argument('-a', '--all', action='store_true',
+                           help='include the hidden applications')
+    list_apps.set_defaults(function=cmd_list_apps)
+
+    list_types = commands.add_parser('list-types',
+                                     help='list the known MIME types')
+    list_types.add_argument('pattern', nargs='?',
+                            help='a glob pattern, e.g. "image/*"')
+    list_types.add_argument('-l', '--long', action='store_true',
+                            help='print the description of each type')
+    list_types.set_defaults(function=cmd_list_types)
+
+    export = commands.add_parser('export', help='export the associations '
+                                 'of the user as JSON')
+    export.add_argument('-o', '--output', help='the output file (default: '
+                                               'stdout)')
+    export.set_defaults(function=cmd_export)
+
+    import_ = commands.add_parser('import', help='import associations '
+                                  '(exported with `export`)')
+    import_.add_argument('input', help='the JSON file ("-" for stdin)')
+    import_.add_argument('--force', action='store_true',
+                         help='import the associations even if some '
+                              'applications are not installed')
+    import_.set_defaults(function=cmd_import)
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.DEBUG if args.verbose
+                        else logging.WARNING,
+                        format='%(name)s: %(message)s')
+    try:
+        return args.function(args)
+    except (OSError, ValueError) as e:
+        logger.error(e)
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,15 +1,42 @@
-from .app_database import AppDatabase
-from .associations_database import AssociationsDatabase
-from .desktop_entry import DesktopEntry
-from .mime_database import MimeDatabase
-from .mime_type import MimeType
-from . import os_env
-from . import xdg_mime_wrapper
-
-__all__ = ['AppDatabase',
-           'AssociationsDatabase',
-           'DesktopEntry',
-           'MimeDatabase',
-           'MimeType',
-           'os_env',
-           'xdg_mime_wrapper']
+"""
+The public names of this package are imported on first access (see
+`__getattr__`), so that importing `xdgprefs.core` is cheap, and only loads
+the modules that are actually used.
+"""
+
+
+import importlib
+
+
+# name -> (module, attribute), or (module, None) for a module
+_LAZY = {
+    'AppDatabase': ('app_database', 'AppDatabase'),
+    'AssociationsDatabase': ('associations_database',
+                             'AssociationsDatabase'),
+    'DesktopEntry': ('desktop_entry', 'DesktopEntry'),
+    'IconDatabase': ('icon_theme', 'IconDatabase'),
+    'MimeDatabase': ('mime_database', 'MimeDatabase'),
+    'MimeType': ('mime_type', 'MimeType'),
+    'os_env': ('os_env', None),
+    'xdg_mime_wrapper': ('xdg_mime_wrapper', None),
+}
+
+__all__ = list(_LAZY)
+
+
+def __getattr__(name):
+    try:
+        module, attribute = _LAZY[name]
+    except KeyError:
+        raise AttributeError(f'module {__name__!r} has no attribute '
+                             f'{name!r}') from None
+    value = importlib.import_module(f'{__name__}.{module}')
+    if attribute is not None:
+        value = getattr(value, attribute)
+    # Cache the value, so that `__getattr__` is not called again
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
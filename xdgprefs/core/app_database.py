@@ -6,9 +6,13 @@ This module defines functions and class to handle the Application Database
 
 import os
 import logging
+from collections.abc import Mapping
+from concurrent.futures import Future, ThreadPoolExecutor
 
 from xdgprefs.core.os_env import xdg_data_dirs
 from xdgprefs.core import desktop_entry_parser as parser
+from xdgprefs.core.lru import LRUCache
+from xdgprefs.core.snapshot import Snapshot, MISSING
 
 
 def app_dirs(only_existing=True):
@@ -30,37 +34,409 @@ def app_dirs(only_existing=True):
     return dirs
 
 
+def scan_app_dir(app_dir, list_entries=None):
+    """
+    List the Desktop Entry files of an application directory, recursively.
+
+    Directories are visited in the same order as `os.walk` (top-down, not
+    following symbolic links), but only `os.scandir` is used.
+
+    :param list_entries: The function listing each directory (by default,
+        `list_app_dir`), e.g. to re-use the listings of a snapshot.
+
+    :return: A list of (dirpath, [paths to Desktop Entry files]).
+    """
+    result = []
+    _scan_dir(app_dir, result, list_entries or list_app_dir)
+    return result
+
+
+def list_app_dir(dirpath):
+    """
+    List a single directory of applications.
+
+    :return: A tuple ([paths to Desktop Entry files], [paths to
+        subdirectories]), or None if the directory cannot be read.
+    """
+    files = []
+    subdirs = []
+    try:
+        with os.scandir(dirpath) as it:
+            for entry in it:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if not is_dir:
+                    if entry.name.endswith('.desktop'):
+                        files.append(entry.path)
+                elif not entry.is_symlink():
+                    subdirs.append(entry.path)
+    except OSError:
+        # Same as `os.walk`: unreadable directories are skipped.
+        return None
+    return files, subdirs
+
+
+def _scan_dir(dirpath, result, list_entries):
+    entries = list_entries(dirpath)
+    if entries is None:
+        return
+    files, subdirs = entries
+    result.append((dirpath, files))
+    for subdir in subdirs:
+        _scan_dir(subdir, result, list_entries)
+
+
+def _sorted(values):
+    return None if values is None else tuple(sorted(values))
+
+
+class LazyApps(Mapping):
+    """
+    A read-only mapping of Desktop File IDs to DesktopEntries, which only
+    parses the files when they are accessed.
+
+    Parsed entries are kept in an LRU cache. Iterating over `values()` or
+    `items()` streams the entries, without keeping them all in memory.
+    As in AppDatabase, if the file of an application that takes precedence
+    cannot be parsed, the next one is used. Applications without any file
+    that can be parsed are dropped from the mapping as soon as they are
+    found: `in` parses the files (as `[]` would), but iterating over the
+    keys and `len` count the applications that were not parsed yet.
+    """
+
+    def __init__(self, index, cache, keys=None, locales=None):
+        """
+        :param index: A dict {appid: [(path, name), ...]}, listing the files
+            of each application by order of precedence, where name is the
+            path relative to the applications directory.
+        :param cache: The LRUCache holding the parsed entries.
+        :param keys: The keys to parse (see `desktop_entry_parser.parse`).
+        :param locales: The locales to parse.
+        """
+        self.index = index
+        self.cache = cache
+        self.keys = keys
+        self.locales = locales
+
+    def load(self, appid):
+        """Return the DesktopEntry of `appid`, or None."""
+        app = self.cache.get(appid)
+        if app is not None:
+            return app
+        sources = self.index.get(appid)
+        while sources:
+            path, name = sources[0]
+            app = parser.parse(path, name, self.keys, self.locales)
+            if app is not None:
+                self.cache.put(appid, app)
+                return app
+            # Not parsed again until the file changes (see `reload_app`)
+            sources = sources[1:]
+            self.index[appid] = sources
+        self.index.pop(appid, None)
+        return None
+
+    def __getitem__(self, appid):
+        app = self.load(appid)
+        if app is None:
+            raise KeyError(appid)
+        return app
+
+    def __contains__(self, appid):
+        return self.load(appid) is not None
+
+    def __iter__(self):
+        # A copy, as loading an entry may drop it from the index
+        return iter(list(self.index))
+
+    def __len__(self):
+        return len(self.index)
+
+    def values(self):
+        for appid in list(self.index):
+            app = self.load(appid)
+            if app is not None:
+                yield app
+
+    def items(self):
+        for appid in list(self.index):
+            app = self.load(appid)
+            if app is not None:
+                yield appid, app
+
+
 class AppDatabase(object):
 
-    def __init__(self):
+    def __init__(self, use_snapshot=None, workers=None, lazy=False,
+                 cache_size=128, keys=None, locales=None):
+        """
+        :param use_snapshot: If set to `True`, the parsed files are kept in
+            an on-disk snapshot, and only new or changed files are parsed
+            when the database is built again. By default, a snapshot is used
+            unless `lazy` is set; it cannot be used in lazy mode.
+        :param workers: The number of threads used to list and parse the
+            files (by default, the default of `ThreadPoolExecutor`).
+        :param lazy: If set to `True`, only an index of the files is built,
+            and each file is parsed the first time its application is
+            accessed. `apps` is then a LazyApps mapping.
+        :param cache_size: In lazy mode, the maximum number of parsed
+            applications kept in memory (None for no limit).
+        :param keys: If set, only these keys of the `Desktop Entry` group are
+            parsed (e.g. `desktop_entry_parser.SUMMARY_KEYS`); other keys
+            and groups are skipped.
+        :param locales: If set, only the localized entries in these locales
+            are parsed (an empty set skips all translations).
+        """
+        if use_snapshot is None:
+            use_snapshot = not lazy
+        elif lazy and use_snapshot:
+            raise ValueError('A lazy AppDatabase cannot use a snapshot')
         self.logger = logging.getLogger('AppDatabase')
         self.apps = {}
+        self.snapshot = None
+        self.workers = workers
+        self.keys = keys
+        self.locales = locales
+        # All possible application directories (see `reload_path`)
+        self.dirs = app_dirs(only_existing=False)
+        # appid -> sorted list of (dir index, path, name), as an application
+        # can be defined in several directories (the last one is used).
+        self.sources = {}
+        # mimetype -> set of appids (see `mime_index`), and the MIME types
+        # of each indexed application.
+        self._mime_index = None
+        self._app_mimetypes = {}
+
+        if lazy:
+            self.apps = LazyApps({}, LRUCache(cache_size), keys, locales)
+            self._build_index()
+        else:
+            if use_snapshot:
+                # Entries parsed with another projection cannot be re-used.
+                self.snapshot = Snapshot('apps', key=(_sorted(keys),
+                                                      _sorted(locales)))
+            self._build_db()
+            self._build_mime_index()
 
-        self._build_db()
+    def _build_index(self):
+        self.logger.debug('Building the App Database index...')
+        dirs = app_dirs()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            scans = list(executor.map(scan_app_dir, dirs))
+        for app_dir, scan in zip(dirs, scans):
+            for _, filepaths in scan:
+                for filepath in filepaths:
+                    name = os.path.relpath(filepath, app_dir)
+                    self._add_source(app_dir, filepath, name)
+        for appid, sources in self.sources.items():
+            self.apps.index[appid] = self._lazy_sources(sources)
 
     def _build_db(self):
         self.logger.debug('Building the App Database...')
-        # First, loop on all applications directories
-        for app_dir in app_dirs():
-            self.logger.debug(f'Looking in {app_dir}...')
-            # Next, loop on each file (recursively)
-            for (dirpath, _, filenames) in os.walk(app_dir):
-                for filename in filenames:
-                    if filename.endswith('.desktop'):
-                        filepath = os.path.join(dirpath, filename)
+        if self.snapshot is not None:
+            self.snapshot.load()
+        dirs = app_dirs()
+        entries = []
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            # First, list all applications directories at once (the
+            # directories that did not change are listed by the snapshot)
+            list_entries = None
+            if self.snapshot is not None:
+                list_entries = self._list_entries
+            scans = [executor.submit(scan_app_dir, app_dir, list_entries)
+                     for app_dir in dirs]
+            # Next, as soon as a directory is listed, submit its files that
+            # are not in the snapshot to the pool, while keeping the order
+            # in which they were found.
+            for app_dir, scan in zip(dirs, scans):
+                self.logger.debug(f'Looking in {app_dir}...')
+                for dirpath, filepaths in scan.result():
+                    for filepath, app in self._list_dir(dirpath, filepaths):
                         _id = os.path.relpath(filepath, app_dir)
-                        app = parser.parse(filepath, _id)
-                        self._add_app(app)
+                        self._add_source(app_dir, filepath, _id)
+                        if app is MISSING:
+                            app = executor.submit(parser.parse, filepath,
+                                                  _id, self.keys,
+                                                  self.locales)
+                        entries.append((filepath, app))
+
+            # Finally, add the apps in order, so that the result does not
+            # depend on which thread finished first.
+            for filepath, app in entries:
+                if isinstance(app, Future):
+                    app = app.result()
+                    if self.snapshot is not None:
+                        self.snapshot.store(filepath, app)
+                self._add_app(app)
+        if self.snapshot is not None:
+            self.snapshot.save()
+
+    def _list_entries(self, dirpath):
+        """List a directory through the snapshot (see `list_app_dir`)."""
+        return self.snapshot.listing(dirpath, list_app_dir)
+
+    def _list_dir(self, dirpath, filepaths):
+        """
+        List the Desktop Entry files of a directory, along with their
+        DesktopEntry if it is known from the snapshot (or `MISSING`).
+        """
+        if self.snapshot is None:
+            return [(path, MISSING) for path in filepaths]
+        return [(path, self.snapshot.lookup(path)) for path in filepaths]
 
     def _add_app(self, app):
         if app is not None:
             self.apps[app.appid] = app
 
-    def get_app(self, appid):
-        if appid in self.apps:
-            return self.apps[appid]
+    @property
+    def mime_index(self):
+        """
+        The inverted index of the `MimeType` keys of the applications, as a
+        dict {mimetype: set of appids}.
+
+        It is built along with the database (or, in lazy mode, the first
+        time it is accessed, which parses all the files once).
+        """
+        if self._mime_index is None:
+            self._build_mime_index()
+        return self._mime_index
+
+    def _build_mime_index(self):
+        self._mime_index = {}
+        self._app_mimetypes = {}
+        for appid, app in self.apps.items():
+            self._index_app(appid, app)
+
+    def _index_app(self, appid, app):
+        """Update the MIME index with the (new) entry of an application."""
+        for mimetype in self._app_mimetypes.pop(appid, ()):
+            apps = self._mime_index[mimetype]
+            apps.discard(appid)
+            if not apps:
+                del self._mime_index[mimetype]
+        # Hidden applications are considered as deleted
+        if app is None or app.hidden is True or not app.mime_type:
+            return
+        mimetypes = tuple(app.mime_type)
+        self._app_mimetypes[appid] = mimetypes
+        for mimetype in mimetypes:
+            self._mime_index.setdefault(mimetype, set()).add(appid)
+
+    def get_apps_for_mimetype(self, mimetype):
+        """Return the set of IDs of the applications that can open a type."""
+        return self.mime_index.get(mimetype, set())
+
+    @staticmethod
+    def _lazy_sources(sources):
+        """Return the (path, name) of the sources, for LazyApps."""
+        # The last source takes precedence (see `sources`)
+        return [source[1:] for source in reversed(sources)]
+
+    def _add_source(self, app_dir, filepath, name):
+        """Remember where an application is defined, and return its ID."""
+        appid = parser.desktop_file_id(name)
+        source = (self.dirs.index(app_dir), filepath, name)
+        sources = self.sources.setdefault(appid, [])
+        sources.append(source)
+        sources.sort()
+        return appid
+
+    def _locate(self, path):
+        """
+        Return the application directory containing `path`, and the path
+        relative to it, or None.
+        """
+        for app_dir in self.dirs:
+            if path.startswith(app_dir):
+                return app_dir, os.path.relpath(path, app_dir)
+        return None
+
+    def reload_path(self, path):
+        """
+        Update the database after a file or directory changed.
+
+        Only the Desktop Entry files at (or below) `path` are parsed again,
+        or removed if they no longer exist.
+
+        :return: The set of IDs of the applications that changed.
+        """
+        location = self._locate(os.path.join(path, ''))
+        if location is None:
+            return set()
+        if path.endswith('.desktop') and not os.path.isdir(path):
+            return {self.reload_app(path)}
+
+        # A (sub)directory appeared or disappeared: compare the files that
+        # are known with the files that are there.
+        prefix = os.path.join(path, '')
+        known = {source[1] for sources in self.sources.values()
+                 for source in sources if source[1].startswith(prefix)}
+        present = set()
+        if os.path.isdir(path):
+            present = {filepath for _, filepaths in scan_app_dir(path)
+                       for filepath in filepaths}
+        return {self.reload_app(filepath) for filepath in known ^ present}
+
+    def reload_app(self, path):
+        """
+        Parse again (or remove) the Desktop Entry file at `path`.
+
+        If the application is defined in several directories, the one that
+        takes precedence is used.
+
+        :return: The ID of the application.
+        """
+        app_dir, name = self._locate(path)
+        appid = parser.desktop_file_id(name)
+        sources = [source for source in self.sources.get(appid, [])
+                   if source[1] != path]
+        if os.path.isfile(path):
+            sources.append((self.dirs.index(app_dir), path, name))
+            sources.sort()
+        if sources:
+            self.sources[appid] = sources
+        else:
+            self.sources.pop(appid, None)
+
+        if isinstance(self.apps, LazyApps):
+            self.apps.cache.pop(appid)
+            if sources:
+                self.apps.index[appid] = self._lazy_sources(sources)
+            else:
+                self.apps.index.pop(appid, None)
+            if self._mime_index is not None:
+                self._index_app(appid, self.apps.load(appid))
+            return appid
+
+        # As in `_build_db`, the last file that can be parsed is used.
+        for _, filepath, _id in reversed(sources):
+            try:
+                app = parser.parse(filepath, _id, self.keys, self.locales)
+            except OSError as e:
+                # The file may be replaced again while we read it, in which
+                # case another change will follow.
+                self.logger.warning(f'Could not read {filepath}: {e}')
+                continue
+            if app is not None:
+                self.apps[appid] = app
+                break
         else:
-            return None
+            self.apps.pop(appid, None)
+        self._index_app(appid, self.apps.get(appid))
+        return appid
+
+    def get_app(self, appid):
+        return self.apps.get(appid)
+
+    def is_installed(self, appid):
+        """
+        Check if an application is installed, i.e. if it has a (parseable)
+        Desktop Entry that is not hidden.
+        """
+        app = self.apps.get(appid)
+        return app is not None and app.hidden is not True
 
     @property
     def size(self):
@@ -3,7 +3,9 @@ This module defines the database that lists associations between
 MIME Types and Applications (represented by Desktop Entries).
 
 This database can be used to view and to change such associations
-(e.g. the default application used to open a given MIME Type).
+(e.g. the default application used to open a given MIME Type). Changes can
+be grouped in a batch (see `AssociationsDatabase.batch`), so that the user
+`mimeapps.list` is written only once, atomically.
 
 https://specifications.freedesktop.org/mime-apps-spec/latest/index.html
 """
@@ -12,43 +14,74 @@ https://specifications.freedesktop.org/mime-apps-spec/latest/index.html
 import configparser
 import logging
 import os
+import sys
+import tempfile
+import threading
 from collections import defaultdict
+from contextlib import contextmanager
 
 from xdgprefs.core import os_env
+from xdgprefs.core.snapshot import Snapshot, MISSING
 
 
-ADDED = 'Added Applications'
-REMOVED = 'Removed Applications'
+ADDED = 'Added Associations'
+REMOVED = 'Removed Associations'
 DEFAULT = 'Default Applications'
 CACHE = 'MIME Cache'
 
+MIMEAPPS_SECTIONS = [ADDED, REMOVED, DEFAULT]
+
+# Names of the sections written by earlier versions of xdg-prefs
+LEGACY_SECTIONS = {'Added Applications': ADDED,
+                   'Removed Applications': REMOVED}
+
+# Actions of the changes made to the user `mimeapps.list`
+SET_DEFAULT = 'set default'
+ADD = 'add'
+REMOVE = 'remove'
+
+# Status of a change, once its batch is committed
+CHANGED = 'changed'
+UNCHANGED = 'unchanged'
+FAILED = 'failed'
+
 
 class Associations(object):
+    """
+    The applications associated with a MIME type. Each list of applications
+    is an ordered set (a dict whose values are None), so that checking if an
+    application is already in it does not depend on its length.
+    """
+
+    __slots__ = ('added', 'removed', 'default')
 
     def __init__(self):
-        self.added = []
-        self.removed = []
-        self.default = []
+        self.added = {}
+        self.removed = {}
+        self.default = {}
 
     def extend_added(self, apps):
+        removed = self.removed
+        added = self.added
         for app in apps:
-            if app not in self.added and app not in self.removed:
-                self.added.append(app)
+            if app not in removed:
+                added.setdefault(app)
 
     def extend_removed(self, apps):
-        for app in apps:
-            if app not in self.removed:
-                self.removed.append(app)
+        self.removed.update(dict.fromkeys(apps))
 
     def extend_default(self, apps):
-        for app in apps:
-            if app not in self.default:
-                self.default.append(app)
+        self.default.update(dict.fromkeys(apps))
 
 
 def mimeapps_files(only_existing=True):
+    """
+    Return the paths of the `mimeapps.list` files, by decreasing priority.
+    In each directory, the files specific to the current desktop (e.g.
+    `gnome-mimeapps.list`) come before the generic one.
+    """
     desktop = os_env.get_current_desktop_environment()
-    prefixes = [''] + [name + '-' for name in desktop]
+    prefixes = [name + '-' for name in desktop] + ['']
     config_home = os_env.xdg_config_home()
     config_dirs = os_env.xdg_config_dirs()
     data_home = os_env.xdg_data_home()
@@ -117,11 +150,14 @@ class ArrayInterpolation(configparser.Interpolation):
 
 
 def parse_mimeapps(file_path):
-    config = configparser.ConfigParser(delimiters='=',
-                                       interpolation=ArrayInterpolation(),
-                                       strict=False)
+    # The values are lists (see ArrayInterpolation), which the `set` method
+    # of ConfigParser refuses: hence the RawConfigParser.
+    config = configparser.RawConfigParser(delimiters='=',
+                                          interpolation=ArrayInterpolation(),
+                                          strict=False)
     try:
         config.read(file_path)
+        _merge_legacy_sections(config)
         for section in [ADDED, REMOVED, DEFAULT]:
             if section not in config.sections():
                 config[section] = {}
@@ -131,71 +167,538 @@ def parse_mimeapps(file_path):
         return None
 
 
-class AssociationsDatabase(object):
+def _merge_legacy_sections(config):
+    """
+    Move the associations of the legacy sections (see `LEGACY_SECTIONS`)
+    into the sections of the specification, after their own applications.
+    They are thus read, and written under the right name the next time the
+    file is saved.
+    """
+    for legacy, section in LEGACY_SECTIONS.items():
+        if not config.has_section(legacy):
+            continue
+        if not config.has_section(section):
+            config.add_section(section)
+        for mimetype, apps in config.items(legacy):
+            current = config.get(section, mimetype, fallback=[])
+            config.set(section, mimetype,
+                       current + [app for app in apps if app not in current])
+        config.remove_section(legacy)
+
+
+def write_atomic(path, config):
+    """
+    Write a configuration file atomically: the content is written (and
+    synced) to a temporary file, which then replaces `path`. A crash can
+    thus never leave a partially written file. If `path` is a symbolic link,
+    the file it points to is replaced, and the link is kept.
+
+    :raise OSError: if the file cannot be written.
+    """
+    path = os.path.realpath(path)
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    try:
+        mode = os.stat(path).st_mode & 0o777
+    except FileNotFoundError:
+        mode = 0o644
+    fd, tmp_path = tempfile.mkstemp(dir=directory,
+                                    prefix=f'.{os.path.basename(path)}.')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            config.write(f, space_around_delimiters=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    # Make the rename itself durable
+    try:
+        dir_fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+
+class Change(object):
+    """A change made to the associations of a MIME type, in a batch."""
+
+    __slots__ = ('action', 'mimetype', 'app', 'status', 'error')
+
+    def __init__(self, action, mimetype, app):
+        self.action = action
+        self.mimetype = mimetype
+        self.app = app
+        # Set when the batch is committed
+        self.status = None
+        self.error = None
+
+    def __repr__(self):
+        return f'<Change {self.action} {self.app} for {self.mimetype}: ' \
+               f'{self.status}>'
+
+
+class BatchReport(object):
+    """
+    The result of a batch of changes: the status of each change is set
+    when the batch is committed.
+    """
 
     def __init__(self):
+        self.changes = []
+        self.error = None
+        # (section, mimetype) -> the previous value (None if there was none),
+        # to roll back the changes if the batch fails
+        self._undo = {}
+
+    @property
+    def failed(self):
+        """The changes that failed (rejected, or not written)."""
+        return [change for change in self.changes if change.status == FAILED]
+
+    @property
+    def success(self):
+        """True if the file was written, and none of the changes failed."""
+        return self.error is None and not self.failed
+
+    def __iter__(self):
+        return iter(self.changes)
+
+    def __len__(self):
+        return len(self.changes)
+
+    def __repr__(self):
+        status = 'ok' if self.success else f'{len(self.failed)} failed'
+        if self.error is not None:
+            status += f' ({self.error})'
+        return f'<BatchReport {len(self.changes)} changes: {status}>'
+
+
+class AssociationsDatabase(object):
+
+    def __init__(self, use_snapshot=True, appdb=None):
+        """
+        :param use_snapshot: If set to `True`, the parsed files are kept in
+            an on-disk snapshot, and only new or changed files are parsed
+            when the database is built again.
+        :param appdb: An optional AppDatabase. If set, the applications that
+            declare a MIME type (in their `MimeType` key) are associated with
+            it as well, even if the `mimeinfo.cache` files are outdated or
+            missing, and only installed applications are returned by
+            `get_default_app`.
+        """
         self.logger = logging.getLogger('AssociationsDatabase')
+        self.appdb = appdb
         self.associations = defaultdict(Associations)
         self.config_path = os.path.join(os_env.xdg_config_home(),
                                         'mimeapps.list')
         self.config = parse_mimeapps(self.config_path)
+        self.snapshot = Snapshot('associations') if use_snapshot else None
+        # All possible files, in the order they are merged (see
+        # `reload_path`), and the sections read from each existing file.
+        self.files = mimeapps_files(False) + cache_files(False)
+        self.sources = {}
+        # The report of the current batch (see `batch`), and the lock held
+        # by the thread that runs it
+        self._batch = None
+        self._batch_lock = threading.RLock()
 
         self._build_db()
 
     def _build_db(self):
+        if self.snapshot is not None:
+            self.snapshot.load()
         files = mimeapps_files(True)
         for file in files:
-            self._parse_mimeapps_file(file)
+            self.sources[file] = self._read_sections(file, MIMEAPPS_SECTIONS)
         files = cache_files(True)
         for file in files:
-            self._parse_cache_file(file)
-
-    def _parse_mimeapps_file(self, path):
-        config = parse_mimeapps(path)
-        if config is None:
+            self.sources[file] = self._read_sections(file, [CACHE])
+        if self.snapshot is not None:
+            self.snapshot.save()
+        self._merge()
+
+    def _read_sections(self, path, names):
+        """
+        Return the content of the sections `names` of a file, as a dict
+        {section: {mimetype: apps}}, or None if the file is badly formatted.
+        """
+        sections = MISSING
+        if self.snapshot is not None:
+            sections = self.snapshot.lookup(path)
+        if sections is MISSING:
+            config = parse_mimeapps(path)
+            if config is None:
+                sections = None
+            else:
+                sections = {name: dict(config[name].items())
+                            for name in names if config.has_section(name)}
+            if self.snapshot is not None:
+                self.snapshot.store(path, sections)
+        if sections is None:
             self.logger.warning(f'Badly formatted file: {path}')
-            return
-        section = config[ADDED]
-        for mimetype, apps in section.items():
-            self.associations[mimetype].extend_added(apps)
-        section = config[REMOVED]
-        for mimetype, apps in section.items():
-            self.associations[mimetype].extend_removed(apps)
-        section = config[DEFAULT]
-        for mimetype, apps in section.items():
-            self.associations[mimetype].extend_default(apps)
-
-    def _parse_cache_file(self, path):
-        config = parse_mimeapps(path)
-        if config is None:
-            self.logger.warning(f'Badly formatted file: {path}')
-            return
-        for mimetype, apps in config[CACHE].items():
-            assoc = self.associations[mimetype]
-            assoc.extend_default(apps)
+        return _intern_sections(sections)
+
+    def _merge(self, mimetypes=None):
+        """
+        Merge the sections of all files into `associations`, in order.
+
+        :param mimetypes: If set, only the associations of these MIME types
+            are merged again.
+        """
+        if mimetypes is None:
+            self.associations.clear()
+        else:
+            for mimetype in mimetypes:
+                self.associations.pop(mimetype, None)
+        for file in self.files:
+            sections = self.sources.get(file)
+            if sections is None:
+                continue
+            for name in (ADDED, REMOVED, DEFAULT, CACHE):
+                section = sections.get(name)
+                if not section:
+                    continue
+                if mimetypes is None:
+                    items = section.items()
+                else:
+                    items = [(mimetype, section[mimetype])
+                             for mimetype in mimetypes if mimetype in section]
+                for mimetype, apps in items:
+                    assoc = self.associations[mimetype]
+                    if name == ADDED:
+                        assoc.extend_added(apps)
+                    elif name == REMOVED:
+                        assoc.extend_removed(apps)
+                    else:
+                        # The cache lists the apps by order of preference
+                        assoc.extend_default(apps)
+
+    def reload_path(self, path):
+        """
+        Update the database after a file or directory changed.
+
+        If `path` is one of the `mimeapps.list` or `mimeinfo.cache` files
+        (or a directory that contains some), these files are read again,
+        and only the associations they define are merged again.
+
+        :return: The set of MIME types whose associations changed.
+        """
+        path = os.path.normpath(path)
+        files = [file for file in self.files
+                 if os.path.normpath(file) == path
+                 or os.path.dirname(os.path.normpath(file)) == path]
+        changed = set()
+        for file in files:
+            changed |= self.reload_file(file)
+        return changed
+
+    def reload_file(self, path):
+        """
+        Read again (or forget) a `mimeapps.list` or `mimeinfo.cache` file.
+
+        :return: The set of MIME types whose associations changed.
+        """
+        # Not while a batch (of another thread) changes the configuration
+        with self._batch_lock:
+            return self._reload_file(path)
+
+    def _reload_file(self, path):
+        old = self.sources.pop(path, None)
+        new = None
+        if os.path.isfile(path):
+            names = [CACHE] if path.endswith('mimeinfo.cache') \
+                else MIMEAPPS_SECTIONS
+            # Do not use the snapshot, as it is only validated at startup.
+            config = parse_mimeapps(path)
+            if config is not None:
+                new = _intern_sections({name: dict(config[name].items())
+                                        for name in names
+                                        if config.has_section(name)})
+                self.sources[path] = new
+        if path == self.config_path:
+            self.config = parse_mimeapps(path)
+
+        # Only the MIME types whose lines changed must be merged again
+        old, new = old or {}, new or {}
+        changed = set()
+        for name in set(old) | set(new):
+            old_section = old.get(name, {})
+            new_section = new.get(name, {})
+            changed.update(mimetype for mimetype
+                           in set(old_section) | set(new_section)
+                           if old_section.get(mimetype)
+                           != new_section.get(mimetype))
+        self._merge(changed)
+        return changed
+
+    def get_default_app(self, mimetype, cross_check=False):
+        """
+        Return the ID of the default application of a MIME type, or None,
+        following the lookup algorithm of the mime-apps specification:
+
+        1. the first installed application of the `Default Applications`
+           of the `mimeapps.list` files, by decreasing priority, unless it
+           was removed (in the same file, or in a more important one);
+        2. otherwise, the first installed application that is associated
+           with the MIME type (`Added Associations`, then the
+           `mimeinfo.cache` files, then the applications that declare it),
+           unless it was removed.
+
+        :param cross_check: If set to True, the result is compared with the
+            answer of `xdg-mime` (which is much slower), and a warning is
+            logged if they differ.
+        """
+        app = self._resolve_default_app(mimetype)
+        if cross_check:
+            from xdgprefs.core import xdg_mime_wrapper
+            expected = xdg_mime_wrapper.get_default_app(mimetype) or None
+            if expected != app:
+                self.logger.warning(f'Default app of {mimetype}: {app} '
+                                    f'(xdg-mime: {expected})')
+        return app
+
+    def _resolve_default_app(self, mimetype):
+        # Removals apply to the associations of the same file, and of the
+        # less important ones (the `mimeinfo.cache` files come last).
+        removed = set()
+        associated = []
+        for file in self.files:
+            sections = self.sources.get(file)
+            if not sections:
+                continue
+            removed.update(sections.get(REMOVED, {}).get(mimetype, ()))
+            for app in sections.get(DEFAULT, {}).get(mimetype, ()):
+                if app not in removed and self._is_installed(app):
+                    return app
+            for name in (ADDED, CACHE):
+                associated.extend(app for app
+                                  in sections.get(name, {}).get(mimetype, ())
+                                  if app not in removed)
+        if self.appdb is not None:
+            associated.extend(sorted(
+                app for app in self.appdb.get_apps_for_mimetype(mimetype)
+                if app not in removed))
+        for app in associated:
+            if self._is_installed(app):
+                return app
+        return None
+
+    def _is_installed(self, app):
+        return self.appdb is None or self.appdb.is_installed(app)
 
     def get_apps_for_mimetype(self, mimetype):
-        if mimetype in self.associations:
-            assoc = self.associations[mimetype]
-            return assoc.default
-        return []
+        """
+        Return the IDs of the applications associated with a MIME type: the
+        default one first (see `get_default_app`), then the other default
+        and added ones, then (if there is an AppDatabase) the others that
+        can open it, unless their association was removed.
+        """
+        assoc = self.associations.get(mimetype)
+        default = self.get_default_app(mimetype)
+        apps = [default] if default is not None else []
+        if assoc is not None:
+            apps.extend(app for app in {**assoc.default, **assoc.added}
+                        if app != default)
+        if self.appdb is not None:
+            removed = assoc.removed if assoc is not None else {}
+            known = set(apps)
+            apps.extend(sorted(app for app
+                               in self.appdb.get_apps_for_mimetype(mimetype)
+                               if app not in known and app not in removed))
+        return apps
+
+    def get_mimetypes(self):
+        """
+        Return all MIME types that have associations, including the ones
+        declared by the applications (if there is an AppDatabase).
+        """
+        mimetypes = list(self.associations)
+        if self.appdb is not None:
+            known = set(mimetypes)
+            mimetypes.extend(mimetype for mimetype in self.appdb.mime_index
+                             if mimetype not in known)
+        return mimetypes
+
+    @contextmanager
+    def batch(self):
+        """
+        Group changes (`set_app_for_mimetype`, `add_app_for_mimetype`,
+        `remove_app_for_mimetype`) in a transaction: they are applied in
+        memory, and the user `mimeapps.list` is written once, when the
+        `with` block exits. If the block raises an exception, the changes
+        are discarded.
+
+        Batches can be nested: the changes of an inner batch are committed
+        with the outermost one. A batch belongs to the thread that opened
+        it: the changes of other threads wait until it is committed (or
+        discarded), and are not part of it.
+
+        >>> with assocdb.batch() as report:
+        ...     assocdb.set_app_for_mimetype('text/plain', 'gedit.desktop')
+        ...     assocdb.remove_app_for_mimetype('text/html', 'vim.desktop')
+        >>> report.success
+
+        :return: A BatchReport, filled in when the batch is committed.
+        """
+        with self._batch_lock:
+            if self._batch is not None:
+                yield self._batch
+                return
+            report = BatchReport()
+            self._batch = report
+            try:
+                yield report
+            except BaseException:
+                self._rollback(report)
+                raise
+            finally:
+                self._batch = None
+            self._commit(report)
 
     def set_app_for_mimetype(self, mimetype, app):
-        section = self.config[DEFAULT]
-        apps = section.get(mimetype, fallback=[])
-        if app in apps:
-            apps.remove(app)
-        apps.insert(0, app)
-        return self.save_config()
+        """
+        Make an application the default one for a MIME type.
+
+        :return: True if the change was saved (or is pending, in a batch).
+        """
+        return self._change(SET_DEFAULT, mimetype, app)
+
+    def add_app_for_mimetype(self, mimetype, app):
+        """
+        Associate an application with a MIME type (without making it the
+        default one).
+
+        :return: True if the change was saved (or is pending, in a batch).
+        """
+        return self._change(ADD, mimetype, app)
+
+    def remove_app_for_mimetype(self, mimetype, app):
+        """
+        Remove the association between an application and a MIME type.
+
+        :return: True if the change was saved (or is pending, in a batch).
+        """
+        return self._change(REMOVE, mimetype, app)
+
+    def _change(self, action, mimetype, app):
+        with self.batch() as report:
+            change = Change(action, mimetype, app)
+            report.changes.append(change)
+            if self.config is None:
+                change.status = FAILED
+                change.error = ValueError(f'{self.config_path} is badly '
+                                          f'formatted')
+                return False
+            if action == SET_DEFAULT:
+                edits = [(DEFAULT, _move_first), (REMOVED, _remove)]
+            elif action == ADD:
+                edits = [(ADDED, _append), (REMOVED, _remove)]
+            else:
+                edits = [(REMOVED, _append), (ADDED, _remove),
+                         (DEFAULT, _remove)]
+            changed = False
+            for section, edit in edits:
+                changed |= self._edit(report, section, mimetype,
+                                      lambda apps: edit(apps, app))
+            change.status = CHANGED if changed else UNCHANGED
+        # Set again if the batch cannot be written
+        return change.status != FAILED
+
+    def _edit(self, report, section, mimetype, edit):
+        """
+        Edit the list of apps of a MIME type, in a section of the user
+        `mimeapps.list`.
+
+        :return: True if the list changed.
+        """
+        if not self.config.has_section(section):
+            self.config.add_section(section)
+        old = self.config.get(section, mimetype, fallback=None)
+        new = edit(list(old or []))
+        if new == (old or []):
+            return False
+        report._undo.setdefault((section, mimetype),
+                                list(old) if old is not None else None)
+        if new:
+            self.config.set(section, mimetype, new)
+        else:
+            self.config.remove_option(section, mimetype)
+        return True
+
+    def _rollback(self, report):
+        for (section, mimetype), apps in report._undo.items():
+            if apps is None:
+                self.config.remove_option(section, mimetype)
+            else:
+                self.config.set(section, mimetype, apps)
+
+    def _commit(self, report):
+        if not report._undo:
+            return
+        try:
+            write_atomic(self.config_path, self.config)
+        except OSError as e:
+            self.logger.error(f'Could not write {self.config_path}: {e}')
+            self._rollback(report)
+            report.error = e
+            for change in report.changes:
+                if change.status == CHANGED:
+                    change.status = FAILED
+                    change.error = e
+            return
+        self.reload_file(self.config_path)
 
     def save_config(self):
+        """
+        Write the user `mimeapps.list` (atomically).
+
+        :return: True if the file was written.
+        """
         try:
-            with open(self.config_path, 'w') as f:
-                self.config.write(f, space_around_delimiters=False)
+            write_atomic(self.config_path, self.config)
             return True
-        except:
+        except OSError as e:
+            self.logger.error(f'Could not write {self.config_path}: {e}')
             return False
 
     @property
     def size(self):
         return len(self.associations)
+
+
+def _intern_sections(sections):
+    """
+    Intern the MIME types and application IDs of the sections of a file, so
+    that the same strings are shared by all files (and thus only stored
+    once, and compared by identity first).
+    """
+    if sections is None:
+        return None
+    return {name: {sys.intern(mimetype): [sys.intern(app) for app in apps]
+                   for mimetype, apps in section.items()}
+            for name, section in sections.items()}
+
+
+def _move_first(apps, app):
+    if app in apps:
+        apps.remove(app)
+    return [app] + apps
+
+
+def _append(apps, app):
+    return apps if app in apps else apps + [app]
+
+
+def _remove(apps, app):
+    return [other for other in apps if other != app]
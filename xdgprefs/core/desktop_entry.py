@@ -6,10 +6,12 @@ https://specifications.freedesktop.org/desktop-entry-spec/latest/
 """
 
 import logging
-from collections import defaultdict
 from typing import Optional
 
 
+DESKTOP_ENTRY = 'Desktop Entry'
+
+
 class Entry(object):
     """
     An Entry, i.e. a single line of a Desktop Entry file.
@@ -18,6 +20,8 @@ class Entry(object):
     Key[Locale]=Value
     """
 
+    __slots__ = ('key', 'value', 'locale')
+
     def __init__(self, key: str,
                  value: str,
                  locale: Optional[str]):
@@ -29,87 +33,92 @@ class Entry(object):
 class EntryGroup(object):
     """
     An Entry Group, i.e. a set of unique entries identified by (key,locale).
+
+    Only the values are stored, in a flat dict {(key, locale): value};
+    Entry objects are created when they are requested.
     """
 
+    __slots__ = ('name', 'entries')
+
     def __init__(self, name: str):
         self.name = name
-        self.entries = defaultdict(lambda: defaultdict(lambda: None))
+        self.entries = {}
 
     def add_entry(self, entry: Entry):
         """Add an entry to the group."""
-        self.entries[entry.key][entry.locale] = entry
+        self.entries[entry.key, entry.locale] = entry.value
+
+    def set_value(self, entry_key, value, entry_locale=None):
+        """Add an entry to the group, from its key, value and locale."""
+        self.entries[entry_key, entry_locale] = value
 
     def get_entry(self, entry_key, entry_locale=None) -> Optional[Entry]:
         """Return an entry identified by its key and locale, or None."""
-        entries = self.entries[entry_key]
         # TODO: search the best matching locale.
-        if entry_locale is not None and entry_locale not in entries:
+        if (entry_key, entry_locale) not in self.entries:
             # The specified locale is not found, so we use the default one.
-            return entries[None]
-        else:
-            return entries[entry_locale]
+            entry_locale = None
+        try:
+            value = self.entries[entry_key, entry_locale]
+        except KeyError:
+            return None
+        return Entry(entry_key, value, entry_locale)
 
     def get_entry_value(self, entry_key, entry_locale=None):
         """Return the value of an entry, or None."""
-        entry = self.get_entry(entry_key, entry_locale)
-        return entry.value if entry is not None else None
+        entries = self.entries
+        value = entries.get((entry_key, entry_locale))
+        if value is None and entry_locale is not None:
+            value = entries.get((entry_key, None))
+        return value
 
 
 class DesktopEntry(object):
     """
     A Desktop Entry file defines an application, and is composed of multiple
     Entry Groups. The default one is named 'Desktop Entry'.
+
+    The values that are used the most (name, comment, icon, etc.) are read
+    once from the 'Desktop Entry' group, when the object is created.
     """
 
+    __slots__ = ('groups', 'appid', 'name', 'generic_name', 'comment',
+                 'icon', 'hidden', 'no_display', 'only_show_in',
+                 'not_show_in', 'mime_type')
+
     logger = logging.getLogger('DesktopEntry')
 
     def __init__(self, groups, appid):
         self.groups = groups
         self.appid = appid
 
-    def get_entry(self, entry_key, groupname='Desktop Entry'):
+        group = groups.get(DESKTOP_ENTRY)
+        if group is None:
+            self.logger.warning(f'[{appid}] Group {DESKTOP_ENTRY} not found!')
+            entries = {}
+        else:
+            entries = group.entries
+        self.name = entries.get(('Name', None))
+        self.generic_name = entries.get(('GenericName', None))
+        self.comment = entries.get(('Comment', None))
+        self.icon = entries.get(('Icon', None))
+        self.hidden = entries.get(('Hidden', None))
+        self.no_display = entries.get(('NoDisplay', None))
+        self.only_show_in = entries.get(('OnlyShowIn', None))
+        self.not_show_in = entries.get(('NotShowIn', None))
+        self.mime_type = entries.get(('MimeType', None))
+
+    def get_entry(self, entry_key, groupname=DESKTOP_ENTRY):
         if groupname not in self.groups:
             self.logger.warning(f'[{self.appid}] Group {groupname} not found!')
             return None
         group = self.groups[groupname]
         return group.get_entry(entry_key)
 
-    def get_entry_value(self, entry_key, groupname='Desktop Entry'):
+    def get_entry_value(self, entry_key, groupname=DESKTOP_ENTRY):
         entry = self.get_entry(entry_key, groupname)
         return entry.value if entry is not None else None
 
-    @property
-    def name(self):
-        return self.get_entry_value('Name')
-
-    @property
-    def generic_name(self):
-        return self.get_entry_value('GenericName')
-
-    @property
-    def comment(self):
-        return self.get_entry_value('Comment')
-
-    @property
-    def icon(self):
-        return self.get_entry_value('Icon')
-
-    @property
-    def hidden(self):
-        return self.get_entry_value('Hidden')
-
-    @property
-    def only_show_in(self):
-        return self.get_entry_value('OnlyShowIn')
-
-    @property
-    def not_show_in(self):
-        return self.get_entry_value('NotShowIn')
-
-    @property
-    def mime_type(self):
-        return self.get_entry_value('MimeType')
-
     @property
     def is_vendor(self):
         return self.appid.startswith('vnd-')
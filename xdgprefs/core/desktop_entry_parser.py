@@ -2,156 +2,242 @@
 Desktop file tokenizer and parser.
 Source: https://github.com/wor/desktop_file_parser
 This work was copied and modified from wor's work (licensed under GPL).
+
+The original regex-based tokenizer has been replaced by a line-oriented
+engine: the file is split into lines once, and each line is classified with
+`str` methods. A precompiled pattern is only used for the rare entries that
+the fast path cannot split (e.g. keys containing brackets).
 """
 
 import re
-from collections import OrderedDict
 import logging
+from sys import intern
 
-from xdgprefs.core.desktop_entry import DesktopEntry, EntryGroup, Entry
+from xdgprefs.core.desktop_entry import DesktopEntry, EntryGroup, Entry, \
+    DESKTOP_ENTRY
 
 
 logger = logging.getLogger('DesktopEntryParser')
 
 
+# Keys needed to list applications and their associations, to be used as a
+# projection (see `parse`).
+SUMMARY_KEYS = frozenset(['Name', 'Comment', 'Icon', 'MimeType', 'Hidden',
+                          'NoDisplay', 'OnlyShowIn', 'NotShowIn'])
+
+# Keys whose value is converted to a boolean.
+BOOLEAN_KEYS = frozenset(["NoDisplay", "Hidden", "Terminal",
+                          "StartupNotify", "X-MultipleArgs"])
+
+# Keys whose value is split into a list of strings.
+LIST_KEYS = frozenset(["OnlyShowIn", "NotShowIn", "Actions",
+                       "MimeType", "Categories", "Keywords"])
+
+# Key[Locale]=Value, for the entries that the fast path cannot handle.
+_ENTRY = re.compile(r'(.+?)(\[.+?\])?=(.*)')
+
+# Characters allowed in an empty line.
+_BLANK = ' \t\r\f\v'
+
+
 def convert_bool(entry: Entry):
     """Try and convert an entry's value to a boolean, or return the value."""
-    if entry.value in ['0', 'false']:
+    return _to_bool(entry.key, entry.value)
+
+
+def _to_bool(key, value):
+    if value in ['0', 'false']:
         return False
-    elif entry.value in ['1', 'true']:
+    elif value in ['1', 'true']:
         return True
     else:
-        msg = f'Key {entry.key} does not have a boolean value ({entry.value})'
+        msg = f'Key {key} does not have a boolean value ({value})'
         logger.warning(msg)
-        return entry.value
+        return value
 
 
 def split(text):
     """Split a text, taking escape characters into account."""
-    # See https://stackoverflow.com/a/21882672
-    escape = '\\'
-    ret = []
-    current = []
-    itr = iter(text)
-    for ch in itr:
-        if ch == escape:
-            try:
-                # skip the next character; it has been escaped!
-                current.append(next(itr))
-            except StopIteration:
-                current.append(escape)
-        elif ch == ';' or ch == ',':
-            # split! (add current to the list and reset it)
-            ret.append(''.join(current))
-            current = []
-        else:
-            current.append(ch)
-    if len(current) > 0:
-        ret.append(''.join(current))
-    return ret
+    if '\\' not in text:
+        values = text.replace(',', ';').split(';')
+        # 'a;b;' gives ['a', 'b'], as the last (empty) value is not kept
+        if not values[-1]:
+            values.pop()
+        return values
+
+    # Escaped characters are kept as-is (without the backslash), and do not
+    # split the text, even if they are separators.
+    values = []
+    current = ''
+    start = 0
+    while True:
+        escape = text.find('\\', start)
+        chunk = text[start:] if escape == -1 else text[start:escape]
+        parts = chunk.replace(',', ';').split(';')
+        current += parts[0]
+        for part in parts[1:]:
+            values.append(current)
+            current = part
+        if escape == -1:
+            break
+        if escape + 1 == len(text):
+            # A trailing backslash escapes nothing, keep it.
+            current += '\\'
+            break
+        current += text[escape + 1]
+        start = escape + 2
+    if current:
+        values.append(current)
+    return values
 
 
-def tok_gen(text):
+def desktop_file_id(name):
+    """
+    Return the Desktop File ID of a Desktop Entry file, from its path
+    relative to the applications directory (e.g. kde4/foo.desktop gives
+    kde4-foo.desktop).
     """
-    Simplified token generator.
-    As Desktop files are not really that complex to tokenize, this function
-    replaces the tokenizer dependency.
+    return name.replace('/', '-')
 
-    Parameters:
-        text: str. Desktop file as string.
-    Returns:
-        (str,()).
+
+def split_entry(line):
     """
-    reg = r"""(?P<ENTRY>^(.+?)(\[.+?\])?=(.*)$\n?)|"""\
-          r"""(?P<COMMENT_LINE>^#(.*)\n)|"""\
-          r"""(?P<EMPTY_LINE>^[ \t\r\f\v]*\n)|"""\
-          r"""(?P<GROUP_HEADER>^\[(.+?)\]\s*$\n?)"""
-    r = re.compile(reg, re.MULTILINE)
-
-    tok_gen.groups = OrderedDict(sorted(r.groupindex.items(),
-                                        key=lambda t: t[1]))
-
-    # Make tok_gen.groups contain mapping from regex group name to submatch
-    # range. Submatch range start-1 is the whole match.
-    last_i = None
-    for i in tok_gen.groups.items():
-        if last_i is None:
-            last_i = i
-            continue
-        tok_gen.groups[last_i[0]] = (last_i[1], i[1]-1)
-        last_i = i
-    tok_gen.groups[last_i[0]] = (last_i[1], r.groups)
+    Split a line into the (key, locale, value) of an entry, following the
+    grammar of the original tokenizer (`Key[Locale]=Value`, where the key is
+    as short as possible). `parse_text` has a faster path for common lines.
 
-    pos = 0
-    while True:
-        m = r.match(text, pos)
-        if not m:
-            if pos != len(text):
-                raise SyntaxError("Tokenization failed!")
-            break
-        pos = m.end()
-        start = tok_gen.groups[m.lastgroup][0]
-        end = tok_gen.groups[m.lastgroup][1]
-        yield m.lastgroup, m.groups()[start:end]
+    :return: The tuple, or None if the line is not an entry.
+    """
+    m = _ENTRY.fullmatch(line)
+    if m is None:
+        return None
+    key, locale, value = m.groups()
+    return key, locale.strip('[]') if locale else None, value
+
+
+def parse_text(text, keys=None, locales=None):
+    """
+    Parses the content of a desktop entry file.
+
+    Lines are classified in the same order as the original tokenizer: an
+    entry (Key[Locale]=Value), a comment, an empty line, or a group header.
+    Comments and empty lines must end with a newline; whitespace lines that
+    follow a group header are ignored.
 
+    If `keys` or `locales` is given, only the matching entries of the
+    `Desktop Entry` group are kept (see `parse`), and the text is not read
+    further than the end of this group.
 
-def parse(filepath, name):
+    :raise SyntaxError: if a line cannot be tokenized.
+    :return: A dict {group name: EntryGroup}.
+    """
+    entry_groups = {}
+    current_group = None
+    # The {(key, locale): value} dict of the current group
+    entries = None
+    after_header = False
+    projection = keys is not None or locales is not None
+
+    lines = text.split('\n')
+    # The text after the last newline (empty if the file ends with one).
+    last_line = lines.pop()
+    if last_line:
+        lines.append(last_line)
+    unterminated = len(lines) - 1 if last_line else -1
+
+    for index, line in enumerate(lines):
+        key, equal, value = line.partition('=')
+        locale = None
+        if not equal:
+            key = None
+        elif not key:
+            # Unusual entry, starting with `=`
+            key, locale, value = split_entry(line) or (None, None, None)
+        elif '[' in key:
+            bracket = key.find('[')
+            if bracket > 0 and key[-1] == ']' and len(key) > bracket + 2:
+                # Localized entry: Key[Locale]=Value
+                locale = key[bracket:].strip('[]')
+                key = key[:bracket]
+            else:
+                # Unusual entry, with brackets in the key
+                key, locale, value = split_entry(line)
+
+        if key is not None:
+            after_header = False
+            if projection and (
+                    current_group != DESKTOP_ENTRY
+                    or (keys is not None and key not in keys)
+                    or (locale is not None and locales is not None
+                        and locale not in locales)):
+                continue
+            if entries is None:
+                # An entry before any group
+                raise KeyError(current_group)
+            # Check boolean entries
+            if key in BOOLEAN_KEYS:
+                value = _to_bool(key, value)
+            # Check multiple string entries (string lists)
+            elif key in LIST_KEYS:
+                value = split(value)
+            # Keys and locales are repeated in every file, share them.
+            key = intern(key)
+            if locale is not None:
+                locale = intern(locale)
+            entries[key, locale] = value
+        elif after_header and (not line or line.isspace()):
+            continue
+        elif index != unterminated and \
+                (line.startswith('#') or not line.strip(_BLANK)):
+            # Comment, or empty line
+            after_header = False
+        else:
+            header = line.rstrip()
+            if len(header) < 3 or header[0] != '[' or header[-1] != ']':
+                raise SyntaxError("Tokenization failed!")
+            if projection and current_group == DESKTOP_ENTRY:
+                # The end of the only group we are interested in.
+                break
+            current_group = header[1:-1]
+            if not projection or current_group == DESKTOP_ENTRY:
+                group = EntryGroup(current_group)
+                entry_groups[current_group] = group
+                entries = group.entries
+            after_header = True
+    return entry_groups
+
+
+def parse(filepath, name, keys=None, locales=None):
     """
     Parses desktop entry file.
 
+    By default, the whole file is parsed. A projection can be requested with
+    `keys` and/or `locales`: only the `Desktop Entry` group is then parsed
+    (the rest of the file is ignored), and only the requested entries are
+    kept. As translations make up most of a typical file, this is much
+    faster and lighter when only a few values are needed.
+
     Args:
         filepath: The complete path to the Desktop Entry file.
         name: The name of the file (e.g. com-mycompany-myapp.desktop)
+        keys: The set of keys to keep (e.g. `SUMMARY_KEYS`), or None to keep
+            all keys.
+        locales: The set of locales to keep for localized entries (e.g.
+            {'fr'}), or None to keep all locales. Entries without a locale
+            are always kept.
     Returns:
         DesktopFile. Instance of DesktopFile class which represents the
             parsed desktop file.
     """
     with open(filepath, 'r') as f:
-        tokens = tok_gen(f.read())
-
-    # Desktop files entry groups
-    entry_groups = {}
+        text = f.read()
 
-    # Refine symbol stream.
     try:
-        current_group = None
-        for t in tokens:
-            tok_name = t[0]
-            subvalues = t[1]
-            if tok_name == "EMPTY_LINE":
-                continue
-            elif tok_name == "COMMENT_LINE":
-                continue
-            elif tok_name == "GROUP_HEADER":
-                current_group = subvalues[0]
-                entry_groups[current_group] = EntryGroup(current_group)
-                continue
-            elif tok_name == "ENTRY":
-                entry_name = subvalues[0]
-                entry_value = subvalues[2]
-                entry_locale = subvalues[1].strip("[]") \
-                    if subvalues[1] else None
-                entry = Entry(entry_name, entry_value, entry_locale)
-
-                # Check boolean entries
-                if entry.key in ["NoDisplay", "Hidden", "Terminal",
-                                 "StartupNotify", "X-MultipleArgs"]:
-                    entry.value = convert_bool(entry)
-                # Check multiple string entries (string lists)
-                elif entry.key in ["OnlyShowIn", "NotShowIn", "Actions",
-                                   "MimeType", "Categories", "Keywords"]:
-                    entry.value = split(entry.value)
-
-                entry_groups[current_group].add_entry(entry)
-            else:
-                msg = f'Token unrecognized while parsing Desktop file: {name}'
-                logger.warning(msg)
+        entry_groups = parse_text(text, keys, locales)
     except SyntaxError as e:
         msg = f'Syntax error {e} when parsing Desktop file: {name}'
         logger.error(msg)
         return None
 
-    name = name.replace('/', '-')
-
-    df = DesktopEntry(entry_groups, name)
+    df = DesktopEntry(entry_groups, desktop_file_id(name))
     return df
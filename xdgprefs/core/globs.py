@@ -0,0 +1,186 @@
+"""
+This module provides an index of glob patterns, used to find the MIME types
+of a file from its name.
+
+Patterns are sorted into 3 tiers, which are tried in order (as `xdgmime`
+does): literal names (e.g. `Makefile`) are looked up in a dict, simple
+patterns (e.g. `*.tar.gz`) in a trie of reversed suffixes, and only the
+remaining globs (e.g. `*.[1-9]`) are matched with regular expressions.
+
+https://specifications.freedesktop.org/shared-mime-info-spec/shared-mime-info-spec-0.21.html#id-1.5.3
+"""
+
+
+import fnmatch
+import logging
+import re
+from typing import List, Tuple
+
+
+DEFAULT_WEIGHT = 50
+
+# Pattern of `globs2` files that removes the globs of a type defined in
+# less important directories.
+NO_GLOBS = '__NOGLOBS__'
+
+_GLOB_CHARS = re.compile(r'[*?\[]')
+
+# Key of the matches of a node, in the suffix trie (never a character)
+_LEAF = ''
+
+
+logger = logging.getLogger('GlobIndex')
+
+
+def read_globs2(path):
+    """
+    Read a `globs2` file.
+
+    :return: A list of (weight, mimetype, pattern, case_sensitive).
+    """
+    globs = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.rstrip('\n')
+            if not line or line.startswith('#'):
+                continue
+            fields = line.split(':')
+            if len(fields) < 3:
+                logger.warning(f'Invalid line in {path}: {line}')
+                continue
+            try:
+                weight = int(fields[0])
+            except ValueError:
+                logger.warning(f'Invalid weight in {path}: {line}')
+                continue
+            flags = fields[3].split(',') if len(fields) > 3 else []
+            globs.append((weight, fields[1], fields[2], 'cs' in flags))
+    return globs
+
+
+class GlobIndex(object):
+    """
+    Glob patterns of MIME types, indexed to match filenames quickly.
+
+    Patterns are added with `add` (or `add_globs2`); the index is (re)built
+    the first time a filename is matched after patterns were changed.
+    """
+
+    def __init__(self):
+        # mimetype -> {pattern: (weight, case_sensitive)}
+        self.globs = {}
+        self._dirty = True
+        # Case-insensitive tiers (with lowercase patterns), then
+        # case-sensitive ones. Matches are lists of (mimetype, weight,
+        # length of the pattern).
+        self._literals = ({}, {})
+        self._suffixes = ({}, {})
+        self._patterns = ([], [])
+
+    def add(self, pattern, mimetype, weight=DEFAULT_WEIGHT,
+            case_sensitive=False):
+        """Add the glob pattern of a MIME type."""
+        self.globs.setdefault(mimetype, {})[pattern] = (weight,
+                                                        case_sensitive)
+        self._dirty = True
+
+    def remove_type(self, mimetype):
+        """Remove all the glob patterns of a MIME type."""
+        if self.globs.pop(mimetype, None) is not None:
+            self._dirty = True
+
+    def add_globs2(self, path):
+        """
+        Add the patterns of a `globs2` file. The `__NOGLOBS__` lines remove
+        the patterns that were added before for their MIME type.
+        """
+        seen = set()
+        for weight, mimetype, pattern, case_sensitive in read_globs2(path):
+            if pattern == NO_GLOBS:
+                self.remove_type(mimetype)
+            elif (pattern, mimetype) not in seen:
+                # Case-sensitive patterns are written a second time without
+                # their flag, for older readers: the first line wins.
+                seen.add((pattern, mimetype))
+                self.add(pattern, mimetype, weight, case_sensitive)
+
+    def match(self, filename) -> List[Tuple[str, int]]:
+        """
+        Return the MIME types whose patterns match a filename.
+
+        Literal patterns are tried first, then suffixes (the longest one
+        wins), then the other globs. As in `xdgmime`, each tier is first
+        tried with the filename as-is (against all patterns), then with the
+        lowercase filename (against case-insensitive patterns only).
+
+        :return: A list of (mimetype, weight), sorted by decreasing weight,
+            then by decreasing length of the pattern.
+        """
+        if self._dirty:
+            self._build()
+        lower = filename.lower()
+        insensitive, sensitive = self._literals
+        matches = insensitive.get(filename, []) + sensitive.get(filename, [])
+        if not matches and lower != filename:
+            matches = insensitive.get(lower, [])
+        if not matches:
+            insensitive, sensitive = self._suffixes
+            matches = self._match_suffix(filename, insensitive) \
+                + self._match_suffix(filename, sensitive)
+            if not matches and lower != filename:
+                matches = self._match_suffix(lower, insensitive)
+        if not matches:
+            insensitive, sensitive = self._patterns
+            matches = [match for regex, match in insensitive + sensitive
+                       if regex(filename)]
+            if not matches and lower != filename:
+                matches = [match for regex, match in insensitive
+                           if regex(lower)]
+            if not matches:
+                return []
+        if len(matches) == 1:
+            mimetype, weight, _ = matches[0]
+            return [(mimetype, weight)]
+        matches.sort(key=lambda m: (-m[1], -m[2]))
+        result = []
+        for mimetype, weight, _ in matches:
+            if all(mimetype != other for other, _ in result):
+                result.append((mimetype, weight))
+        return result
+
+    @staticmethod
+    def _match_suffix(name, node):
+        """Return the matches of the longest suffix of `name` in a trie."""
+        found = []
+        for char in reversed(name):
+            node = node.get(char)
+            if node is None:
+                break
+            found = node.get(_LEAF, found)
+        return found
+
+    def _build(self):
+        literals = ({}, {})
+        suffixes = ({}, {})
+        patterns = ([], [])
+        for mimetype, globs in self.globs.items():
+            for pattern, (weight, case_sensitive) in globs.items():
+                tier = int(case_sensitive)
+                if not case_sensitive:
+                    pattern = pattern.lower()
+                match = (mimetype, weight, len(pattern))
+                if not _GLOB_CHARS.search(pattern):
+                    literals[tier].setdefault(pattern, []).append(match)
+                elif pattern.startswith('*') \
+                        and not _GLOB_CHARS.search(pattern, 1):
+                    node = suffixes[tier]
+                    for char in reversed(pattern[1:]):
+                        node = node.setdefault(char, {})
+                    node.setdefault(_LEAF, []).append(match)
+                else:
+                    regex = re.compile(fnmatch.translate(pattern))
+                    patterns[tier].append((regex.match, match))
+        self._literals = literals
+        self._suffixes = suffixes
+        self._patterns = patterns
+        self._dirty = False
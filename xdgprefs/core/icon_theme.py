@@ -0,0 +1,386 @@
+"""
+This module implements the lookup of icons in icon themes, as defined by the
+freedesktop.org Icon Theme specification.
+
+Instead of looking for each icon in every directory of every theme (which
+costs several `stat` calls per lookup), the directories of the current theme
+and of the themes it inherits are listed once, into an index of the icon
+files by name. The listings (and the parsed `index.theme` files) are kept in
+a snapshot, so that only the directories that changed are listed again.
+
+Lookups only read the index, and are safe to do from any thread.
+
+https://specifications.freedesktop.org/icon-theme-spec/latest/
+"""
+
+
+import configparser
+import logging
+import os
+import threading
+
+from xdgprefs.core import os_env
+from xdgprefs.core.lru import LRUCache
+from xdgprefs.core.snapshot import Snapshot, MISSING
+
+
+# Extensions of the icon files, by order of preference
+EXTENSIONS = ('.png', '.svg', '.xpm')
+
+# Theme that is always looked in, after the current one and its parents
+FALLBACK_THEME = 'hicolor'
+
+# Types of the directories of a theme
+FIXED = 'Fixed'
+SCALABLE = 'Scalable'
+THRESHOLD = 'Threshold'
+
+
+logger = logging.getLogger('IconTheme')
+
+
+def icon_dirs():
+    """
+    List the base directories where icon themes are looked for, by order of
+    preference.
+    """
+    dirs = [os.path.expanduser('~/.icons')]
+    dirs.append(os.path.join(os_env.xdg_data_home(), 'icons'))
+    dirs.extend(os.path.join(d, 'icons') for d in os_env.xdg_data_dirs())
+    return dirs
+
+
+def pixmap_dirs():
+    """List the directories of the icons that are not part of a theme."""
+    return ['/usr/share/pixmaps']
+
+
+class IconDir(object):
+    """
+    A directory of an icon theme (e.g. `48x48/apps`), which holds icons of a
+    given size.
+    """
+
+    __slots__ = ('name', 'size', 'scale', 'type', 'min_size', 'max_size',
+                 'threshold')
+
+    def __init__(self, name, size, scale=1, _type=THRESHOLD, min_size=None,
+                 max_size=None, threshold=2):
+        self.name = name
+        self.size = size
+        self.scale = scale
+        self.type = _type
+        self.min_size = size if min_size is None else min_size
+        self.max_size = size if max_size is None else max_size
+        self.threshold = threshold
+
+    def matches(self, size, scale):
+        """Check if the icons of this directory fit the requested size."""
+        if self.scale != scale:
+            return False
+        if self.type == FIXED:
+            return self.size == size
+        if self.type == SCALABLE:
+            return self.min_size <= size <= self.max_size
+        return self.size - self.threshold <= size \
+            <= self.size + self.threshold
+
+    def distance(self, size, scale):
+        """Return how far the icons of this directory are from a size."""
+        wanted = size * scale
+        if self.type == FIXED:
+            return abs(self.size * self.scale - wanted)
+        if self.type == SCALABLE:
+            low, high = self.min_size, self.max_size
+        else:
+            low = self.size - self.threshold
+            high = self.size + self.threshold
+        if wanted < low * self.scale:
+            return low * self.scale - wanted
+        if wanted > high * self.scale:
+            return wanted - high * self.scale
+        return 0
+
+    def __repr__(self):
+        return f'<IconDir {self.name} ({self.size}@{self.scale})>'
+
+
+def parse_index_theme(path):
+    """
+    Parse the `index.theme` file of an icon theme.
+
+    :return: A tuple (inherited themes, [IconDir]).
+    :raise OSError: if the file cannot be read.
+    :raise ValueError: if the file is badly formatted.
+    """
+    config = configparser.RawConfigParser(strict=False,
+                                          delimiters=('=',),
+                                          comment_prefixes=('#',))
+    config.optionxform = str
+    try:
+        with open(path, encoding='utf-8') as f:
+            config.read_file(f, path)
+    except configparser.Error as e:
+        raise ValueError(f'Could not parse {path}: {e}') from e
+    if not config.has_section('Icon Theme'):
+        raise ValueError(f'{path} has no [Icon Theme] group')
+    theme = config['Icon Theme']
+    inherits = tuple(name.strip() for name in theme.get('Inherits',
+                                                        '').split(',')
+                     if name.strip())
+    names = _split(theme.get('Directories', '')) \
+        + _split(theme.get('ScaledDirectories', ''))
+    directories = []
+    for name in dict.fromkeys(names):
+        if not config.has_section(name):
+            continue
+        group = config[name]
+        try:
+            size = int(group['Size'])
+            directories.append(IconDir(
+                name, size,
+                scale=int(group.get('Scale', 1)),
+                _type=group.get('Type', THRESHOLD),
+                min_size=_get_int(group, 'MinSize'),
+                max_size=_get_int(group, 'MaxSize'),
+                threshold=int(group.get('Threshold', 2))))
+        except (KeyError, ValueError):
+            logger.warning(f'Ignoring the invalid directory {name} of '
+                           f'{path}')
+    return inherits, directories
+
+
+def _split(value):
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def _get_int(group, key):
+    value = group.get(key)
+    return None if value is None else int(value)
+
+
+def list_icons(directory):
+    """
+    List the icon files of a directory.
+
+    :return: A list of filenames, sorted by icon name and then by
+        preference of their extension, or None if the directory cannot be
+        listed.
+    """
+    try:
+        filenames = os.listdir(directory)
+    except OSError:
+        return None
+    icons = [filename for filename in filenames
+             if os.path.splitext(filename)[1] in EXTENSIONS]
+    icons.sort(key=_icon_order)
+    return icons
+
+
+def _icon_order(filename):
+    name, extension = os.path.splitext(filename)
+    return name, EXTENSIONS.index(extension)
+
+
+class IconDatabase(object):
+    """
+    This class finds the files of icons (by name and size) in the current
+    icon theme, the themes it inherits, and the `hicolor` theme.
+
+    The index of the icon files is built the first time an icon is looked
+    up (see `lookup`).
+    """
+
+    def __init__(self, theme=None, use_snapshot=True, cache_size=1024):
+        """
+        :param theme: The name of the icon theme (by default, the theme of
+            the current desktop, see `os_env.get_icon_theme`).
+        :param use_snapshot: If set to `True`, the listings of the theme
+            directories are kept in an on-disk snapshot, and only the
+            directories that changed are listed again.
+        :param cache_size: The maximum number of lookups whose result is
+            kept in memory.
+        """
+        self.logger = logging.getLogger('IconDatabase')
+        self.theme = theme or os_env.get_icon_theme() or FALLBACK_THEME
+        self.use_snapshot = use_snapshot
+        # The names of the themes to look in, by order of preference
+        self.themes = []
+        # icon name -> [(theme index, IconDir, path)], in the order of the
+        # specification (theme, directory, base directory, extension)
+        self.icons = None
+        # icon name -> path, for the icons that are not part of a theme
+        self.pixmaps = None
+        self._results = LRUCache(cache_size)
+        self._lock = threading.Lock()
+
+    def _build_index(self):
+        self.logger.debug(f'Building the index of the {self.theme} icon '
+                          f'theme...')
+        snapshot = Snapshot('icons') if self.use_snapshot else None
+        if snapshot is not None:
+            snapshot.load()
+        base_dirs = icon_dirs()
+        themes = []
+        icons = {}
+        for index, (name, directories) in enumerate(
+                self._theme_chain(base_dirs, snapshot)):
+            themes.append(name)
+            for icon_dir in directories:
+                for base_dir in base_dirs:
+                    directory = os.path.join(base_dir, name, icon_dir.name)
+                    for filename in self._list_icons(directory,
+                                                     snapshot) or ():
+                        icon_name = os.path.splitext(filename)[0]
+                        path = os.path.join(directory, filename)
+                        icons.setdefault(icon_name, []).append(
+                            (index, icon_dir, path))
+        pixmaps = {}
+        for directory in base_dirs + pixmap_dirs():
+            for filename in self._list_icons(directory, snapshot) or ():
+                pixmaps.setdefault(os.path.splitext(filename)[0],
+                                   os.path.join(directory, filename))
+        if snapshot is not None:
+            snapshot.save()
+        self.themes = themes
+        self.pixmaps = pixmaps
+        # Set last: `lookup` does not wait for the lock once it is set
+        self.icons = icons
+
+    def _theme_chain(self, base_dirs, snapshot):
+        """
+        Return the themes to look in, as a list of (name, [IconDir]): the
+        current theme, the themes it inherits (recursively), and `hicolor`.
+        """
+        chain = []
+        seen = set()
+
+        def visit(name):
+            if name in seen:
+                return
+            seen.add(name)
+            theme = self._read_theme(name, base_dirs, snapshot)
+            if theme is None:
+                self.logger.debug(f'Icon theme {name} not found')
+                return
+            inherits, directories = theme
+            chain.append((name, directories))
+            for parent in inherits:
+                visit(parent)
+
+        visit(self.theme)
+        visit(FALLBACK_THEME)
+        return chain
+
+    def _read_theme(self, name, base_dirs, snapshot):
+        """
+        Return the (inherits, directories) of a theme, from the first
+        `index.theme` file found, or None.
+        """
+        for base_dir in base_dirs:
+            path = os.path.join(base_dir, name, 'index.theme')
+            theme = MISSING if snapshot is None else snapshot.lookup(path)
+            if theme is MISSING:
+                try:
+                    theme = parse_index_theme(path)
+                except FileNotFoundError:
+                    continue
+                except (OSError, ValueError) as e:
+                    self.logger.warning(f'Could not read {path}: {e}')
+                    theme = None
+                if snapshot is not None:
+                    snapshot.store(path, theme)
+            if theme is not None:
+                return theme
+        return None
+
+    @staticmethod
+    def _list_icons(directory, snapshot):
+        if snapshot is None:
+            return list_icons(directory)
+        icons = snapshot.lookup(directory)
+        if icons is MISSING:
+            icons = list_icons(directory)
+            # Missing directories are not stored (they have no stamp)
+            snapshot.store(directory, icons)
+        return icons
+
+    def _ensure_index(self):
+        if self.icons is None:
+            with self._lock:
+                if self.icons is None:
+                    self._build_index()
+
+    def lookup(self, names, size, scale=1):
+        """
+        Find the file of an icon.
+
+        :param names: The name of the icon, or a sequence of names by order
+            of preference (e.g. a specific icon and its generic fallbacks).
+            Absolute paths are returned as-is if the file exists.
+        :param size: The wanted size, in pixels.
+        :param scale: The scale of the display.
+
+        :return: The path to the icon file, or None if it was not found.
+        """
+        if isinstance(names, str):
+            names = (names,)
+        else:
+            names = tuple(names)
+        key = (names, size, scale)
+        path = self._results.get(key)
+        if path is None:
+            path = self._lookup(names, size, scale) or ''
+            self._results.put(key, path)
+        return path or None
+
+    def _lookup(self, names, size, scale):
+        self._ensure_index()
+        names = [self._icon_name(name) for name in names if name]
+        for name in names:
+            if os.path.isabs(name):
+                if os.path.isfile(name):
+                    return name
+        # The themes are looked in one after the other, so that a generic
+        # icon of the current theme is preferred to a specific icon of the
+        # fallback theme.
+        for theme in range(len(self.themes)):
+            for name in names:
+                path = self._lookup_in_theme(name, size, scale, theme)
+                if path is not None:
+                    return path
+        for name in names:
+            path = self.pixmaps.get(name)
+            if path is not None:
+                return path
+        return None
+
+    @staticmethod
+    def _icon_name(name):
+        """Remove the extension of an icon name (a common mistake)."""
+        if not os.path.isabs(name):
+            stem, extension = os.path.splitext(name)
+            if extension in EXTENSIONS:
+                return stem
+        return name
+
+    def _lookup_in_theme(self, name, size, scale, theme):
+        """
+        Find an icon in the theme at index `theme` of `themes`: the first
+        file whose directory matches the size, or else the closest one.
+        """
+        closest = None
+        closest_distance = None
+        for index, icon_dir, path in self.icons.get(name, ()):
+            if index != theme:
+                continue
+            if icon_dir.matches(size, scale):
+                return path
+            distance = icon_dir.distance(size, scale)
+            if closest_distance is None or distance < closest_distance:
+                closest = path
+                closest_distance = distance
+        return closest
+
+    def __str__(self):
+        return f'<IconDatabase {self.theme}>'
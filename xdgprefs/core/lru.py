@@ -0,0 +1,62 @@
+"""
+This module defines a small, thread-safe, Least Recently Used cache.
+"""
+
+
+import threading
+from collections import OrderedDict
+
+
+class LRUCache(object):
+    """
+    A mapping that holds at most `maxsize` items: when it is full, adding an
+    item evicts the least recently used one.
+    """
+
+    def __init__(self, maxsize=128, on_evict=None):
+        """
+        :param maxsize: The maximum number of items (None for no limit).
+        :param on_evict: An optional function, called with (key, value) for
+            each evicted item.
+        """
+        self.maxsize = maxsize
+        self.on_evict = on_evict
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Return the value of `key` (marking it as recently used)."""
+        with self._lock:
+            try:
+                self._items.move_to_end(key)
+            except KeyError:
+                return default
+            return self._items[key]
+
+    def put(self, key, value):
+        """Add (or replace) an item, evicting the oldest ones if needed."""
+        evicted = []
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            if self.maxsize is not None:
+                while len(self._items) > self.maxsize:
+                    evicted.append(self._items.popitem(last=False))
+        if self.on_evict is not None:
+            for item in evicted:
+                self.on_evict(*item)
+
+    def pop(self, key, default=None):
+        """Remove an item (without calling `on_evict`) and return it."""
+        with self._lock:
+            return self._items.pop(key, default)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __len__(self):
+        return len(self._items)
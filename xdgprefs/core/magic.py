@@ -0,0 +1,302 @@
+"""
+This module provides a content sniffing engine, which finds the MIME type of
+a file from its first bytes, using the `magic` files of the shared-mime-info
+database.
+
+Each rule is compiled once: plain values are searched with `bytes.find`,
+and masked values with a regular expression (one character class per
+byte), so that matching a file does not allocate anything per rule. Files
+are read into a reused buffer, only as far as the rules can look.
+
+Most rules look for a value at a fixed offset: they are indexed by their
+offset and first byte, so that only the rules whose first byte is found in
+a file are evaluated.
+
+https://specifications.freedesktop.org/shared-mime-info-spec/shared-mime-info-spec-0.21.html#id-1.5.6
+"""
+
+
+import logging
+import re
+import sys
+from typing import List, Optional
+
+
+MAGIC_HEADER = b'MIME-Magic\0\n'
+
+# Line of a section that removes the rules of its type defined in less
+# important directories.
+NO_MAGIC = b'__NOMAGIC__\n'
+
+
+logger = logging.getLogger('Magic')
+
+
+class MagicRule(object):
+    """
+    A single rule: `value` (optionally masked) must be found at `offset`,
+    or anywhere in the next `range_length` bytes. If the rule has children,
+    one of them must match as well.
+    """
+
+    __slots__ = ('offset', 'end', 'value', 'search', 'children')
+
+    def __init__(self, offset, value, mask=None, word_size=1,
+                 range_length=1):
+        if word_size in (2, 4) and sys.byteorder == 'little':
+            # Values are stored in big-endian order
+            value = _swap(value, word_size)
+            mask = _swap(mask, word_size) if mask is not None else None
+        self.offset = offset
+        # The value must end before this offset
+        self.end = offset + range_length - 1 + len(value)
+        self.value = value
+        self.search = None
+        if mask is not None and any(byte != 0xff for byte in mask):
+            self.search = re.compile(_masked_pattern(value, mask),
+                                     re.DOTALL).search
+        self.children = []
+
+    def matches(self, buffer, size):
+        """Check if the rule matches the first `size` bytes of `buffer`."""
+        end = self.end if self.end < size else size
+        if self.search is None:
+            found = buffer.find(self.value, self.offset, end) != -1
+        else:
+            found = self.search(buffer, self.offset, end) is not None
+        if not found:
+            return False
+        return not self.children or _match_any(self.children, buffer, size)
+
+    @property
+    def fixed(self):
+        """Whether the value can only be found at `offset` (unmasked)."""
+        return self.search is None and bool(self.value) \
+            and self.end == self.offset + len(self.value)
+
+    @property
+    def extent(self):
+        """The number of bytes needed to evaluate this rule."""
+        return max([self.end] + [child.extent for child in self.children])
+
+
+def _match_any(rules, buffer, size):
+    for rule in rules:
+        if rule.matches(buffer, size):
+            return True
+    return False
+
+
+def _section_index(candidate):
+    return candidate[0]
+
+
+def _swap(data, word_size):
+    """Swap the bytes of each word of `data`."""
+    return b''.join(data[i:i + word_size][::-1]
+                    for i in range(0, len(data), word_size))
+
+
+def _masked_pattern(value, mask):
+    """Return a regular expression matching `value` under `mask`."""
+    parts = []
+    for byte, byte_mask in zip(value, mask):
+        if byte_mask == 0xff:
+            parts.append(b'\\x%02x' % byte)
+        elif byte_mask == 0:
+            parts.append(b'.')
+        else:
+            allowed = [b'\\x%02x' % other for other in range(256)
+                       if other & byte_mask == byte & byte_mask]
+            parts.append(b'[' + b''.join(allowed) + b']')
+    return b''.join(parts)
+
+
+def read_magic(path):
+    """
+    Read a `magic` file.
+
+    :return: A list of (priority, mimetype, rules), where rules is None for
+        `__NOMAGIC__` sections.
+    :raise ValueError: if the file is not a valid `magic` file.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    if not data.startswith(MAGIC_HEADER):
+        raise ValueError(f'{path} is not a magic file')
+    sections = []
+    rules = None
+    # The last rule at each indentation level
+    parents = []
+    pos = len(MAGIC_HEADER)
+    size = len(data)
+    while pos < size:
+        if data[pos] == ord('['):
+            end = data.index(b']\n', pos)
+            priority, mimetype = data[pos + 1:end].decode().split(':', 1)
+            rules = []
+            parents = []
+            sections.append((int(priority), mimetype, rules))
+            pos = end + 2
+            continue
+        if rules is None:
+            raise ValueError(f'Rule outside of a section in {path}')
+        if data.startswith(NO_MAGIC, pos):
+            priority, mimetype, _ = sections[-1]
+            sections[-1] = (priority, mimetype, None)
+            pos += len(NO_MAGIC)
+            continue
+
+        # [ indent ] ">" start-offset "=" value
+        # [ "&" mask ] [ "~" word-size ] [ "+" range-length ] "\n"
+        indent, pos = _read_int(data, pos, 0)
+        offset, pos = _read_int(data, pos + 1)
+        length = int.from_bytes(data[pos + 1:pos + 3], 'big')
+        pos += 3
+        value = data[pos:pos + length]
+        pos += length
+        mask = None
+        word_size = range_length = 1
+        if data[pos] == ord('&'):
+            mask = data[pos + 1:pos + 1 + length]
+            pos += 1 + length
+        if data[pos] == ord('~'):
+            word_size, pos = _read_int(data, pos + 1)
+        if data[pos] == ord('+'):
+            range_length, pos = _read_int(data, pos + 1)
+        if data[pos] != ord('\n'):
+            # Unknown extension: the whole line must be ignored
+            pos = data.index(b'\n', pos) + 1
+            continue
+        pos += 1
+
+        rule = MagicRule(offset, value, mask, word_size, range_length)
+        del parents[indent:]
+        if indent == 0:
+            rules.append(rule)
+        elif len(parents) == indent:
+            parents[-1].children.append(rule)
+        else:
+            logger.warning(f'Invalid indentation in {path}, ignoring a rule')
+            continue
+        parents.append(rule)
+    return sections
+
+
+def _read_int(data, pos, default=None):
+    """Read a decimal number at `pos`, and return it with the new pos."""
+    end = pos
+    while data[end:end + 1].isdigit():
+        end += 1
+    if end == pos:
+        if default is None:
+            raise ValueError(f'Expected a number at {pos}')
+        return default, pos
+    return int(data[pos:end]), end
+
+
+class MagicTable(object):
+    """
+    The magic rules of all MIME types, sorted by decreasing priority.
+
+    Sections are added with `add_magic`; the table is sorted the first time
+    a file is matched after sections were added.
+    """
+
+    def __init__(self):
+        # mimetype -> [(priority, rules)], as a type can have several
+        # sections (with different priorities)
+        self.sections = {}
+        self._sorted = None
+        self._extent = 0
+        # offset -> {first byte: [(section index, rule)]}, for fixed rules
+        self._fixed = {}
+        # [(section index, rule)], for the other rules
+        self._other = []
+
+    def add_magic(self, path):
+        """
+        Add the sections of a `magic` file. The sections of a MIME type
+        replace the ones that were added before (from another file).
+        """
+        added = {}
+        for priority, mimetype, rules in read_magic(path):
+            if rules is None:
+                self.sections.pop(mimetype, None)
+            else:
+                added.setdefault(mimetype, []).append((priority, rules))
+        self.sections.update(added)
+        self._sorted = None
+
+    @property
+    def extent(self):
+        """The number of bytes of a file needed to evaluate all rules."""
+        if self._sorted is None:
+            self._sort()
+        return self._extent
+
+    def _sort(self):
+        self._sorted = sorted(((priority, mimetype, rules)
+                               for mimetype, sections in self.sections.items()
+                               for priority, rules in sections),
+                              key=lambda section: -section[0])
+        self._extent = max([rule.extent for _, _, rules in self._sorted
+                            for rule in rules] + [0])
+        self._fixed = {}
+        self._other = []
+        for index, (_, _, rules) in enumerate(self._sorted):
+            for rule in rules:
+                if rule.fixed:
+                    self._fixed.setdefault(rule.offset, {}).setdefault(
+                        rule.value[0], []).append((index, rule))
+                else:
+                    self._other.append((index, rule))
+
+    def match(self, buffer, size=None) -> Optional[str]:
+        """
+        Return the MIME type of the highest priority section that matches
+        the first `size` bytes of `buffer`, or None.
+        """
+        if self._sorted is None:
+            self._sort()
+        if size is None:
+            size = len(buffer)
+        candidates = list(self._other)
+        for offset, rules in self._fixed.items():
+            if offset < size:
+                candidates += rules.get(buffer[offset], ())
+        candidates.sort(key=_section_index)
+        for index, rule in candidates:
+            if rule.matches(buffer, size):
+                return self._sorted[index][1]
+        return None
+
+    def match_file(self, path, buffer=None) -> Optional[str]:
+        """
+        Return the MIME type of a file from its content, or None.
+
+        :param buffer: An optional bytearray (of at least `extent` bytes) to
+            read the file into, that can be reused between calls.
+        :raise OSError: if the file cannot be read.
+        """
+        extent = self.extent
+        if buffer is None or len(buffer) < extent:
+            buffer = bytearray(extent)
+        with open(path, 'rb', buffering=0) as f:
+            size = f.readinto(memoryview(buffer)[:extent])
+        return self.match(buffer, size)
+
+    def match_files(self, paths) -> List[Optional[str]]:
+        """
+        Return the MIME types of many files (None for the files that do not
+        match, or cannot be read), reusing a single buffer.
+        """
+        buffer = bytearray(self.extent)
+        result = []
+        for path in paths:
+            try:
+                result.append(self.match_file(path, buffer))
+            except OSError as e:
+                logger.debug(f'Could not read {path}: {e}')
+                result.append(None)
+        return result
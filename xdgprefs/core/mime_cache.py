@@ -0,0 +1,377 @@
+"""
+This module provides a reader for the binary `mime.cache` file, which is
+compiled by `update-mime-database` in each <MIME> directory.
+
+The file is memory-mapped, and lookups (aliases, parents, icons, globs) are
+answered directly from the mapped buffer: nothing is decoded up-front, and
+only the strings touched by a lookup are read.
+
+The format of the file is documented along with `shared-mime-info`, and is
+the one read by `xdgmime` (used by GLib and others).
+"""
+
+
+import fnmatch
+import logging
+import mmap
+import os
+import struct
+from typing import List, Optional, Tuple
+
+from xdgprefs.core.mime_type import MimeType, MimeTypeParser
+
+
+_HEADER = struct.Struct('>HH9I')
+_CARD32 = struct.Struct('>I')
+_PAIR = struct.Struct('>II')
+_TRIPLE = struct.Struct('>III')
+
+# Flag (in the WEIGHT_AND_FLAGS field) for case-sensitive glob patterns.
+CASE_SENSITIVE = 0x100
+WEIGHT_MASK = 0xff
+
+
+logger = logging.getLogger('MimeCache')
+
+
+def cache_is_fresh(mime_dir):
+    """
+    Check if the `mime.cache` of a <MIME> directory exists, and is at least
+    as recent as its sources (the XML files in the `packages` subdirectory).
+    """
+    cache_path = os.path.join(mime_dir, 'mime.cache')
+    types_path = os.path.join(mime_dir, 'types')
+    try:
+        cache_mtime = os.stat(cache_path).st_mtime_ns
+        os.stat(types_path)
+    except OSError:
+        return False
+    packages = os.path.join(mime_dir, 'packages')
+    try:
+        sources = [packages] + [f.path for f in os.scandir(packages)
+                                if f.name.endswith('.xml')]
+    except OSError:
+        # No sources: the cache is the only description of this directory.
+        return True
+    for source in sources:
+        try:
+            if os.stat(source).st_mtime_ns > cache_mtime:
+                return False
+        except OSError:
+            continue
+    return True
+
+
+def open_mime_cache(mime_dir):
+    """
+    Open the `mime.cache` of a <MIME> directory.
+
+    :return: A MimeCache, or None if the cache is missing, outdated, or
+        cannot be read.
+    """
+    if not cache_is_fresh(mime_dir):
+        return None
+    path = os.path.join(mime_dir, 'mime.cache')
+    try:
+        return MimeCache(path)
+    except (OSError, ValueError, struct.error) as e:
+        logger.warning(f'Could not read {path}: {e}')
+        return None
+
+
+class MimeCache(object):
+    """
+    Read-only access to a `mime.cache` file.
+
+    All lists in the file are sorted, so lookups are binary searches on the
+    mapped buffer. Offsets and strings are read on demand.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.directory = os.path.dirname(path)
+        with open(path, 'rb') as f:
+            self._buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        header = _HEADER.unpack_from(self._buf, 0)
+        major, minor = header[0], header[1]
+        if major != 1 or minor < 1:
+            self._buf.close()
+            raise ValueError(f'Unsupported mime.cache version '
+                             f'{major}.{minor}')
+        # Strings are decoded from slices of this view, without copying them
+        self._view = memoryview(self._buf)
+        (self._alias_list,
+         self._parent_list,
+         self._literal_list,
+         self._suffix_tree,
+         self._glob_list,
+         self._magic_list,
+         self._namespace_list,
+         self._icons_list,
+         self._generic_icons_list) = header[2:]
+
+        # Reverse indexes, only built if they are needed.
+        self._patterns = None
+        self._aliases = None
+
+    def close(self):
+        """
+        Unmap the file. The cache (and its CachedMimeTypes) must not be used
+        afterwards.
+        """
+        self._view.release()
+        self._buf.close()
+
+    def list_types(self) -> List[str]:
+        """
+        Return the identifiers of all the MIME types described by this cache.
+
+        The cache itself does not list types that have no glob, alias, icon,
+        etc., so the `types` file (compiled alongside the cache) is read.
+        """
+        with open(os.path.join(self.directory, 'types')) as f:
+            return [line.strip() for line in f if line.strip()]
+
+    def lookup_alias(self, alias) -> Optional[str]:
+        """Return the MIME type that `alias` stands for, or None."""
+        entry = self._search(self._alias_list, 8, alias)
+        if entry is None:
+            return None
+        return self._string(self._u32(entry + 4))
+
+    def get_aliases(self, identifier) -> List[str]:
+        """Return all the aliases of a MIME type."""
+        if self._aliases is None:
+            aliases = {}
+            for entry in self._entries(self._alias_list, 8):
+                alias_offset, type_offset = _PAIR.unpack_from(self._buf, entry)
+                target = self._string(type_offset)
+                alias = self._string(alias_offset)
+                aliases.setdefault(target, []).append(alias)
+            self._aliases = aliases
+        return self._aliases.get(identifier, [])
+
+    def get_parents(self, identifier) -> List[str]:
+        """Return the MIME types that `identifier` is a subclass of."""
+        entry = self._search(self._parent_list, 8, identifier)
+        if entry is None:
+            return []
+        offset = self._u32(entry + 4)
+        n_parents = self._u32(offset)
+        return [self._string(self._u32(offset + 4 + 4 * i))
+                for i in range(n_parents)]
+
+    def get_icon(self, identifier) -> Optional[str]:
+        """Return the name of the icon of a MIME type, or None."""
+        return self._lookup_icon(self._icons_list, identifier)
+
+    def get_generic_icon(self, identifier) -> Optional[str]:
+        """Return the name of the generic icon of a MIME type, or None."""
+        return self._lookup_icon(self._generic_icons_list, identifier)
+
+    def get_patterns(self, identifier) -> List[str]:
+        """Return all the glob patterns of a MIME type."""
+        if self._patterns is None:
+            patterns = {}
+            for pattern, mimetype, _ in self.iter_globs():
+                patterns.setdefault(mimetype, []).append(pattern)
+            self._patterns = patterns
+        return self._patterns.get(identifier, [])
+
+    def iter_globs(self):
+        """
+        Iterate over all the glob patterns of the cache (literals, suffixes
+        and other globs).
+
+        :return: A generator of (pattern, mimetype, weight_and_flags).
+        """
+        for entry in self._entries(self._literal_list, 12):
+            literal, mimetype, flags = _TRIPLE.unpack_from(self._buf, entry)
+            yield self._string(literal), self._string(mimetype), flags
+        n_roots, first_root = _PAIR.unpack_from(self._buf, self._suffix_tree)
+        yield from self._iter_suffixes(n_roots, first_root, '')
+        for entry in self._entries(self._glob_list, 12):
+            glob, mimetype, flags = _TRIPLE.unpack_from(self._buf, entry)
+            yield self._string(glob), self._string(mimetype), flags
+
+    def match_filename(self, filename) -> List[Tuple[str, int]]:
+        """
+        Return the MIME types whose glob patterns match a filename, following
+        the same order as `xdgmime`: literals first, then suffixes, then the
+        other globs.
+
+        :return: A list of (mimetype, weight), sorted by decreasing weight.
+        """
+        lower = filename.lower()
+        # Case-insensitive patterns are stored in lowercase. Each tier is
+        # first tried with the filename itself (against all patterns), then
+        # with the lowercase filename (against case-insensitive patterns).
+        matches = self._lookup_literal(filename, False) \
+            or self._lookup_literal(lower, True)
+        if not matches:
+            matches = self._lookup_suffix(filename, False) \
+                or self._lookup_suffix(lower, True)
+        if not matches:
+            matches = self._lookup_glob(filename, False) \
+                or self._lookup_glob(lower, True)
+        matches.sort(key=lambda match: -match[1])
+        return matches
+
+    def _lookup_literal(self, filename, ignore_case):
+        entry = self._search(self._literal_list, 12, filename)
+        if entry is None:
+            return []
+        _, mimetype, flags = _TRIPLE.unpack_from(self._buf, entry)
+        if not (ignore_case and flags & CASE_SENSITIVE):
+            return [(self._string(mimetype), flags & WEIGHT_MASK)]
+        return []
+
+    def _lookup_suffix(self, filename, ignore_case):
+        if not filename:
+            return []
+        n_roots, first_root = _PAIR.unpack_from(self._buf, self._suffix_tree)
+        return self._lookup_suffix_node(n_roots, first_root, filename,
+                                        len(filename), ignore_case)
+
+    def _lookup_suffix_node(self, n_nodes, offset, filename, length,
+                            ignore_case):
+        character = ord(filename[length - 1])
+        low, high = 0, n_nodes - 1
+        while low <= high:
+            middle = (low + high) // 2
+            node = offset + 12 * middle
+            node_char, n_children, first_child = \
+                _TRIPLE.unpack_from(self._buf, node)
+            if node_char < character:
+                low = middle + 1
+            elif node_char > character:
+                high = middle - 1
+            else:
+                matches = []
+                if length > 1:
+                    matches = self._lookup_suffix_node(
+                        n_children, first_child, filename, length - 1,
+                        ignore_case)
+                if matches:
+                    return matches
+                # No longer suffix matched, look for leaves at this level
+                # (they have a null character, so they come first).
+                for i in range(n_children):
+                    leaf_char, mimetype, flags = \
+                        _TRIPLE.unpack_from(self._buf, first_child + 12 * i)
+                    if leaf_char != 0:
+                        break
+                    if not (ignore_case and flags & CASE_SENSITIVE):
+                        matches.append((self._string(mimetype),
+                                        flags & WEIGHT_MASK))
+                return matches
+        return []
+
+    def _lookup_glob(self, filename, ignore_case):
+        matches = []
+        for entry in self._entries(self._glob_list, 12):
+            glob, mimetype, flags = _TRIPLE.unpack_from(self._buf, entry)
+            if ignore_case and flags & CASE_SENSITIVE:
+                continue
+            if fnmatch.fnmatchcase(filename, self._string(glob)):
+                matches.append((self._string(mimetype),
+                                flags & WEIGHT_MASK))
+        return matches
+
+    def _iter_suffixes(self, n_nodes, offset, suffix):
+        for i in range(n_nodes):
+            char, second, third = _TRIPLE.unpack_from(self._buf,
+                                                      offset + 12 * i)
+            if char == 0:
+                # Leaf node: (0, MIME_TYPE_OFFSET, WEIGHT_AND_FLAGS)
+                yield '*' + suffix, self._string(second), third
+            else:
+                # Inner node: (CHARACTER, N_CHILDREN, FIRST_CHILD_OFFSET)
+                yield from self._iter_suffixes(second, third,
+                                               chr(char) + suffix)
+
+    def _lookup_icon(self, list_offset, identifier):
+        entry = self._search(list_offset, 8, identifier)
+        if entry is None:
+            return None
+        return self._string(self._u32(entry + 4))
+
+    def _u32(self, offset):
+        return _CARD32.unpack_from(self._buf, offset)[0]
+
+    def _string(self, offset):
+        """Return the null-terminated string at `offset`."""
+        end = self._buf.find(b'\0', offset)
+        return str(self._view[offset:end], 'utf-8')
+
+    def _entries(self, list_offset, entry_size):
+        """Iterate over the offsets of the entries of a list."""
+        n_entries = self._u32(list_offset)
+        first = list_offset + 4
+        return range(first, first + n_entries * entry_size, entry_size)
+
+    def _search(self, list_offset, entry_size, key):
+        """
+        Binary search in a list whose entries start with a string offset,
+        sorted by that string.
+
+        :return: The offset of the matching entry, or None.
+        """
+        low, high = 0, self._u32(list_offset) - 1
+        first = list_offset + 4
+        while low <= high:
+            middle = (low + high) // 2
+            entry = first + middle * entry_size
+            value = self._string(self._u32(entry))
+            if value < key:
+                low = middle + 1
+            elif value > key:
+                high = middle - 1
+            else:
+                return entry
+        return None
+
+    def __repr__(self):
+        return f'<MimeCache {self.path}>'
+
+
+class CachedMimeType(MimeType):
+    """
+    A MimeType backed by a MimeCache.
+
+    Its data is read from the cache when accessed; as the cache does not
+    contain comments, the comment is read from the XML file of the type,
+    the first time it is needed. Listing the comments of all types thus
+    parses all the XML files (see `MimeDatabase.load_comments`).
+    """
+
+    __slots__ = ('source', '_cache', '_comment')
+
+    def __init__(self, cache: MimeCache, identifier: str, source: str):
+        self.type, self.subtype = identifier.split('/', 1)
+        self.identifier = identifier
+        self.source = source
+        self._cache = cache
+        self._comment = None
+
+    @property
+    def comment(self) -> str:
+        if self._comment is None:
+            self._comment = MimeTypeParser.parse_comment(self.source)
+        return self._comment
+
+    @property
+    def extensions(self) -> List[str]:
+        return self._cache.get_patterns(self.identifier)
+
+    @property
+    def icon(self) -> Optional[str]:
+        return self._cache.get_generic_icon(self.identifier)
+
+    @property
+    def aliases(self) -> List[str]:
+        return self._cache.get_aliases(self.identifier)
+
+    @property
+    def parents(self) -> List[str]:
+        return self._cache.get_parents(self.identifier)
@@ -8,10 +8,23 @@ https://www.linuxtopia.org/online_books/linux_desktop_guides/gnome_2.14_admin_gu
 
 import os
 import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from typing import Dict
 
 from xdgprefs.core.os_env import xdg_data_dirs, xdg_data_home
+from xdgprefs.core.globs import GlobIndex
+from xdgprefs.core.magic import MagicTable
+from xdgprefs.core.mime_cache import CachedMimeType, open_mime_cache, \
+    CASE_SENSITIVE, WEIGHT_MASK
 from xdgprefs.core.mime_type import MimeType, MimeTypeParser
+from xdgprefs.core.snapshot import Snapshot, MISSING
+
+
+# Below this number of files to parse, starting processes costs more than
+# what parsing in parallel saves.
+PARALLEL_THRESHOLD = 200
 
 
 def mime_dirs(only_existing=True):
@@ -35,6 +48,82 @@ def mime_dirs(only_existing=True):
     return dirs
 
 
+def _process_context():
+    """
+    Return the context used to start the parsing processes.
+
+    The database may be built in a process that already runs other threads
+    (e.g. the GUI, which builds it in the background): forking such a
+    process can deadlock the children, so they are started by a server
+    process instead (or spawned, where there is no such server).
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('forkserver')
+    return multiprocessing.get_context('spawn')
+
+
+def _parse_chunk(paths):
+    """Parse a chunk of files, in a worker process."""
+    return [MimeTypeParser.parse_fields(path) for path in paths]
+
+
+def _media_files(media_dir):
+    """List the files of a <MEDIA> directory (each describing a Mime Type)."""
+    return [f.path for f in os.scandir(media_dir) if f.is_file()]
+
+
+def _media_dirs(mime_dir):
+    """List the <MEDIA> subdirectories of a <MIME> directory."""
+    # Ignore the `packages` subdirectory (not a MEDIA).
+    return [f.path for f in os.scandir(mime_dir) if f.is_dir()
+            and f.name != 'packages']
+
+
+class MimeLayer(object):
+    """
+    The Media Types defined in a single <MIME> directory.
+
+    A layer is either backed by the compiled `mime.cache` of the directory,
+    or by the XML files of its <MEDIA> subdirectories.
+    """
+
+    def __init__(self, path, cache=None):
+        self.path = path
+        self.cache = cache
+        self.types = {}
+        self.aliases = {}
+        # XML file -> identifier of the type it describes
+        self.files = {}
+
+    def add_type(self, mimetype, path=None):
+        """Adds a MimeType (parsed from the XML file `path`) to the layer."""
+        self.types[mimetype.identifier] = mimetype
+        for alias in mimetype.aliases:
+            self.aliases[alias] = mimetype.identifier
+        if path is not None:
+            self.files[path] = mimetype.identifier
+
+    def remove_file(self, path):
+        """
+        Removes the MimeType parsed from the XML file `path`.
+
+        :return: The identifier of the removed type, or None.
+        """
+        identifier = self.files.pop(path, None)
+        mimetype = self.types.pop(identifier, None)
+        if mimetype is not None:
+            for alias in mimetype.aliases:
+                if self.aliases.get(alias) == identifier:
+                    del self.aliases[alias]
+        return identifier
+
+    def lookup_alias(self, identifier):
+        """Return the MIME type that `identifier` is an alias of, or None."""
+        if self.cache is not None:
+            return self.cache.lookup_alias(identifier)
+        return self.aliases.get(identifier)
+
+
 class MimeDatabase(object):
     """
     This class finds and holds all Media Types registered on the computer.
@@ -42,28 +131,253 @@ class MimeDatabase(object):
     It is used to build the database in a first step, and then query it.
     """
 
-    def __init__(self):
+    def __init__(self, use_snapshot=True, use_mime_cache=True, workers=None):
+        """
+        :param use_snapshot: If set to `True`, the parsed files are kept in
+            an on-disk snapshot, and only new or changed files are parsed
+            when the database is built again.
+        :param use_mime_cache: If set to `True`, the compiled `mime.cache`
+            of each <MIME> directory is read instead of its XML files,
+            unless it is missing or older than its sources.
+        :param workers: The number of processes used to parse the XML files
+            (by default, the number of CPUs). If set to 1, or if there are
+            less than `PARALLEL_THRESHOLD` files to parse, the files are
+            parsed serially.
+        """
         self.logger = logging.getLogger('MimeDatabase')
         self.types = {}
+        # By decreasing priority (see `_layers_by_priority`)
+        self.layers = []
+        # All possible <MIME> directories (see `reload_path`)
+        self.dirs = mime_dirs(only_existing=False)
+        # Built the first time a filename (or a content) is matched
+        self.globs = None
+        self.magic = None
+        self.snapshot = Snapshot('mime') if use_snapshot else None
+        self.use_mime_cache = use_mime_cache
+        self.workers = workers
 
         self._build_db()
 
     def _build_db(self):
         """Build the database, searching in the <MIME> directories."""
         self.logger.debug('Building the Mime Database...')
+        if self.snapshot is not None:
+            self.snapshot.load()
+        entries = []
         # First, loop on all <MIME> directories.
         for mime_dir in mime_dirs():
             self.logger.debug(f'Looking in {mime_dir}...')
+            layer = self._open_layer(mime_dir)
+            self.layers.append(layer)
+            if layer.cache is not None:
+                continue
             # Next, loop on the <MEDIA> subdirectories.
-            # Ignore the `packages` subdirectory (not a MEDIA).
-            subdirs = [f.path for f in os.scandir(mime_dir) if f.is_dir()
-                       and f.name != 'packages']
-            for media_dir in subdirs:
-                # Loop on each file (describing a Mime Type)
-                files = [f.path for f in os.scandir(media_dir) if f.is_file()]
-                for filepath in files:
-                    mimetype = MimeTypeParser.parse(filepath)
-                    self._add_type(mimetype)
+            for media_dir in _media_dirs(mime_dir):
+                entries.extend((layer, path, mimetype) for path, mimetype
+                               in self._list_media_dir(media_dir))
+
+        # Parse the files that are not in the snapshot
+        missing = [path for _, path, mimetype in entries
+                   if mimetype is MISSING]
+        self.logger.debug(f'Parsing {len(missing)} / {len(entries)} files...')
+        parsed = dict(zip(missing, self._parse_files(missing)))
+        if self.snapshot is not None:
+            for path, mimetype in parsed.items():
+                self.snapshot.store(path, mimetype)
+            self.snapshot.save()
+
+        # Fill the layers in the same order as the files were found
+        for layer, path, mimetype in entries:
+            if mimetype is MISSING:
+                mimetype = parsed[path]
+            if mimetype is not None:
+                layer.add_type(mimetype, path)
+
+        for layer in self._layers_by_priority():
+            for mimetype in layer.types.values():
+                self._add_type(mimetype)
+
+    def _layers_by_priority(self):
+        """
+        Return the layers from the least to the most important one.
+
+        `layers` is in the order of the <MIME> directories, which is by
+        decreasing priority (XDG_DATA_HOME first). The layers are applied in
+        the reverse order, so that the definitions of a layer (types,
+        aliases, globs, magic) override the ones of the less important
+        layers, and its `__NOGLOBS__` and `__NOMAGIC__` entries clear them.
+        """
+        return list(reversed(self.layers))
+
+    def _open_layer(self, mime_dir):
+        """
+        Create the layer of a <MIME> directory. If its `mime.cache` can be
+        used, the layer is filled with its types; otherwise, it is empty and
+        its XML files must be parsed.
+        """
+        cache = open_mime_cache(mime_dir) if self.use_mime_cache else None
+        layer = MimeLayer(mime_dir, cache)
+        if cache is not None:
+            self.logger.debug(f'Using {cache.path}')
+            for identifier in cache.list_types():
+                # update-mime-database writes lowercase filenames
+                source = os.path.join(mime_dir, f'{identifier.lower()}.xml')
+                layer.types[identifier] = CachedMimeType(cache, identifier,
+                                                         source)
+        return layer
+
+    def _list_media_dir(self, media_dir):
+        """
+        List the files of a <MEDIA> directory, along with their MimeType if
+        it is known from the snapshot (or `MISSING` otherwise).
+        """
+        if self.snapshot is None:
+            return [(path, MISSING) for path in _media_files(media_dir)]
+        return self.snapshot.list_dir(media_dir, _media_files)
+
+    def _parse_files(self, paths):
+        """
+        Parse a list of files, and return the list of MimeTypes (in the same
+        order). Large lists are parsed by a pool of processes.
+        """
+        workers = self.workers or os.cpu_count() or 1
+        if workers <= 1 or len(paths) < PARALLEL_THRESHOLD:
+            return [MimeTypeParser.parse(path) for path in paths]
+
+        # A few chunks per worker, to balance the load without paying the
+        # inter-process overhead for each single file.
+        chunk_size = -(-len(paths) // (workers * 4))
+        chunks = [paths[i:i + chunk_size]
+                  for i in range(0, len(paths), chunk_size)]
+        self.logger.debug(f'Parsing {len(paths)} files in {len(chunks)} '
+                          f'chunks with {workers} processes...')
+        try:
+            with ProcessPoolExecutor(max_workers=workers,
+                                     mp_context=_process_context()) \
+                    as executor:
+                results = list(executor.map(_parse_chunk, chunks))
+        except (OSError, BrokenProcessPool) as e:
+            self.logger.warning(f'Parallel parsing failed ({e}), parsing '
+                                f'the files serially.')
+            return [MimeTypeParser.parse(path) for path in paths]
+        # `map` keeps the order of the chunks, hence of the files.
+        return [MimeType(*fields) if fields is not None else None
+                for chunk in results for fields in chunk]
+
+    def reload_path(self, path):
+        """
+        Update the database after a file or directory changed.
+
+        Depending on `path`, a single XML file is parsed again (or removed),
+        or a whole <MIME> directory is loaded again when its `mime.cache`
+        changed (or when the directory appeared or disappeared).
+
+        :return: The set of identifiers of the types that changed.
+        """
+        path = os.path.normpath(path)
+        dirs = [os.path.normpath(d) for d in self.dirs]
+        if path in dirs:
+            return self.reload_layer(self.dirs[dirs.index(path)])
+        parent, name = os.path.split(path)
+        if parent in dirs:
+            mime_dir = self.dirs[dirs.index(parent)]
+            if name in ('mime.cache', 'types'):
+                return self.reload_layer(mime_dir)
+            if name == 'packages':
+                return set()
+            # A <MEDIA> directory appeared or disappeared.
+            layer = self._get_layer(mime_dir)
+            if layer is None or layer.cache is not None:
+                return set()
+            prefix = os.path.join(path, '')
+            known = {f for f in layer.files if f.startswith(prefix)}
+            present = set(_media_files(path)) if os.path.isdir(path) \
+                else set()
+            changed = set()
+            for filepath in known ^ present:
+                changed |= self.reload_file(filepath)
+            return changed
+        grandparent, media = os.path.split(parent)
+        if grandparent in dirs and media != 'packages':
+            return self.reload_file(path)
+        return set()
+
+    def reload_file(self, path):
+        """
+        Parse again (or remove) the XML file of a Media Type. Files of a
+        directory that is described by its `mime.cache` are ignored, as the
+        cache is rewritten along with them.
+
+        :return: The set of identifiers of the types that changed.
+        """
+        mime_dir = os.path.dirname(os.path.dirname(os.path.normpath(path)))
+        layer = self._get_layer(mime_dir)
+        if layer is None or layer.cache is not None:
+            return set()
+        changed = set()
+        identifier = layer.remove_file(path)
+        if identifier is not None:
+            changed.add(identifier)
+        if os.path.isfile(path):
+            mimetype = MimeTypeParser.parse(path)
+            if mimetype is not None:
+                layer.add_type(mimetype, path)
+                changed.add(mimetype.identifier)
+        self._update_types(changed)
+        return changed
+
+    def reload_layer(self, mime_dir):
+        """
+        Load again all the types of a <MIME> directory.
+
+        :return: The set of identifiers of the types that changed.
+        """
+        old = self._get_layer(mime_dir)
+        if old is not None:
+            self.layers.remove(old)
+        changed = set(old.types) if old is not None else set()
+
+        if os.path.isdir(mime_dir):
+            layer = self._open_layer(mime_dir)
+            if layer.cache is None:
+                paths = [path for media_dir in _media_dirs(mime_dir)
+                         for path in _media_files(media_dir)]
+                for path, mimetype in zip(paths, self._parse_files(paths)):
+                    if mimetype is not None:
+                        layer.add_type(mimetype, path)
+            # Keep the layers in the same order as the directories
+            index = self.dirs.index(mime_dir)
+            position = len([other for other in self.layers
+                            if self.dirs.index(other.path) < index])
+            self.layers.insert(position, layer)
+            changed |= set(layer.types)
+
+        self._update_types(changed)
+        # The old cache is not closed: the CachedMimeTypes that callers
+        # still hold read it, and it is unmapped once they are all gone.
+        return changed
+
+    def _get_layer(self, mime_dir):
+        mime_dir = os.path.normpath(mime_dir)
+        for layer in self.layers:
+            if os.path.normpath(layer.path) == mime_dir:
+                return layer
+        return None
+
+    def _update_types(self, identifiers):
+        """Update the given types, from the layers that define them."""
+        if identifiers:
+            self.globs = None
+            self.magic = None
+        for identifier in identifiers:
+            # The most important layer that defines it
+            for layer in self.layers:
+                if identifier in layer.types:
+                    self.types[identifier] = layer.types[identifier]
+                    break
+            else:
+                self.types.pop(identifier, None)
 
     def _add_type(self, mimetype):
         """Adds a MimeType to the database."""
@@ -74,12 +388,134 @@ class MimeDatabase(object):
                                 f'in the database, overwriting!')
         self.types[mimetype.identifier] = mimetype
 
+    def load_comments(self):
+        """
+        Read the comments of all the types now. The types of a `mime.cache`
+        otherwise read their comment from their XML file the first time it
+        is accessed (see `CachedMimeType`), which is slow for many types at
+        once, e.g. when they are all displayed.
+        """
+        for mimetype in self.types.values():
+            mimetype.comment
+
     def get_type(self, identifier):
-        """Return the MimeType associated to an identifier."""
+        """
+        Return the MimeType associated to an identifier (or to one of its
+        aliases).
+        """
         if identifier in self.types:
             return self.types[identifier]
-        else:
-            return None
+        return self.types.get(self.resolve_alias(identifier))
+
+    def resolve_alias(self, identifier):
+        """
+        Return the canonical identifier of a MIME type, i.e. the type that
+        `identifier` is an alias of, or `identifier` itself.
+        """
+        # The most important layer that defines it
+        for layer in self.layers:
+            target = layer.lookup_alias(identifier)
+            if target is not None:
+                return target
+        return identifier
+
+    def match_filename(self, filename):
+        """
+        Return the MIME types that match the name of a file, from their glob
+        patterns (see `GlobIndex.match`).
+
+        :param filename: The name of (or path to) a file. The file does not
+            need to exist.
+        :return: A list of (identifier, weight), the best match first.
+        """
+        if self.globs is None:
+            self.globs = self._build_globs()
+        return self.globs.match(os.path.basename(filename))
+
+    def _build_globs(self):
+        """
+        Index the glob patterns of all layers. The `globs2` file of a <MIME>
+        directory is used along with its `mime.cache`, as they are written
+        together; otherwise, the patterns of the parsed XML files are used
+        (with the default weight).
+        """
+        globs = GlobIndex()
+        for layer in self._layers_by_priority():
+            if layer.cache is not None:
+                path = os.path.join(layer.path, 'globs2')
+                try:
+                    globs.add_globs2(path)
+                    continue
+                except OSError:
+                    self.logger.debug(f'Could not read {path}, using the '
+                                      f'mime.cache')
+                for pattern, mimetype, flags in layer.cache.iter_globs():
+                    globs.add(pattern, mimetype, flags & WEIGHT_MASK,
+                              bool(flags & CASE_SENSITIVE))
+                continue
+            for mimetype in layer.types.values():
+                globs.remove_type(mimetype.identifier)
+                for pattern in mimetype.extensions:
+                    globs.add(pattern, mimetype.identifier)
+        return globs
+
+    def sniff(self, path):
+        """
+        Return the MIME type of a file from its content (using the `magic`
+        rules), or None if no rule matches.
+
+        :raise OSError: if the file cannot be read.
+        """
+        return self._get_magic().match_file(path)
+
+    def sniff_data(self, data):
+        """Return the MIME type of some data (e.g. the start of a file)."""
+        return self._get_magic().match(data)
+
+    def sniff_files(self, paths, workers=None):
+        """
+        Return the MIME types of many files from their content, in the same
+        order (None for the files that do not match or cannot be read).
+
+        Files are read by a pool of threads, each reading its files into a
+        single buffer.
+
+        :param workers: The number of threads (by default, the number of
+            CPUs). If set to 1, the files are read serially.
+        """
+        magic = self._get_magic()
+        paths = list(paths)
+        workers = workers or os.cpu_count() or 1
+        if workers <= 1 or len(paths) < 2 * workers:
+            return magic.match_files(paths)
+        chunk_size = -(-len(paths) // (workers * 4))
+        chunks = [paths[i:i + chunk_size]
+                  for i in range(0, len(paths), chunk_size)]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(magic.match_files, chunks)
+            return [mimetype for chunk in results for mimetype in chunk]
+
+    def _get_magic(self):
+        """Return the MagicTable, loading the `magic` files if needed."""
+        if self.magic is None:
+            magic = MagicTable()
+            for layer in self._layers_by_priority():
+                path = os.path.join(layer.path, 'magic')
+                if not os.path.isfile(path):
+                    continue
+                try:
+                    magic.add_magic(path)
+                except (OSError, ValueError) as e:
+                    self.logger.warning(f'Could not read {path}: {e}')
+            self.magic = magic
+        return self.magic
+
+    def get_parents(self, identifier):
+        """Return the identifiers of the MIME types `identifier` inherits."""
+        mimetype = self.get_type(identifier)
+        if mimetype is None:
+            return []
+        return mimetype.parents
 
     @property
     def size(self):
@@ -21,22 +21,40 @@ class MimeType(object):
     - https://tools.ietf.org/html/rfc6838
     """
 
+    __slots__ = ('type', 'subtype', 'comment', 'extensions', 'icon',
+                 'aliases', 'parents', 'identifier')
+
     def __init__(self,
                  _type: str,
                  subtype: str,
                  comment: str,
                  extensions: List[str],
-                 icon: Optional[str]):
+                 icon: Optional[str],
+                 aliases: Optional[List[str]] = None,
+                 parents: Optional[List[str]] = None):
         # Data
         self.type = _type
         self.subtype = subtype
         self.comment = comment
         self.extensions = extensions
         self.icon = icon
+        self.aliases = aliases or []
+        self.parents = parents or []
 
         # Computed data
         self.identifier = '{}/{}'.format(self.type, self.subtype)
 
+    @property
+    def icon_names(self):
+        """
+        The names of the icons of the type, by order of preference: the icon
+        of the type itself (e.g. `image-png`), its generic icon, and the
+        generic icon of its media (e.g. `image-x-generic`).
+        """
+        names = (self.identifier.replace('/', '-'), self.icon,
+                 f'{self.type}-x-generic')
+        return tuple(dict.fromkeys(name for name in names if name))
+
     @property
     def is_extension(self):
         return self.subtype.startswith('x-') \
@@ -72,6 +90,19 @@ class MimeTypeParser:
     @classmethod
     def parse(cls, filepath):
         """Parse an XML file and return the corresponding MimeType."""
+        fields = cls.parse_fields(filepath)
+        if fields is None:
+            return None
+        return MimeType(*fields)
+
+    @classmethod
+    def parse_fields(cls, filepath):
+        """
+        Parse an XML file and return the arguments of the corresponding
+        MimeType, as a tuple (or None if the file is not valid).
+
+        Such tuples are compact and cheap to send between processes.
+        """
         tree = ElementTree.parse(filepath)
         # The root element represents a Mime Type
         root = tree.getroot()
@@ -83,7 +114,20 @@ class MimeTypeParser:
         comment = cls._get_comment(root)
         extensions = cls._get_extensions(root)
         icon = cls._get_icon(root)
-        return MimeType(_type, subtype, comment, extensions, icon)
+        aliases = cls._get_types(root, 'alias')
+        parents = cls._get_types(root, 'sub-class-of')
+        return _type, subtype, comment, extensions, icon, aliases, parents
+
+    @classmethod
+    def parse_comment(cls, filepath):
+        """Parse an XML file and only return the comment of the MimeType."""
+        try:
+            root = ElementTree.parse(filepath).getroot()
+        except (OSError, ElementTree.ParseError) as e:
+            cls.logger.warning(f'Could not read the comment of {filepath}: '
+                               f'{e}')
+            return ''
+        return cls._get_comment(root)
 
     @classmethod
     def _check_tag(cls, filepath, root):
@@ -133,6 +177,13 @@ class MimeTypeParser:
                 extensions.append(glob.attrib['pattern'])
         return extensions
 
+    @classmethod
+    def _get_types(cls, root, tag):
+        """Return the types referenced by the `tag` elements (e.g. aliases)."""
+        elements = root.findall(f'{cls.xmlns}{tag}')
+        return [elem.attrib['type'] for elem in elements
+                if 'type' in elem.attrib]
+
     @classmethod
     def _get_icon(cls, root):
         """Return the name of the icon associated to the media type."""
@@ -38,7 +38,7 @@ def xdg_config_dirs():
 
 def xdg_cache_home():
     """Base directory where user specific cached data should be stored."""
-    value = os.getenv('XDG_CACHE_HOME') or ''
+    value = os.getenv('XDG_CACHE_HOME') or '$HOME/.cache/'
     return os.path.expandvars(value)
 
 
@@ -57,7 +57,7 @@ def get_current_desktop_environment():
     """
     desktop = os.getenv('XDG_CURRENT_DESKTOP') or ''
     desktop = desktop.split(',')
-    desktop = [name.lower() for name in desktop]
+    desktop = [name.lower() for name in desktop if name]
     return desktop
 
 
@@ -73,3 +73,30 @@ def get_language():
     if ':' in lang:
         lang = lang.split(':')[1]
     return lang
+
+
+def get_icon_theme():
+    """
+    Returns the name of the icon theme chosen by the user, from the settings
+    of GTK or KDE, or None.
+
+    :rtype: str
+    """
+    # configparser is only needed here; os_env is imported by every module
+    from configparser import Error, RawConfigParser
+    config_dirs = [xdg_config_home()] + xdg_config_dirs()
+    candidates = [(os.path.join(d, f'gtk-{version}', 'settings.ini'),
+                   'Settings', 'gtk-icon-theme-name')
+                  for version in ('4.0', '3.0') for d in config_dirs]
+    candidates += [(os.path.join(d, 'kdeglobals'), 'Icons', 'Theme')
+                   for d in config_dirs]
+    for path, section, key in candidates:
+        config = RawConfigParser(strict=False, interpolation=None)
+        try:
+            config.read(path, encoding='utf-8')
+        except (Error, UnicodeDecodeError):
+            continue
+        value = config.get(section, key, fallback='').strip().strip('"')
+        if value:
+            return value
+    return None
@@ -0,0 +1,210 @@
+"""
+This module provides a persistent, on-disk snapshot of parsed XDG files, so
+that the databases do not have to parse every file at each startup.
+
+A snapshot is stored under `$XDG_CACHE_HOME/xdg-prefs/` and remembers, for
+each source file, its path and its stamp (modification time, size and inode),
+along with the result of parsing it. When a database is built again, only the
+files that are new, or whose stamp changed, are parsed.
+
+Directories are stamped as well: as long as the stamp of a directory is
+unchanged, its listing is re-used instead of being read again. Each file is
+still stat'ed, as a file modified in place (by an editor, or `sed -i`) does
+not change the stamp of its directory.
+"""
+
+
+import logging
+import os
+import pickle
+import tempfile
+
+from xdgprefs.core import os_env
+
+
+# Bump this number whenever the format of the snapshot, or of the objects
+# it contains, changes.
+SNAPSHOT_VERSION = 6
+
+# Returned instead of a payload when a file must be parsed (again).
+MISSING = object()
+
+
+logger = logging.getLogger('Snapshot')
+
+
+def snapshot_dir():
+    """Return the directory where the snapshots are stored."""
+    return os.path.join(os_env.xdg_cache_home(), 'xdg-prefs')
+
+
+def file_stamp(path):
+    """
+    Return the stamp of a file or directory.
+
+    :return: A tuple (mtime, size, inode), or None if the path cannot be
+        accessed.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+class Snapshot(object):
+    """
+    A versioned, on-disk snapshot of parsed files.
+
+    The snapshot is used in 3 steps: `load` it, query it for directories
+    (`list_dir`, or `listing`) or single files (`lookup`) while `store`-ing
+    the result of parsing missing files, and finally `save` it. Entries that
+    were not queried during this process are dropped when saving.
+    """
+
+    def __init__(self, name, key=None):
+        """
+        :param name: The name of the snapshot (used as filename).
+        :param key: An optional (picklable) value describing how the files
+            were parsed. A snapshot saved with a different key is ignored.
+        """
+        self.path = os.path.join(snapshot_dir(), f'{name}.pickle')
+        self.key = key
+        # directory -> (stamp, listing)
+        self.dirs = {}
+        # path -> (stamp, payload)
+        self.files = {}
+
+        self._pending = {}
+        self._seen_dirs = set()
+        self._seen_files = set()
+        self._dirty = False
+
+    def load(self):
+        """
+        Load the snapshot from the disk.
+
+        :return: True if a valid snapshot was loaded, False otherwise (in
+            which case the snapshot is empty).
+        """
+        try:
+            with open(self.path, 'rb') as f:
+                data = pickle.load(f)
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            # A corrupted or outdated snapshot can raise almost anything
+            # when unpickled; in any case, we simply start from scratch.
+            logger.warning(f'Could not load the snapshot {self.path}: {e}')
+            return False
+        if not isinstance(data, dict) \
+                or data.get('version') != SNAPSHOT_VERSION \
+                or data.get('key') != self.key:
+            logger.info(f'Ignoring outdated snapshot {self.path}')
+            return False
+        self.dirs = data['dirs']
+        self.files = data['files']
+        return True
+
+    def save(self):
+        """
+        Save the snapshot to the disk, if it changed since it was loaded.
+
+        The file is written atomically, so that a concurrent process never
+        reads a partial snapshot.
+        """
+        self._prune()
+        if not self._dirty:
+            return True
+        data = {
+            'version': SNAPSHOT_VERSION,
+            'key': self.key,
+            'dirs': self.dirs,
+            'files': self.files,
+        }
+        directory = os.path.dirname(self.path)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError as e:
+            logger.warning(f'Could not save the snapshot {self.path}: {e}')
+            return False
+        self._dirty = False
+        return True
+
+    def list_dir(self, directory, list_files):
+        """
+        List the files of a directory, along with their cached payload.
+
+        The files are listed with `listing`, and each of them is checked
+        with `lookup`.
+
+        :param directory: The path to the directory.
+        :param list_files: A function that takes the directory and returns
+            the list of paths to consider.
+
+        :return: A list of (path, payload), where payload is `MISSING` if the
+            file must be parsed (and then given to `store`).
+        """
+        return [(path, self.lookup(path))
+                for path in self.listing(directory, list_files)]
+
+    def listing(self, directory, list_entries):
+        """
+        Return the listing of a directory: if the directory did not change
+        since the snapshot was saved, the cached listing is re-used;
+        otherwise, `list_entries` is called.
+
+        :param directory: The path to the directory.
+        :param list_entries: A function that takes the directory and returns
+            its (picklable) listing. The files it lists are not checked.
+        """
+        self._seen_dirs.add(directory)
+        stamp = file_stamp(directory)
+        cached = self.dirs.get(directory)
+        if stamp is not None and cached is not None and cached[0] == stamp:
+            return cached[1]
+        entries = list_entries(directory)
+        if stamp is not None:
+            self.dirs[directory] = (stamp, entries)
+            self._dirty = True
+        return entries
+
+    def lookup(self, path):
+        """
+        Return the cached payload of a file, or `MISSING` if the file changed
+        (or is unknown) and must be parsed again.
+        """
+        self._seen_files.add(path)
+        stamp = file_stamp(path)
+        entry = self.files.get(path)
+        if stamp is not None and entry is not None and entry[0] == stamp:
+            return entry[1]
+        self._pending[path] = stamp
+        return MISSING
+
+    def store(self, path, payload):
+        """Store the result of parsing a file that was `MISSING`."""
+        self._seen_files.add(path)
+        stamp = self._pending.pop(path, None) or file_stamp(path)
+        if stamp is None:
+            # The file disappeared, do not remember it.
+            return
+        self.files[path] = (stamp, payload)
+        self._dirty = True
+
+    def _prune(self):
+        """Drop the entries that were not used since the snapshot was read."""
+        for directory in set(self.dirs) - self._seen_dirs:
+            del self.dirs[directory]
+            self._dirty = True
+        for path in set(self.files) - self._seen_files:
+            del self.files[path]
+            self._dirty = True
@@ -0,0 +1,470 @@
+"""
+This module watches the XDG directories and files read by the databases,
+and updates the databases when they change (e.g. when an application is
+installed, or when `xdg-mime default` is used by another program).
+
+Changes are detected with inotify (through ctypes), or by polling the files
+when inotify is not available. Each change is applied incrementally: only
+the files that changed are parsed again.
+
+http://man7.org/linux/man-pages/man7/inotify.7.html
+"""
+
+
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import select
+import struct
+import threading
+
+from xdgprefs.core.app_database import app_dirs
+from xdgprefs.core.associations_database import mimeapps_files, cache_files
+from xdgprefs.core.mime_database import mime_dirs
+from xdgprefs.core.snapshot import file_stamp
+
+
+# inotify flags (see <sys/inotify.h>)
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+# Files are considered changed once they are closed after writing, rather
+# than on each write, so that they are never read while half-written.
+WATCH_MASK = (IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+              | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+              | IN_ONLYDIR)
+
+# struct inotify_event {int wd; uint32_t mask, cookie, len; char name[];}
+_EVENT = struct.Struct('iIII')
+
+# Marker used by the polling backend for directories, which are only
+# reported when they appear or disappear.
+_DIR = 'dir'
+
+
+logger = logging.getLogger('Watcher')
+
+
+class ChangeSet(object):
+    """
+    The changes applied to the databases by a Watcher in one go.
+
+    Each attribute is a set of identifiers, which can be looked up in the
+    corresponding database (an identifier that is no longer found there
+    was removed).
+    """
+
+    def __init__(self, paths=()):
+        # The paths reported as changed
+        self.paths = set(paths)
+        # IDs of the applications that were added, changed or removed
+        self.apps = set()
+        # Identifiers of the MIME types that were added, changed or removed
+        self.mimetypes = set()
+        # MIME types whose associations changed
+        self.associations = set()
+
+    def __bool__(self):
+        return bool(self.apps or self.mimetypes or self.associations)
+
+    def __repr__(self):
+        return f'<ChangeSet apps={len(self.apps)} ' \
+               f'mimetypes={len(self.mimetypes)} ' \
+               f'associations={len(self.associations)}>'
+
+
+class InotifyBackend(object):
+    """
+    Watches directories with inotify, and reports the paths that changed.
+
+    Directories that do not exist (yet) are checked each time the events
+    are read, and watched as soon as they are created.
+    """
+
+    def __init__(self, interval=1.0):
+        """
+        :param interval: How often (in seconds) missing directories are
+            checked, while waiting for events.
+        :raise OSError: if inotify is not available.
+        """
+        libc_name = ctypes.util.find_library('c') or 'libc.so.6'
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        try:
+            self._add_watch = libc.inotify_add_watch
+            self._rm_watch = libc.inotify_rm_watch
+            init = libc.inotify_init1
+        except AttributeError:
+            raise OSError(errno.ENOSYS, 'inotify is not available')
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p,
+                                    ctypes.c_uint32]
+        self._rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        self.fd = init(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            code = ctypes.get_errno()
+            raise OSError(code, os.strerror(code))
+        self.interval = interval
+        # Directories asked to be watched: path -> (recursive, names), where
+        # names is the set of filenames to report (None for all).
+        self._roots = {}
+        self._missing = set()
+        # Watched directories (including subdirectories of recursive roots)
+        self._wds = {}
+        self._watched = {}
+
+    def fileno(self):
+        """The file descriptor to wait on, e.g. from an event loop."""
+        return self.fd
+
+    def watch_dir(self, path, recursive=False):
+        """Watch all files of a directory (and of its subdirectories)."""
+        self._add_root(os.path.normpath(path), recursive, None)
+
+    def watch_file(self, path):
+        """Watch a single file, which may not exist yet."""
+        directory, name = os.path.split(os.path.normpath(path))
+        self._add_root(directory, False, {name})
+
+    def _add_root(self, path, recursive, names):
+        if path in self._roots:
+            recursive, names = _merge(self._roots[path], (recursive, names))
+        self._roots[path] = (recursive, names)
+        if not self._watch(path, recursive, names):
+            self._missing.add(path)
+
+    def _watch(self, path, recursive, names):
+        wd = self._add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            return False
+        if wd in self._wds:
+            # The same directory, watched twice (e.g. through a symlink)
+            path, *watch = self._wds[wd]
+            recursive, names = _merge(watch, (recursive, names))
+        self._wds[wd] = (path, recursive, names)
+        self._watched[path] = wd
+        if recursive:
+            try:
+                subdirs = [entry.path for entry in os.scandir(path)
+                           if entry.is_dir(follow_symlinks=False)]
+            except OSError:
+                subdirs = []
+            for subdir in subdirs:
+                self._watch(subdir, True, None)
+        return True
+
+    def _forget(self, path):
+        wd = self._watched.pop(path, None)
+        if wd is not None:
+            self._wds.pop(wd, None)
+            self._rm_watch(self.fd, wd)
+
+    def read(self, timeout=None):
+        """
+        Wait for changes, at most `timeout` seconds (None to wait until
+        something changes).
+
+        :return: The set of paths (files or directories) that changed.
+        """
+        changed = self._check_missing()
+        if changed:
+            timeout = 0
+        elif self._missing:
+            timeout = self.interval if timeout is None \
+                else min(timeout, self.interval)
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if ready:
+            changed |= self._read_events()
+        return changed
+
+    def _check_missing(self):
+        changed = set()
+        for path in list(self._missing):
+            recursive, names = self._roots[path]
+            if self._watch(path, recursive, names):
+                self._missing.discard(path)
+                changed.add(path)
+                if names is not None:
+                    changed.update(os.path.join(path, n) for n in names)
+        return changed
+
+    def _read_events(self):
+        changed = set()
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT.unpack_from(data, offset)
+                name = data[offset + _EVENT.size:
+                            offset + _EVENT.size + length].rstrip(b'\0')
+                offset += _EVENT.size + length
+                self._handle_event(wd, mask, os.fsdecode(name), changed)
+        return changed
+
+    def _handle_event(self, wd, mask, name, changed):
+        if mask & IN_Q_OVERFLOW:
+            # Some events were lost: check the directories again
+            logger.warning('Too many changes at once, some may be missed.')
+            changed.update(self._roots)
+            return
+        if wd not in self._wds:
+            return
+        path, recursive, names = self._wds[wd]
+        if mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+            self._forget(path)
+            changed.add(path)
+            if path in self._roots:
+                self._missing.add(path)
+            return
+        if names is not None and name not in names:
+            return
+        filepath = os.path.join(path, name)
+        if mask & IN_ISDIR and recursive:
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                self._watch(filepath, True, None)
+            elif mask & IN_MOVED_FROM:
+                self._forget(filepath)
+        changed.add(filepath)
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+def _merge(watch, other):
+    """Merge two (recursive, names) tuples describing what is watched."""
+    recursive = watch[0] or other[0]
+    if watch[1] is None or other[1] is None:
+        return recursive, None
+    return recursive, watch[1] | other[1]
+
+
+class PollingBackend(object):
+    """
+    Watches directories and files by comparing their stamps (modification
+    time, size and inode) periodically.
+    """
+
+    def __init__(self, interval=2.0):
+        """
+        :param interval: How often (in seconds) the files are checked.
+        """
+        self.interval = interval
+        self._dirs = {}
+        self._files = set()
+        self._stamps = {}
+        self._closed = threading.Event()
+
+    def watch_dir(self, path, recursive=False):
+        """Watch all files of a directory (and of its subdirectories)."""
+        path = os.path.normpath(path)
+        self._dirs[path] = self._dirs.get(path, False) or recursive
+        self._stamps.update(self._scan_dir(path, recursive))
+
+    def watch_file(self, path):
+        """Watch a single file, which may not exist yet."""
+        path = os.path.normpath(path)
+        self._files.add(path)
+        stamp = file_stamp(path)
+        if stamp is not None:
+            self._stamps[path] = stamp
+
+    def read(self, timeout=None):
+        """
+        Wait for `timeout` seconds (at most `interval`), then check for
+        changes.
+
+        :return: The set of paths (files or directories) that changed.
+        """
+        timeout = self.interval if timeout is None \
+            else min(timeout, self.interval)
+        if self._closed.wait(timeout):
+            return set()
+        stamps = {}
+        for path, recursive in self._dirs.items():
+            stamps.update(self._scan_dir(path, recursive))
+        for path in self._files:
+            stamp = file_stamp(path)
+            if stamp is not None:
+                stamps[path] = stamp
+        changed = {path for path in stamps.keys() | self._stamps.keys()
+                   if stamps.get(path) != self._stamps.get(path)}
+        self._stamps = stamps
+        return changed
+
+    def _scan_dir(self, path, recursive):
+        stamps = {}
+        try:
+            entries = list(os.scandir(path))
+        except OSError:
+            return stamps
+        stamps[path] = _DIR
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if recursive:
+                        stamps.update(self._scan_dir(entry.path, True))
+                    continue
+                st = entry.stat()
+            except OSError:
+                continue
+            stamps[entry.path] = st.st_mtime_ns, st.st_size, st.st_ino
+        return stamps
+
+    def close(self):
+        self._closed.set()
+
+
+def create_backend(interval=1.0):
+    """Return an InotifyBackend, or a PollingBackend if it is unavailable."""
+    try:
+        return InotifyBackend(interval)
+    except OSError as e:
+        logger.info(f'inotify is not available ({e}), polling instead.')
+        return PollingBackend(interval)
+
+
+class Watcher(object):
+    """
+    Watches the files read by the databases, and updates them incrementally.
+
+    Changes are applied by `poll`, which can either be called regularly by
+    the application (e.g. from a timer of its event loop), or by a thread
+    started with `start`. In the latter case, the databases are modified,
+    and the subscribers are called, from that thread. An application can
+    also `wait` for changes in a thread of its own, and `apply` them in the
+    thread that uses the databases (as the GUI does).
+    """
+
+    def __init__(self, mimedb=None, appdb=None, assocdb=None, backend=None,
+                 interval=1.0, settle=0.2):
+        """
+        :param mimedb: The MimeDatabase to update, if any.
+        :param appdb: The AppDatabase to update, if any.
+        :param assocdb: The AssociationsDatabase to update, if any.
+        :param backend: The backend used to detect changes (by default,
+            inotify if available, polling otherwise).
+        :param interval: How often (in seconds) the thread started by
+            `start` wakes up.
+        :param settle: Changes often come in bursts (e.g. when a package is
+            installed): they are gathered until nothing changed for this
+            many seconds.
+        """
+        self.mimedb = mimedb
+        self.appdb = appdb
+        self.assocdb = assocdb
+        self.backend = backend or create_backend(interval)
+        self.interval = interval
+        self.settle = settle
+        self.subscribers = []
+
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+        for path in app_dirs(only_existing=False):
+            self.backend.watch_dir(path, recursive=True)
+        for path in mime_dirs(only_existing=False):
+            self.backend.watch_dir(path, recursive=True)
+        for path in mimeapps_files(only_existing=False) \
+                + cache_files(only_existing=False):
+            self.backend.watch_file(path)
+
+    def subscribe(self, callback):
+        """Call `callback` with a ChangeSet each time something changed."""
+        self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        self.subscribers.remove(callback)
+
+    def poll(self, timeout=0):
+        """
+        Wait at most `timeout` seconds for changes, and apply them.
+
+        :return: The ChangeSet that was applied (possibly empty).
+        """
+        paths = self.wait(timeout)
+        if not paths:
+            return ChangeSet()
+        changes = self.apply(paths)
+        if changes:
+            self._notify(changes)
+        return changes
+
+    def wait(self, timeout=0):
+        """
+        Wait at most `timeout` seconds for changes, and until they settle,
+        without applying them.
+
+        :return: The set of paths that changed (possibly empty).
+        """
+        paths = self.backend.read(timeout)
+        if not paths:
+            return paths
+        while True:
+            more = self.backend.read(self.settle)
+            if not more:
+                break
+            paths |= more
+        return paths
+
+    def apply(self, paths):
+        """
+        Update the databases after the given paths changed.
+
+        :return: The ChangeSet that was applied.
+        """
+        changes = ChangeSet(paths)
+        with self._lock:
+            # Sorted, so that directories come before the files they contain
+            for path in sorted(paths):
+                logger.debug(f'{path} changed')
+                if self.appdb is not None:
+                    changes.apps |= self.appdb.reload_path(path)
+                if self.mimedb is not None:
+                    changes.mimetypes |= self.mimedb.reload_path(path)
+                if self.assocdb is not None:
+                    changes.associations |= self.assocdb.reload_path(path)
+        return changes
+
+    def _notify(self, changes):
+        for callback in list(self.subscribers):
+            try:
+                callback(changes)
+            except Exception:
+                logger.exception(f'Error in the subscriber {callback}')
+
+    def start(self):
+        """Apply the changes from a background thread."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='Watcher',
+                                        daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.poll(self.interval)
+
+    def stop(self):
+        """Stop the background thread, and release the backend."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.backend.close()
@@ -3,8 +3,17 @@ This module defines wrapper functions for the `xdg-mime` software.
 
 These functions can be used to query the user preferences (i.e. which desktop
 application should be used to open a given media type) and to update them.
+
+The asynchronous variants (`get_default_apps` and `set_default_apps`) run many
+queries at once, with a bounded number of concurrent `xdg-mime` processes.
+
+The `xdg-mime` executable is only looked for when it is first needed (see
+`get_bin_path`), not when this module is imported.
 """
+import asyncio
+import os
 import shutil
+import signal
 import subprocess
 import logging
 
@@ -56,8 +65,29 @@ def _try_path(path):
     return True
 
 
-bin_path = _find_xdg_mime()
-logger.debug(f'Found xdg-mime: {bin_path}')
+_UNSET = object()
+
+# The path to `xdg-mime` (None if it was not found), once looked for
+_bin_path = _UNSET
+
+
+def get_bin_path():
+    """
+    Return the path to the `xdg-mime` executable, or None if it was not
+    found. It is looked for on the first call only.
+    """
+    global _bin_path
+    if _bin_path is _UNSET:
+        _bin_path = _find_xdg_mime()
+        logger.debug(f'Found xdg-mime: {_bin_path}')
+    return _bin_path
+
+
+def __getattr__(name):
+    # `bin_path` used to be computed at import time
+    if name == 'bin_path':
+        return get_bin_path()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
 
 def get_default_app(mime_type):
@@ -71,6 +101,7 @@ def get_default_app(mime_type):
     :return: The identifier of the desktop application, e.g. 'gimp.desktop'.
     :rtype: str
     """
+    bin_path = get_bin_path()
     if bin_path is None:
         logger.error('Can\'t get the default app if xdg-mime was not found!')
         return None
@@ -98,6 +129,7 @@ def set_default_app(mime_type, app):
     default one (according to the xdg-mime backend, i.e. if the return code
     was 0), False otherwise.
     """
+    bin_path = get_bin_path()
     if bin_path is None:
         logger.critical('Can\t set the default app if xdg-mime was not found!')
         return False
@@ -108,3 +140,129 @@ def set_default_app(mime_type, app):
         logger.error(f'Unknown error while setting default application'
                      f' ({res.returncode}): {res.stderr}')
     return res.returncode == 0
+
+
+async def _run_async(bin_path, args, timeout):
+    """
+    Run `xdg-mime` (at `bin_path`) with some arguments, and return its
+    return code and its (decoded) stdout and stderr. The process (and its
+    children, as `xdg-mime` is a shell script) is killed if it does not exit
+    within `timeout` seconds, or if the task is cancelled.
+
+    :raise asyncio.TimeoutError: if the process timed out.
+    :raise OSError: if the process could not be started.
+    """
+    process = await asyncio.create_subprocess_exec(
+        bin_path, *args,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        start_new_session=True)
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(),
+                                                timeout)
+    except BaseException:
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        # Reaped even if the task is cancelled again meanwhile
+        await asyncio.shield(process.wait())
+        raise
+    return process.returncode, stdout.decode(), stderr.decode()
+
+
+async def get_default_apps(mime_types, concurrency=8, timeout=10.0):
+    """
+    Get the default applications of many MIME Types, running up to
+    `concurrency` queries at once.
+
+    >>> asyncio.run(get_default_apps(['image/jpeg', 'text/plain']))
+    {'image/jpeg': 'gimp.desktop', 'text/plain': 'gedit.desktop'}
+
+    :param mime_types: The identifiers of the MIME Types.
+    :param concurrency: The maximum number of `xdg-mime` processes.
+    :param timeout: The maximum duration of each query, in seconds.
+
+    :return: A dict {mime_type: app}, where app is None if the query failed
+    (or timed out, or `xdg-mime` could not be started).
+    :rtype: dict
+    """
+    mime_types = list(mime_types)
+    # Looked for in a thread, not to block the event loop
+    bin_path = await asyncio.to_thread(get_bin_path)
+    if bin_path is None:
+        logger.error('Can\'t get the default apps if xdg-mime was not found!')
+        return {mime_type: None for mime_type in mime_types}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def query(mime_type):
+        async with semaphore:
+            try:
+                code, stdout, stderr = await _run_async(
+                    bin_path, ['query', 'default', mime_type], timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f'Timeout while querying the default '
+                               f'application of {mime_type}')
+                return None
+            except OSError as e:
+                logger.warning(f'Could not query the default application '
+                               f'of {mime_type}: {e}')
+                return None
+        if code != 0:
+            logger.warning(f'Unknown error while querying default application'
+                           f' ({code}): {stderr}')
+            return None
+        return stdout.replace('\n', '') or None
+
+    apps = await asyncio.gather(*(query(mime_type)
+                                  for mime_type in mime_types))
+    return dict(zip(mime_types, apps))
+
+
+async def set_default_apps(pairs, timeout=10.0):
+    """
+    Set the default applications of many MIME Types.
+
+    Unlike `get_default_apps`, the changes are not made concurrently: each
+    `xdg-mime default` reads the user `mimeapps.list`, and rewrites it
+    entirely, so concurrent changes would overwrite each other. They are
+    made one after the other, in the order of `pairs`, so that none of them
+    is lost (and the last one wins for a MIME Type).
+
+    >>> asyncio.run(set_default_apps([('image/jpeg', 'gimp.desktop')]))
+    [True]
+
+    :param pairs: An iterable of (mime_type, app).
+    :param timeout: The maximum duration of each change, in seconds.
+
+    :return: A list of booleans, telling if each change (in the order of
+    `pairs`) succeeded.
+    :rtype: list
+    """
+    pairs = list(pairs)
+    # Looked for in a thread, not to block the event loop
+    bin_path = await asyncio.to_thread(get_bin_path)
+    if bin_path is None:
+        logger.critical('Can\'t set the default apps if xdg-mime was not '
+                        'found!')
+        return [False] * len(pairs)
+    results = []
+    for mime_type, app in pairs:
+        try:
+            code, _, stderr = await _run_async(
+                bin_path, ['default', app, mime_type], timeout)
+        except asyncio.TimeoutError:
+            logger.error(f'Timeout while setting {app} as the default '
+                         f'application of {mime_type}')
+            results.append(False)
+            continue
+        except OSError as e:
+            logger.error(f'Could not set {app} as the default application '
+                         f'of {mime_type}: {e}')
+            results.append(False)
+            continue
+        if code != 0:
+            logger.error(f'Unknown error while setting default application'
+                         f' ({code}): {stderr}')
+        results.append(code == 0)
+    return results
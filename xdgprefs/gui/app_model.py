@@ -0,0 +1,32 @@
+"""
+This module defines the Qt Model of the list of Applications.
+"""
+
+
+from xdgprefs.gui.list_model import ListModel
+
+
+def _get_types(type_list):
+    if type_list is None:
+        return ''
+    else:
+        return ', '.join(type_list)
+
+
+class AppModel(ListModel):
+    """
+    This class lists applications (DesktopEntries), showing their name,
+    comment and MIME types.
+    """
+
+    def first_line(self, app):
+        return app.name
+
+    def second_line(self, app):
+        return app.comment
+
+    def third_line(self, app):
+        return _get_types(app.mime_type)
+
+    def icon_name(self, app):
+        return app.icon
@@ -1,14 +1,17 @@
 """
 This module defines Qt Widgets that allow to view the list of applications
-as a Qt List (using a custom widget for the layout).
+as a Qt List (using a custom delegate for the layout).
 """
 
 
-from PySide6.QtWidgets import QListWidget, QWidget, \
+from PySide6.QtCore import QTimer
+from PySide6.QtWidgets import QListView, QWidget, \
     QLabel, QGridLayout, QLineEdit, QCheckBox
 
 from xdgprefs.core import DesktopEntry
-from xdgprefs.gui.app_item import AppItem
+from xdgprefs.gui.app_model import AppModel
+from xdgprefs.gui.item_delegate import ItemDelegate
+from xdgprefs.gui.list_model import FilterModel, FILTER_DELAY
 
 
 class AppsPanel(QWidget):
@@ -16,22 +19,28 @@ class AppsPanel(QWidget):
     This class defines the Qt List that will show all applications.
     """
 
-    def __init__(self, appdb):
+    def __init__(self, appdb=None):
         QWidget.__init__(self)
 
-        self.appdb = appdb
-        self.app_map = {}
+        self.appdb = None
+        self.model = AppModel()
+        self.filter_model = FilterModel(self.model)
 
         self.setup_ui()
 
-        for app in self.appdb.apps.values():
-            item = AppItem(app, self.list_widget)
-            self.app_map[app] = item
-            self.list_widget.addItem(item)
-
         self.setLayout(self.grid)
 
         self.on_filter_update()
+        if appdb is not None:
+            self.set_database(appdb)
+        else:
+            self.text_status.setText('Loading...')
+
+    def set_database(self, appdb):
+        """Show the applications of a (newly loaded) database."""
+        self.appdb = appdb
+        self.model.set_items(self.appdb.apps.values())
+        self.on_filter_update()
 
     # noinspection PyAttributeOutsideInit
     def setup_ui(self):
@@ -39,7 +48,12 @@ class AppsPanel(QWidget):
 
         self.edit_search = QLineEdit(self)
         self.edit_search.setPlaceholderText("Type to filter")
-        self.edit_search.textChanged.connect(self.on_filter_update)
+        # Filter once the user stops typing, rather than at each keystroke
+        self.filter_timer = QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(FILTER_DELAY)
+        self.filter_timer.timeout.connect(self.on_filter_update)
+        self.edit_search.textChanged.connect(self.filter_timer.start)
 
         self.checkbox_mimetype = QCheckBox(self)
         self.checkbox_mimetype.setText("Include apps without Mime types")
@@ -58,10 +72,14 @@ class AppsPanel(QWidget):
 
         self.text_status = QLabel(self)
 
-        self.list_widget = QListWidget(self)
-        self.list_widget.setSelectionMode(QListWidget.NoSelection)
-        self.list_widget.setAlternatingRowColors(True)
-        self.list_widget.setStyleSheet('''
+        self.list_view = QListView(self)
+        self.list_view.setModel(self.filter_model)
+        self.list_view.setItemDelegate(ItemDelegate(self.list_view))
+        # All rows have the same height: only the visible ones are laid out
+        self.list_view.setUniformItemSizes(True)
+        self.list_view.setSelectionMode(QListView.NoSelection)
+        self.list_view.setAlternatingRowColors(True)
+        self.list_view.setStyleSheet('''
                     QListView::item {
                         border: 1px solid #e0e0eb;
                     }
@@ -72,7 +90,7 @@ class AppsPanel(QWidget):
         self.grid.addWidget(self.checkbox_vendor, 1, 2, 1, 1)
         self.grid.addWidget(self.checkbox_ext, 1, 3, 1, 1)
         self.grid.addWidget(self.text_status, 2, 1, 1, 3)
-        self.grid.addWidget(self.list_widget, 3, 1, 1, 3)
+        self.grid.addWidget(self.list_view, 3, 1, 1, 3)
 
     def on_filter_update(self):
         filter_text = self.edit_search.text()
@@ -80,20 +98,14 @@ class AppsPanel(QWidget):
         vendor = self.checkbox_vendor.isChecked()
         ext = self.checkbox_ext.isChecked()
 
-        nb_shown = 0
-        nb_total = 0
-        for app in self.app_map:
-            matches = self.matches(app, filter_text, mimetype, vendor, ext)
-            # If it matches, show it
-            self.app_map[app].setHidden(not matches)
-            # Count the number of shown apps
-            nb_shown += int(matches)
-            nb_total += 1
-        self.update_text(nb_shown, nb_total)
+        self.filter_model.set_filter(
+            filter_text,
+            lambda app: self.matches(app, mimetype, vendor, ext))
+        self.update_text(self.filter_model.rowCount(),
+                         self.model.rowCount())
 
     def matches(self,
                 app: DesktopEntry,
-                filter_text: str,
                 mimetype_check: bool,
                 vendor_check: bool,
                 ext_check: bool):
@@ -104,8 +116,6 @@ class AppsPanel(QWidget):
             return False
         if not ext_check and app.is_extension:
             return False
-        if app.name.find(filter_text) == -1:
-            return False
         return True
 
     def update_text(self, nb_shown, nb_total):
@@ -0,0 +1,62 @@
+"""
+This module defines the Qt Model of the list of associations between MIME
+Types and Applications.
+"""
+
+
+from PySide6.QtCore import Qt, Signal
+
+from xdgprefs.gui.list_model import ITEM_ROLE
+from xdgprefs.gui.mime_model import MimeTypeModel
+
+
+# Role of the list of applications associated with a MIME Type
+APPS_ROLE = ITEM_ROLE + 1
+
+
+class AssociationModel(MimeTypeModel):
+    """
+    This class lists MIME Types (shown as in the MimeTypeModel), each with
+    the applications associated with it, the default one first.
+
+    Its items are (mime_type, apps) tuples. The default application of a row
+    is its EditRole: setting it emits `app_selected`.
+    """
+
+    app_selected = Signal(str, str)
+
+    def first_line(self, item):
+        return MimeTypeModel.first_line(self, item[0])
+
+    def second_line(self, item):
+        return MimeTypeModel.second_line(self, item[0])
+
+    def third_line(self, item):
+        return MimeTypeModel.third_line(self, item[0])
+
+    def icon_name(self, item):
+        return MimeTypeModel.icon_name(self, item[0])
+
+    def data(self, index, role=Qt.DisplayRole):
+        if index.isValid() and role in (Qt.EditRole, APPS_ROLE):
+            _, apps = self.items[index.row()]
+            if role == APPS_ROLE:
+                return apps
+            return apps[0] if apps else None
+        return MimeTypeModel.data(self, index, role)
+
+    def flags(self, index):
+        return MimeTypeModel.flags(self, index) | Qt.ItemIsEditable
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role != Qt.EditRole or not value:
+            return False
+        mime_type, apps = self.items[index.row()]
+        if apps and apps[0] == value:
+            return False
+        if value in apps:
+            apps.remove(value)
+        apps.insert(0, value)
+        self.dataChanged.emit(index, index)
+        self.app_selected.emit(mime_type.identifier, value)
+        return True
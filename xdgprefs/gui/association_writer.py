@@ -0,0 +1,101 @@
+"""
+This module defines a service that saves the associations chosen in the GUI.
+
+All the writes are done by a single thread, so that they never run
+concurrently. Changes are not written right away: the changes made in a
+short time are merged (only the last application chosen for a MIME type is
+kept), and written at once, in a single batch.
+"""
+
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PySide6.QtCore import QObject, QTimer, Signal
+
+from xdgprefs.core.associations_database import FAILED
+
+
+# Delay (in ms) after the last change before the changes are written
+FLUSH_DELAY = 300
+
+
+logger = logging.getLogger('AssociationWriter')
+
+
+class AssociationWriter(QObject):
+    """
+    This class sets the default applications of MIME types, in the
+    background.
+
+    `saved` is emitted (in the GUI thread) with the MIME type, the
+    application, and whether the change was written, for each change.
+    """
+
+    saved = Signal(str, str, bool)
+
+    def __init__(self, assocdb, delay=FLUSH_DELAY, parent=None):
+        """
+        :param assocdb: The AssociationsDatabase to change.
+        :param delay: The delay (in ms) after the last change before the
+            pending changes are written.
+        """
+        QObject.__init__(self, parent)
+        self.assocdb = assocdb
+        self.executor = ThreadPoolExecutor(max_workers=1,
+                                           thread_name_prefix='Writer')
+        # mimetype -> app, the changes that are not written yet
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(delay)
+        self._timer.timeout.connect(self.flush)
+
+    def set_app_for_mimetype(self, mimetype, app):
+        """Make an application the default one for a MIME type (later)."""
+        with self._lock:
+            # Moved to the end: changes are written in the order they were
+            # last made.
+            self._pending.pop(mimetype, None)
+            self._pending[mimetype] = app
+        self._timer.start()
+
+    @property
+    def pending(self):
+        """The number of changes that are not written yet."""
+        return len(self._pending)
+
+    def flush(self):
+        """Write the pending changes now (in the background)."""
+        self._timer.stop()
+        return self.executor.submit(self._write)
+
+    def close(self):
+        """Write the pending changes, and wait until they are written."""
+        self.flush()
+        self.executor.shutdown(wait=True)
+
+    def _write(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        try:
+            with self.assocdb.batch() as report:
+                for mimetype, app in pending.items():
+                    self.assocdb.set_app_for_mimetype(mimetype, app)
+        except Exception:
+            logger.exception('Could not save the associations')
+            results = [(mimetype, app, False)
+                       for mimetype, app in pending.items()]
+        else:
+            for change in report.failed:
+                logger.error(f'Could not set {change.app} for '
+                             f'{change.mimetype}: {change.error}')
+            results = [(change.mimetype, change.app, change.status != FAILED)
+                       for change in report]
+        # Delivered to the GUI thread (queued connection)
+        for mimetype, app, success in results:
+            self.saved.emit(mimetype, app, success)
@@ -5,11 +5,15 @@ application for each MIME Type.
 """
 
 
-from PySide6.QtWidgets import QListWidget, QWidget, \
+from PySide6.QtCore import QTimer
+from PySide6.QtWidgets import QAbstractItemView, QListView, QWidget, \
     QLabel, QCheckBox, QLineEdit, QGridLayout
 
 from xdgprefs.core import MimeType
-from xdgprefs.gui.association_item import AssociationItem
+from xdgprefs.gui.association_model import AssociationModel, APPS_ROLE
+from xdgprefs.gui.association_writer import AssociationWriter
+from xdgprefs.gui.item_delegate import AssociationDelegate
+from xdgprefs.gui.list_model import FilterModel, FILTER_DELAY
 
 
 class AssociationsPanel(QWidget):
@@ -20,25 +24,44 @@ class AssociationsPanel(QWidget):
     def __init__(self, main_window):
         QWidget.__init__(self)
 
-        self.assocdb = main_window.assocdb
-        self.mimedb = main_window.mimedb
-        self.appdb = main_window.appdb
+        self.main_window = main_window
+        self.assocdb = None
+        self.mimedb = None
+        # Saves the applications chosen by the user (see `set_databases`)
+        self.writer = None
 
-        self.item_map = {}
+        self.model = AssociationModel()
+        self.model.app_selected.connect(self._on_selected)
+        self.filter_model = FilterModel(self.model)
 
         self.setup_ui()
 
-        for mime_id in self.assocdb.associations.keys():
+        self.setLayout(self.grid)
+
+        self.on_filter_update()
+        if main_window.mimedb is not None \
+                and main_window.assocdb is not None:
+            self.set_databases(main_window.mimedb, main_window.assocdb)
+        else:
+            self.text_status.setText('Loading...')
+
+    def set_databases(self, mimedb, assocdb):
+        """Show the associations of (newly loaded) databases."""
+        self.mimedb = mimedb
+        self.assocdb = assocdb
+        self.writer = AssociationWriter(assocdb, parent=self)
+        self.writer.saved.connect(self._on_saved)
+        self.refresh()
+
+    def refresh(self):
+        """Show the associations again, after the databases changed."""
+        items = []
+        for mime_id in self.assocdb.get_mimetypes():
             mime = self.mimedb.get_type(mime_id)
             if mime is not None:
                 apps = self.assocdb.get_apps_for_mimetype(mime_id)
-                item = AssociationItem(mime, apps, main_window,
-                                       self.list_widget)
-                self.item_map[mime] = item
-                self.list_widget.addItem(item)
-
-        self.setLayout(self.grid)
-
+                items.append((mime, apps))
+        self.model.set_items(items)
         self.on_filter_update()
 
     # noinspection PyAttributeOutsideInit
@@ -47,7 +70,12 @@ class AssociationsPanel(QWidget):
 
         self.edit_search = QLineEdit(self)
         self.edit_search.setPlaceholderText("Type to filter")
-        self.edit_search.textChanged.connect(self.on_filter_update)
+        # Filter once the user stops typing, rather than at each keystroke
+        self.filter_timer = QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(FILTER_DELAY)
+        self.filter_timer.timeout.connect(self.on_filter_update)
+        self.edit_search.textChanged.connect(self.filter_timer.start)
 
         self.checkbox_personal = QCheckBox(self)
         self.checkbox_personal.setText("Include personal Mime types (prs-*)")
@@ -66,10 +94,17 @@ class AssociationsPanel(QWidget):
 
         self.text_status = QLabel(self)
 
-        self.list_widget = QListWidget(self)
-        self.list_widget.setSelectionMode(QListWidget.NoSelection)
-        self.list_widget.setAlternatingRowColors(True)
-        self.list_widget.setStyleSheet('''
+        self.list_view = QListView(self)
+        self.list_view.setModel(self.filter_model)
+        self.list_view.setItemDelegate(AssociationDelegate(APPS_ROLE,
+                                                           self.list_view))
+        # All rows have the same height: only the visible ones are laid out
+        self.list_view.setUniformItemSizes(True)
+        # Clicking a row opens the selector of its default application
+        self.list_view.setEditTriggers(QAbstractItemView.AllEditTriggers)
+        self.list_view.setSelectionMode(QListView.NoSelection)
+        self.list_view.setAlternatingRowColors(True)
+        self.list_view.setStyleSheet('''
                     QListView::item {
                         border: 1px solid #c5c5c5;
                     }
@@ -80,7 +115,7 @@ class AssociationsPanel(QWidget):
         self.grid.addWidget(self.checkbox_vendor, 1, 2, 1, 1)
         self.grid.addWidget(self.checkbox_ext, 1, 3, 1, 1)
         self.grid.addWidget(self.text_status, 2, 1, 1, 3)
-        self.grid.addWidget(self.list_widget, 3, 1, 1, 3)
+        self.grid.addWidget(self.list_view, 3, 1, 1, 3)
 
     def on_filter_update(self):
         filter_text = self.edit_search.text()
@@ -88,21 +123,26 @@ class AssociationsPanel(QWidget):
         vendor = self.checkbox_vendor.isChecked()
         ext = self.checkbox_ext.isChecked()
 
-        nb_shown = 0
-        nb_total = 0
-        for mime_type in self.item_map:
-            matches = self.matches(mime_type, filter_text, personal, vendor,
-                                   ext)
-            # If it matches, show it
-            self.item_map[mime_type].setHidden(not matches)
-            # Count the number of shown apps
-            nb_shown += int(matches)
-            nb_total += 1
-        self.update_text(nb_shown, nb_total)
+        self.filter_model.set_filter(
+            filter_text,
+            lambda item: self.matches(item[0], personal, vendor, ext))
+        self.update_text(self.filter_model.rowCount(),
+                         self.model.rowCount())
+
+    def _on_selected(self, mime, app):
+        self.main_window.status.showMessage(f'Setting {mime} to {app}...')
+        self.writer.set_app_for_mimetype(mime, app)
+
+    def _on_saved(self, mime, app, success):
+        if success:
+            msg = f'{app} was successfully set to open {mime}.'
+        else:
+            msg = f'Could not set {app} to open {mime}, please check ' \
+                  f'the logs!'
+        self.main_window.status.showMessage(msg)
 
     def matches(self,
                 mime_type: MimeType,
-                filter_text: str,
                 personal_check: bool,
                 vendor_check: bool,
                 ext_check: bool):
@@ -112,8 +152,6 @@ class AssociationsPanel(QWidget):
             return False
         if not ext_check and mime_type.is_extension:
             return False
-        if mime_type.identifier.find(filter_text) == -1:
-            return False
         return True
 
     def update_text(self, nb_shown, nb_total):
@@ -0,0 +1,111 @@
+"""
+This module defines a service that builds the databases in the background,
+so that the main window can be shown (and used) while they are loaded.
+"""
+
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PySide6.QtCore import QObject, Signal
+
+from xdgprefs.core import MimeDatabase, AppDatabase, AssociationsDatabase
+from xdgprefs.core.desktop_entry_parser import SUMMARY_KEYS
+
+
+# Names of the databases
+MIME = 'mime'
+APPS = 'apps'
+ASSOCIATIONS = 'associations'
+
+
+logger = logging.getLogger('DatabaseLoader')
+
+
+class DatabaseLoader(QObject):
+    """
+    This class builds the MIME, applications and associations databases on
+    a pool of threads.
+
+    `loaded` is emitted (in the GUI thread) with the name and the database,
+    as soon as each one is built, or `failed` with the name and the error;
+    `finished` is emitted after all of them. The MIME and applications
+    databases are built in parallel; the associations database needs the
+    applications, so it is built right after them.
+    """
+
+    loaded = Signal(str, object)
+    failed = Signal(str, str)
+    finished = Signal()
+
+    total = 3
+
+    def __init__(self, parent=None):
+        QObject.__init__(self, parent)
+        self.executor = None
+        # Number of databases that were loaded (or failed)
+        self.done = 0
+        self.cancelled = False
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start loading the databases."""
+        self.executor = ThreadPoolExecutor(max_workers=2,
+                                           thread_name_prefix='Loader')
+        self.executor.submit(self._load, MIME, self._build_mime)
+        self.executor.submit(self._load_apps)
+
+    def cancel(self):
+        """
+        Stop loading the databases: the ones that are not being built are
+        not built at all, and the others are not reported.
+
+        A database that is being built cannot be interrupted: its thread
+        runs until it is built, and the interpreter waits for it before
+        exiting (at most the time it takes to load the databases).
+        """
+        self.cancelled = True
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _build_mime(self):
+        # The XML files are parsed by the loader thread: the GUI process
+        # must not start (or fork) other processes, and most systems have a
+        # `mime.cache` anyway.
+        mimedb = MimeDatabase(workers=1)
+        # The panels show the comments of all the types, which are not in
+        # the `mime.cache`: better read them here than in the GUI thread.
+        mimedb.load_comments()
+        return mimedb
+
+    def _load_apps(self):
+        # Only the (untranslated) values that are displayed are needed.
+        appdb = self._load(APPS, lambda: AppDatabase(keys=SUMMARY_KEYS,
+                                                     locales=frozenset()))
+        self._load(ASSOCIATIONS, lambda: AssociationsDatabase(appdb=appdb))
+
+    def _load(self, name, build):
+        """Build a database (in a thread of the pool), and report it."""
+        if self.cancelled:
+            return None
+        try:
+            database = build()
+        except Exception as e:
+            logger.exception(f'Could not load the {name} database')
+            self._report(self.failed, name, str(e))
+            return None
+        self._report(self.loaded, name, database)
+        return database
+
+    def _report(self, signal, name, value):
+        if self.cancelled:
+            return
+        # Delivered to the GUI thread (queued connection), in the order in
+        # which they are emitted: `finished` always comes last.
+        signal.emit(name, value)
+        with self._lock:
+            self.done += 1
+            last = self.done == self.total
+        if last:
+            self.finished.emit()
@@ -0,0 +1,82 @@
+"""
+This module defines a service that keeps the databases of the GUI up to date
+when their files change on the disk (e.g. when an application is installed,
+or when another program changes a default application).
+"""
+
+
+import logging
+import threading
+
+from PySide6.QtCore import QObject, Signal
+
+from xdgprefs.core.watcher import Watcher
+
+
+logger = logging.getLogger('DatabaseWatcher')
+
+
+class DatabaseWatcher(QObject):
+    """
+    This class watches the files of the MIME, applications and associations
+    databases.
+
+    Changes are waited for by a background thread, but applied to the
+    databases in the GUI thread, where they are read by the panels. `changed`
+    is then emitted with the ChangeSet that was applied, if it is not empty.
+    """
+
+    changed = Signal(object)
+    # Paths that changed, sent by the thread to the GUI thread
+    _paths_changed = Signal(object)
+
+    def __init__(self, mimedb, appdb, assocdb, interval=1.0, parent=None):
+        """
+        :param interval: How often (in seconds) the thread checks whether it
+            must stop.
+        """
+        QObject.__init__(self, parent)
+        self.watcher = Watcher(mimedb, appdb, assocdb, interval=interval)
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        # Queued connection: the slot runs in the GUI thread
+        self._paths_changed.connect(self._apply)
+
+    def start(self):
+        """Start watching the files."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run,
+                                        name='DatabaseWatcher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop watching the files. The thread is not waited for: it exits (and
+        releases its backend) the next time it wakes up.
+        """
+        self._stop.set()
+
+    def _run(self):
+        try:
+            while not self._stop.is_set():
+                paths = self.watcher.wait(self.interval)
+                if paths and not self._stop.is_set():
+                    self._paths_changed.emit(paths)
+        except Exception:
+            logger.exception('Could not watch the databases')
+        finally:
+            self.watcher.backend.close()
+
+    def _apply(self, paths):
+        if self._stop.is_set():
+            return
+        try:
+            changes = self.watcher.apply(paths)
+        except Exception:
+            logger.exception('Could not update the databases')
+            return
+        if changes:
+            logger.info(f'Databases updated: {changes}')
+            self.changed.emit(changes)
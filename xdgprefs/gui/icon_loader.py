@@ -0,0 +1,149 @@
+"""
+This module defines a service that loads icons in the background.
+
+Icons are read (and downscaled while they are read, with QImageReader) by a
+pool of threads, so that the GUI thread never decodes an image. The results
+are kept in a bounded LRU cache, keyed by (icon name, size): an icon shared
+by many rows is only loaded once.
+
+Icon files are found in the icon theme of the user (see IconDatabase).
+"""
+
+
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from PySide6.QtCore import QObject, QSize, Qt, Signal
+from PySide6.QtGui import QImageReader, QPixmap
+
+from xdgprefs.core.icon_theme import IconDatabase
+from xdgprefs.core.lru import LRUCache
+
+
+logger = logging.getLogger('IconLoader')
+
+
+def theme_resolver(theme=None):
+    """
+    Return a function that finds the path to an icon in an icon theme (by
+    default, the theme of the user), to be used as `resolve`.
+    """
+    lookup = IconDatabase(theme).lookup
+
+    def resolve(icon_name, size):
+        return lookup(icon_name, max(size.width(), size.height()))
+
+    return resolve
+
+
+def read_image(path, size):
+    """
+    Read an image, scaled to fit in `size` (keeping its aspect ratio). Safe
+    to call from any thread.
+
+    :return: A QImage, which is null if the image could not be read.
+    """
+    reader = QImageReader(path)
+    original = reader.size()
+    if original.isValid():
+        reader.setScaledSize(original.scaled(size, Qt.KeepAspectRatio))
+    image = reader.read()
+    if image.isNull() and reader.error() != QImageReader.FileNotFoundError:
+        logger.debug(f'Could not read {path}: {reader.errorString()}')
+    return image
+
+
+class IconLoader(QObject):
+    """
+    This class loads the icons requested by the models.
+
+    `get` returns an icon if it is already loaded, and loads it in the
+    background otherwise: `icon_loaded` is then emitted with its name and
+    size, once it is available.
+    """
+
+    icon_loaded = Signal(object, QSize)
+    _image_read = Signal(object, object)
+
+    def __init__(self, resolve=None, cache_size=512,
+                 max_threads=None, parent=None):
+        """
+        :param resolve: A function that returns the path to an icon, from its
+            name and size (or None if there is no such icon). It is called
+            by the threads of the pool. By default, icons are looked up in
+            the icon theme of the user (see `theme_resolver`).
+        :param cache_size: The maximum number of icons kept in memory.
+        :param max_threads: The number of threads that load icons (by
+            default, the number of CPUs).
+        """
+        QObject.__init__(self, parent)
+        self.resolve = resolve or theme_resolver()
+        self.cache = LRUCache(cache_size)
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_threads or os.cpu_count() or 1,
+            thread_name_prefix='IconLoader')
+        # Keys of the icons being loaded
+        self._pending = set()
+        self._closed = False
+        self._image_read.connect(self._on_image_read)
+
+    def get(self, icon_name, size):
+        """
+        Return the pixmap of an icon, or None if it is not loaded (yet), or
+        if it does not exist.
+
+        :param icon_name: The name of the icon, or a tuple of names by order
+            of preference (see `IconDatabase.lookup`).
+        """
+        if not icon_name or self._closed:
+            return None
+        key = (icon_name, size.toTuple())
+        pixmap = self.cache.get(key)
+        if pixmap is not None:
+            return None if pixmap.isNull() else pixmap
+        if key not in self._pending:
+            self._pending.add(key)
+            self.executor.submit(self._load, key)
+        return None
+
+    def _load(self, key):
+        """Read an icon (in a thread of the pool)."""
+        icon_name, size = key[0], QSize(*key[1])
+        image = None
+        try:
+            path = self.resolve(icon_name, size)
+            if path:
+                image = read_image(path, size)
+        except Exception as e:
+            logger.warning(f'Could not load the icon {icon_name}: {e}')
+        # Delivered to the GUI thread (queued connection)
+        self._image_read.emit(key, image)
+
+    def _on_image_read(self, key, image):
+        self._pending.discard(key)
+        # Pixmaps can only be created in the GUI thread. Missing icons are
+        # cached as null pixmaps, so they are not looked for again.
+        pixmap = QPixmap.fromImage(image) if image is not None else QPixmap()
+        self.cache.put(key, pixmap)
+        if not pixmap.isNull():
+            self.icon_loaded.emit(key[0], QSize(*key[1]))
+
+    def shutdown(self):
+        """
+        Stop loading icons: the pending ones are not loaded, and `get` does
+        not load new ones.
+        """
+        self._closed = True
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+
+_instance = None
+
+
+def icon_loader():
+    """Return the IconLoader shared by all models."""
+    global _instance
+    if _instance is None:
+        _instance = IconLoader()
+    return _instance
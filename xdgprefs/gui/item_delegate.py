@@ -0,0 +1,161 @@
+"""
+This module defines the Qt Delegate that paints the rows of the lists of
+MIME Types and Applications, with the following layout:
+- icon on the left
+- first line of text, bold
+- second line of text
+- third line of text, italic
+
+Rows are painted directly (instead of using a widget per row), so that only
+the visible rows cost something.
+"""
+
+
+from PySide6.QtCore import Qt, QRect, QSize, QTimer
+from PySide6.QtGui import QFont, QFontMetrics, QIcon, QPalette
+from PySide6.QtWidgets import QApplication, QComboBox, QStyle, \
+    QStyledItemDelegate, QStyleOptionComboBox, QStyleOptionViewItem
+
+from xdgprefs.gui.list_model import ICON_SIZE, SECOND_LINE_ROLE, \
+    THIRD_LINE_ROLE
+
+
+MARGIN = 6
+
+
+def _fonts(font):
+    """Return the fonts of the 3 lines, from the font of the view."""
+    bold = QFont(font)
+    bold.setBold(True)
+    italic = QFont(font)
+    italic.setItalic(True)
+    return bold, QFont(font), italic
+
+
+class ItemDelegate(QStyledItemDelegate):
+    """
+    This class paints a single row of a list (see ListModel).
+    """
+
+    def paint(self, painter, option, index):
+        painter.save()
+        widget = option.widget
+        style = widget.style() if widget is not None \
+            else QApplication.style()
+
+        # Background (and border, from the stylesheet of the view)
+        background = QStyleOptionViewItem(option)
+        self.initStyleOption(background, index)
+        background.text = ''
+        background.icon = QIcon()
+        style.drawPrimitive(QStyle.PE_PanelItemViewItem, background, painter,
+                            widget)
+
+        icon_rect, text_rect = self.layout(option)
+        pixmap = index.data(Qt.DecorationRole)
+        if pixmap is not None:
+            painter.drawPixmap(icon_rect, pixmap)
+
+        selected = option.state & QStyle.State_Selected
+        painter.setPen(option.palette.color(
+            QPalette.HighlightedText if selected else QPalette.Text))
+        top = text_rect.top()
+        for role, font in zip((Qt.DisplayRole, SECOND_LINE_ROLE,
+                               THIRD_LINE_ROLE), _fonts(option.font)):
+            metrics = QFontMetrics(font)
+            text = metrics.elidedText(index.data(role) or '', Qt.ElideRight,
+                                      text_rect.width())
+            painter.setFont(font)
+            painter.drawText(QRect(text_rect.left(), top, text_rect.width(),
+                                   metrics.height()),
+                             Qt.AlignLeft | Qt.AlignVCenter, text)
+            top += metrics.height()
+        painter.restore()
+
+    def layout(self, option):
+        """Return the rectangles of the icon and of the texts of a row."""
+        rect = option.rect.adjusted(MARGIN, MARGIN, -MARGIN, -MARGIN)
+        icon_rect = QRect(rect.left(),
+                          rect.top() + (rect.height() - ICON_SIZE.height())
+                          // 2,
+                          ICON_SIZE.width(), ICON_SIZE.height())
+        text_height = sum(QFontMetrics(font).height()
+                          for font in _fonts(option.font))
+        text_rect = QRect(icon_rect.right() + 1 + MARGIN,
+                          rect.top() + (rect.height() - text_height) // 2,
+                          rect.right() - icon_rect.right() - MARGIN,
+                          text_height)
+        return icon_rect, text_rect
+
+    def sizeHint(self, option, index):
+        text_height = sum(QFontMetrics(font).height()
+                          for font in _fonts(option.font))
+        return QSize(ICON_SIZE.width() + 3 * MARGIN,
+                     max(ICON_SIZE.height(), text_height) + 2 * MARGIN)
+
+
+class AssociationDelegate(ItemDelegate):
+    """
+    This class paints a row of the AssociationsPanel: a selector of the
+    default application is drawn on the right, and replaced by an actual
+    QComboBox when the row is edited (i.e. clicked).
+
+    The model must return the selected application for the EditRole, and the
+    list of possible applications for `apps_role`.
+    """
+
+    selector_width = 220
+
+    def __init__(self, apps_role, parent=None):
+        ItemDelegate.__init__(self, parent)
+        self.apps_role = apps_role
+
+    def selector_rect(self, option):
+        rect = option.rect.adjusted(MARGIN, MARGIN, -MARGIN, -MARGIN)
+        width = min(self.selector_width, rect.width() // 2)
+        height = QFontMetrics(option.font).height() + 2 * MARGIN
+        return QRect(rect.right() + 1 - width,
+                     rect.top() + (rect.height() - height) // 2,
+                     width, height)
+
+    def layout(self, option):
+        icon_rect, text_rect = ItemDelegate.layout(self, option)
+        text_rect.setRight(self.selector_rect(option).left() - MARGIN)
+        return icon_rect, text_rect
+
+    def paint(self, painter, option, index):
+        ItemDelegate.paint(self, painter, option, index)
+        widget = option.widget
+        style = widget.style() if widget is not None \
+            else QApplication.style()
+        selector = QStyleOptionComboBox()
+        if widget is not None:
+            selector.initFrom(widget)
+        selector.rect = self.selector_rect(option)
+        selector.currentText = index.data(Qt.EditRole) or ''
+        selector.state |= QStyle.State_Enabled
+        style.drawComplexControl(QStyle.CC_ComboBox, selector, painter,
+                                 widget)
+        style.drawControl(QStyle.CE_ComboBoxLabel, selector, painter, widget)
+
+    def createEditor(self, parent, option, index):
+        editor = QComboBox(parent)
+        editor.addItems(index.data(self.apps_role) or [])
+
+        def commit():
+            self.commitData.emit(editor)
+            self.closeEditor.emit(editor)
+
+        editor.activated.connect(commit)
+        # Open the list directly, as if the painted selector was clicked
+        QTimer.singleShot(0, editor.showPopup)
+        return editor
+
+    def setEditorData(self, editor, index):
+        editor.setCurrentText(index.data(Qt.EditRole) or '')
+
+    def setModelData(self, editor, model, index):
+        model.setData(index, editor.currentText(), Qt.EditRole)
+
+    def updateEditorGeometry(self, editor, option, index):
+        editor.setGeometry(self.selector_rect(option))
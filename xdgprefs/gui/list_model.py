@@ -0,0 +1,255 @@
+"""
+This module defines the base Qt Model of the lists of MIME Types and
+Applications: each row shows an icon and 3 lines of text (see ItemDelegate),
+which are only computed when the row is painted. Icons are loaded in the
+background (see IconLoader), and the rows are updated when they arrive.
+
+The lists are filtered by a FilterModel, which searches the texts of the
+rows in Python, and only removes (or inserts) the rows whose visibility
+changes.
+"""
+
+
+from bisect import bisect_left
+
+from PySide6.QtCore import Qt, QAbstractListModel, QAbstractProxyModel, \
+    QModelIndex, QSize
+
+from xdgprefs.gui.icon_loader import icon_loader
+
+
+# Roles of the lines of text (the first one is the DisplayRole)
+SECOND_LINE_ROLE = Qt.UserRole + 1
+THIRD_LINE_ROLE = Qt.UserRole + 2
+# Role of the object shown by a row
+ITEM_ROLE = Qt.UserRole + 3
+
+ICON_SIZE = QSize(64, 64)
+
+# Delay (in ms) after the last keystroke before a list is filtered
+FILTER_DELAY = 150
+
+# Above this number of separate changes, a filter resets the view instead
+# of removing and inserting each range of rows.
+MAX_FILTER_CHANGES = 64
+
+
+class ListModel(QAbstractListModel):
+    """
+    A read-only list of objects. Subclasses define the texts and icon of an
+    object, by overriding `first_line`, `second_line`, `third_line` and
+    `icon_name`, and the text that is searched (see FilterModel), by
+    overriding `search_text`.
+    """
+
+    def __init__(self, items=(), parent=None, icons=None):
+        """
+        :param icons: The IconLoader (by default, the shared one).
+        """
+        QAbstractListModel.__init__(self, parent)
+        self.items = list(items)
+        self.icons = icons or icon_loader()
+        self.icons.icon_loaded.connect(self._on_icon_loaded)
+        # icon name -> rows that were painted without it
+        self._waiting = {}
+
+    def set_items(self, items):
+        self.beginResetModel()
+        self.items = list(items)
+        self._waiting.clear()
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.items)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        item = self.items[index.row()]
+        if role == Qt.DisplayRole:
+            return self.first_line(item)
+        if role == SECOND_LINE_ROLE:
+            return self.second_line(item)
+        if role == THIRD_LINE_ROLE:
+            return self.third_line(item)
+        if role == Qt.DecorationRole:
+            name = self.icon_name(item)
+            pixmap = self.icons.get(name, ICON_SIZE)
+            if pixmap is None and name:
+                self._waiting.setdefault(name, set()).add(index.row())
+            return pixmap
+        if role == ITEM_ROLE:
+            return item
+        return None
+
+    def first_line(self, item):
+        raise NotImplementedError
+
+    def second_line(self, item):
+        return ''
+
+    def third_line(self, item):
+        return ''
+
+    def icon_name(self, item):
+        return None
+
+    def search_text(self, item):
+        return self.first_line(item)
+
+    def _on_icon_loaded(self, name, size):
+        if size != ICON_SIZE:
+            return
+        for row in self._waiting.pop(name, ()):
+            index = self.index(row)
+            self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+
+def _runs(positions):
+    """Group sorted positions into runs of consecutive ones (first, last)."""
+    runs = []
+    for position in positions:
+        if runs and runs[-1][1] == position - 1:
+            runs[-1][1] = position
+        else:
+            runs.append([position, position])
+    return runs
+
+
+class FilterModel(QAbstractProxyModel):
+    """
+    A proxy that only shows the objects of a ListModel whose search text
+    contains a query (ignoring the case), and that match a predicate.
+
+    The search texts are indexed once, and a query that contains the
+    previous one only searches the objects that matched it. The rows whose
+    visibility changes are then removed from (or inserted into) the view,
+    while the other ones are left as they are.
+    """
+
+    def __init__(self, source, parent=None):
+        QAbstractProxyModel.__init__(self, parent)
+        self.query = ''
+        self.predicate = None
+        # Source rows that are shown, in order
+        self.rows = []
+        # Lowercase search texts of the source rows (see `_search`)
+        self._texts = None
+        # Source rows that contain `query`, whatever the predicate
+        self._matches = None
+        self.setSourceModel(source)
+
+    def setSourceModel(self, source):
+        QAbstractProxyModel.setSourceModel(self, source)
+        source.dataChanged.connect(self._on_data_changed)
+        source.modelAboutToBeReset.connect(self.beginResetModel)
+        source.modelReset.connect(self._on_reset)
+        self.rows = list(range(source.rowCount()))
+
+    def set_filter(self, query, predicate=None):
+        """
+        Show the objects whose search text contains `query`, and for which
+        `predicate` (if any) returns True.
+        """
+        query = query.casefold()
+        if self.query and self.query in query and self._matches is not None:
+            # The new query is more specific: only the previous matches
+            # can still match.
+            candidates = self._matches
+        else:
+            candidates = None
+        self.query = query
+        self.predicate = predicate
+        self._matches = self._search(query, candidates)
+        self._show(self._filter(self._matches))
+
+    def set_predicate(self, predicate):
+        """Set the function that tells if an object is shown (or None)."""
+        self.set_filter(self.query, predicate)
+
+    def _search(self, query, candidates=None):
+        """Return the source rows (among `candidates`) matching `query`."""
+        if not query:
+            return range(len(self.sourceModel().items))
+        if self._texts is None:
+            source = self.sourceModel()
+            self._texts = [(source.search_text(item) or '').casefold()
+                           for item in source.items]
+        texts = self._texts
+        if candidates is None:
+            candidates = range(len(texts))
+        return [row for row in candidates if query in texts[row]]
+
+    def _filter(self, rows):
+        if self.predicate is None:
+            return list(rows)
+        items = self.sourceModel().items
+        predicate = self.predicate
+        return [row for row in rows if predicate(items[row])]
+
+    def _show(self, rows):
+        """Show the given source rows, only updating the rows that change."""
+        shown = set(rows)
+        removed = _runs([position for position, row in enumerate(self.rows)
+                         if row not in shown])
+        kept = set(self.rows) & shown
+        inserted = _runs([position for position, row in enumerate(rows)
+                          if row not in kept])
+        if len(removed) + len(inserted) > MAX_FILTER_CHANGES:
+            self.beginResetModel()
+            self.rows = rows
+            self.endResetModel()
+            return
+        # Removed from the last one, so that the positions remain valid
+        for first, last in reversed(removed):
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del self.rows[first:last + 1]
+            self.endRemoveRows()
+        # Inserted from the first one: the rows before each run are the
+        # same as in the new list.
+        for first, last in inserted:
+            self.beginInsertRows(QModelIndex(), first, last)
+            self.rows[first:first] = rows[first:last + 1]
+            self.endInsertRows()
+
+    def _on_reset(self):
+        self._texts = None
+        self._matches = self._search(self.query)
+        self.rows = self._filter(self._matches)
+        self.endResetModel()
+
+    def _on_data_changed(self, top_left, bottom_right, roles=()):
+        for row in range(top_left.row(), bottom_right.row() + 1):
+            index = self.mapFromSource(self.sourceModel().index(row))
+            if index.isValid():
+                self.dataChanged.emit(index, index, roles)
+
+    def mapToSource(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        return self.sourceModel().index(self.rows[index.row()])
+
+    def mapFromSource(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        position = bisect_left(self.rows, index.row())
+        if position < len(self.rows) and self.rows[position] == index.row():
+            return self.createIndex(position, 0)
+        return QModelIndex()
+
+    def index(self, row, column=0, parent=QModelIndex()):
+        if parent.isValid() or not 0 <= row < len(self.rows) or column != 0:
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index=None):
+        if index is None:
+            # QObject.parent(), which this method hides
+            return QAbstractProxyModel.parent(self)
+        return QModelIndex()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else 1
@@ -1,13 +1,20 @@
 """
 This module defines the main window, allowing the user to effectively
 use the application.
+
+The window is shown right away, and its panels are filled as the databases
+are loaded in the background (see DatabaseLoader). Once they are loaded,
+they are kept up to date with their files (see DatabaseWatcher).
 """
 
 
-from PySide6.QtWidgets import QMainWindow, QTabWidget
+from PySide6.QtWidgets import QMainWindow, QTabWidget, QProgressBar
 
 from xdgprefs.gui import MimeTypePanel, AppsPanel, AssociationsPanel
-from xdgprefs.core import MimeDatabase, AppDatabase, AssociationsDatabase
+from xdgprefs.gui.database_loader import DatabaseLoader, MIME, APPS, \
+    ASSOCIATIONS
+from xdgprefs.gui.database_watcher import DatabaseWatcher
+from xdgprefs.gui.icon_loader import icon_loader
 
 
 class MainWindow(QMainWindow):
@@ -16,10 +23,16 @@ class MainWindow(QMainWindow):
         QMainWindow.__init__(self)
         self.setWindowTitle('xdg-prefs')
 
-        # Back-end data
-        self.mimedb = MimeDatabase()
-        self.appdb = AppDatabase()
-        self.assocdb = AssociationsDatabase()
+        # Back-end data, set as it is loaded (see `on_loaded`)
+        self.mimedb = None
+        self.appdb = None
+        self.assocdb = None
+        self.loader = DatabaseLoader(self)
+        self.loader.loaded.connect(self.on_loaded)
+        self.loader.failed.connect(self.on_failed)
+        self.loader.finished.connect(self.on_finished)
+        # Started once all the databases are loaded (see `on_finished`)
+        self.watcher = None
 
         # Set size
         self.resize(400, 600)
@@ -30,7 +43,12 @@ class MainWindow(QMainWindow):
 
         # Status
         self.status = self.statusBar()
-        self.status.showMessage('No log')
+        self.status.showMessage('Loading the databases...')
+        self.progress = QProgressBar(self)
+        self.progress.setRange(0, self.loader.total)
+        self.progress.setValue(0)
+        self.progress.setMaximumWidth(150)
+        self.status.addPermanentWidget(self.progress)
 
         # Central widget
         self.central = QTabWidget(self)
@@ -38,12 +56,61 @@ class MainWindow(QMainWindow):
         self.page1 = AssociationsPanel(self)
         self.central.addTab(self.page1, 'Associations')
         # Second tab
-        self.page2 = MimeTypePanel(self.mimedb)
+        self.page2 = MimeTypePanel()
         self.central.addTab(self.page2, 'List MIME Types')
         # Third tab
-        self.page3 = AppsPanel(self.appdb)
+        self.page3 = AppsPanel()
         self.central.addTab(self.page3, 'List Applications')
 
         self.setCentralWidget(self.central)
 
         self.show()
+        self.loader.start()
+
+    def on_loaded(self, name, database):
+        self.progress.setValue(self.progress.value() + 1)
+        if name == MIME:
+            self.mimedb = database
+            self.page2.set_database(database)
+        elif name == APPS:
+            self.appdb = database
+            self.page3.set_database(database)
+        elif name == ASSOCIATIONS:
+            self.assocdb = database
+        if name in (MIME, ASSOCIATIONS) and self.mimedb is not None \
+                and self.assocdb is not None:
+            self.page1.set_databases(self.mimedb, self.assocdb)
+
+    def on_failed(self, name, error):
+        self.progress.setValue(self.progress.value() + 1)
+        self.status.showMessage(f'Could not load the {name} database: '
+                                f'{error}')
+
+    def on_finished(self):
+        self.progress.hide()
+        if None not in (self.mimedb, self.appdb, self.assocdb):
+            self.status.showMessage('No log')
+            self.watcher = DatabaseWatcher(self.mimedb, self.appdb,
+                                           self.assocdb, parent=self)
+            self.watcher.changed.connect(self.on_changed)
+            self.watcher.start()
+
+    def on_changed(self, changes):
+        if changes.mimetypes:
+            self.page2.set_database(self.mimedb)
+        if changes.apps:
+            self.page3.set_database(self.appdb)
+        # The associations list the types, and the installed applications
+        self.page1.refresh()
+        self.status.showMessage('The databases were updated from the disk.')
+
+    def closeEvent(self, event):
+        self.loader.cancel()
+        if self.watcher is not None:
+            self.watcher.stop()
+        if self.page1.writer is not None:
+            # The last changes must not be lost
+            self.page1.writer.close()
+        # Otherwise, the interpreter waits for all the queued icons on exit
+        icon_loader().shutdown()
+        QMainWindow.closeEvent(self, event)
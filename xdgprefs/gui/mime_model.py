@@ -0,0 +1,32 @@
+"""
+This module defines the Qt Model of the list of MIME Types.
+"""
+
+
+from xdgprefs.gui.list_model import ListModel
+
+
+def _get_extensions(ext_list):
+    if ext_list is None:
+        return ''
+    else:
+        return ', '.join(ext_list)
+
+
+class MimeTypeModel(ListModel):
+    """
+    This class lists MimeTypes, showing their identifier, comment and
+    extensions.
+    """
+
+    def first_line(self, mime_type):
+        return mime_type.identifier
+
+    def second_line(self, mime_type):
+        return mime_type.comment
+
+    def third_line(self, mime_type):
+        return _get_extensions(mime_type.extensions)
+
+    def icon_name(self, mime_type):
+        return mime_type.icon_names
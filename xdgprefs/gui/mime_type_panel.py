@@ -1,14 +1,17 @@
 """
 This module defines Qt Widgets that allow to view the list of MIME Types
-as a Qt List (using a custom widget for the layout).
+as a Qt List (using a custom delegate for the layout).
 """
 
 
-from PySide6.QtWidgets import QListWidget, QWidget, QLabel, QGridLayout, \
+from PySide6.QtCore import QTimer
+from PySide6.QtWidgets import QListView, QWidget, QLabel, QGridLayout, \
     QLineEdit, QCheckBox
 
 from xdgprefs.core import MimeType
-from xdgprefs.gui.mime_item import MimeTypeItem
+from xdgprefs.gui.item_delegate import ItemDelegate
+from xdgprefs.gui.list_model import FilterModel, FILTER_DELAY
+from xdgprefs.gui.mime_model import MimeTypeModel
 
 
 class MimeTypePanel(QWidget):
@@ -16,22 +19,28 @@ class MimeTypePanel(QWidget):
     This class defines the Qt List that will show all Mime Types.
     """
 
-    def __init__(self, mimedb):
+    def __init__(self, mimedb=None):
         QWidget.__init__(self)
 
-        self.mimedb = mimedb
-        self.item_map = {}
+        self.mimedb = None
+        self.model = MimeTypeModel()
+        self.filter_model = FilterModel(self.model)
 
         self.setup_ui()
 
-        for mime_type in self.mimedb.types.values():
-            item = MimeTypeItem(mime_type, self.list_widget)
-            self.item_map[mime_type] = item
-            self.list_widget.addItem(item)
-
         self.setLayout(self.grid)
 
         self.on_filter_update()
+        if mimedb is not None:
+            self.set_database(mimedb)
+        else:
+            self.text_status.setText('Loading...')
+
+    def set_database(self, mimedb):
+        """Show the MIME Types of a (newly loaded) database."""
+        self.mimedb = mimedb
+        self.model.set_items(self.mimedb.types.values())
+        self.on_filter_update()
 
     # noinspection PyAttributeOutsideInit
     def setup_ui(self):
@@ -39,7 +48,12 @@ class MimeTypePanel(QWidget):
 
         self.edit_search = QLineEdit(self)
         self.edit_search.setPlaceholderText("Type to filter")
-        self.edit_search.textChanged.connect(self.on_filter_update)
+        # Filter once the user stops typing, rather than at each keystroke
+        self.filter_timer = QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(FILTER_DELAY)
+        self.filter_timer.timeout.connect(self.on_filter_update)
+        self.edit_search.textChanged.connect(self.filter_timer.start)
 
         self.checkbox_personal = QCheckBox(self)
         self.checkbox_personal.setText("Include personal Mime types (prs-*)")
@@ -58,10 +72,14 @@ class MimeTypePanel(QWidget):
 
         self.text_status = QLabel(self)
 
-        self.list_widget = QListWidget(self)
-        self.list_widget.setSelectionMode(QListWidget.NoSelection)
-        self.list_widget.setAlternatingRowColors(True)
-        self.list_widget.setStyleSheet('''
+        self.list_view = QListView(self)
+        self.list_view.setModel(self.filter_model)
+        self.list_view.setItemDelegate(ItemDelegate(self.list_view))
+        # All rows have the same height: only the visible ones are laid out
+        self.list_view.setUniformItemSizes(True)
+        self.list_view.setSelectionMode(QListView.NoSelection)
+        self.list_view.setAlternatingRowColors(True)
+        self.list_view.setStyleSheet('''
                     QListView::item {
                         border: 1px solid #c5c5c5;
                     }
@@ -72,7 +90,7 @@ class MimeTypePanel(QWidget):
         self.grid.addWidget(self.checkbox_vendor, 1, 2, 1, 1)
         self.grid.addWidget(self.checkbox_ext, 1, 3, 1, 1)
         self.grid.addWidget(self.text_status, 2, 1, 1, 3)
-        self.grid.addWidget(self.list_widget, 3, 1, 1, 3)
+        self.grid.addWidget(self.list_view, 3, 1, 1, 3)
 
     def on_filter_update(self):
         filter_text = self.edit_search.text()
@@ -80,21 +98,14 @@ class MimeTypePanel(QWidget):
         vendor = self.checkbox_vendor.isChecked()
         ext = self.checkbox_ext.isChecked()
 
-        nb_shown = 0
-        nb_total = 0
-        for mime_type in self.item_map:
-            matches = self.matches(mime_type, filter_text, personal, vendor,
-                                   ext)
-            # If it matches, show it
-            self.item_map[mime_type].setHidden(not matches)
-            # Count the number of shown apps
-            nb_shown += int(matches)
-            nb_total += 1
-        self.update_text(nb_shown, nb_total)
+        self.filter_model.set_filter(
+            filter_text,
+            lambda mime_type: self.matches(mime_type, personal, vendor, ext))
+        self.update_text(self.filter_model.rowCount(),
+                         self.model.rowCount())
 
     def matches(self,
                 mime_type: MimeType,
-                filter_text: str,
                 personal_check: bool,
                 vendor_check: bool,
                 ext_check: bool):
@@ -104,8 +115,6 @@ class MimeTypePanel(QWidget):
             return False
         if not ext_check and mime_type.is_extension:
             return False
-        if mime_type.identifier.find(filter_text) == -1:
-            return False
         return True
 
     def update_text(self, nb_shown, nb_total):